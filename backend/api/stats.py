@@ -1,9 +1,13 @@
 from fastapi import Query
 from fastapi import APIRouter, HTTPException
 from pathlib import Path
-from typing import Dict, List, Tuple, Any, cast
+from typing import Dict, Iterable, List, Tuple, Any, cast
+from collections import Counter, defaultdict
+from functools import lru_cache
+from operator import itemgetter
 from celery.result import AsyncResult
 import logging
+import re
 import time
 import os
 import pathlib
@@ -116,6 +120,24 @@ def resolve_city_name(code3: str) -> str:
         logger.warning(f"Failed to load city code map dynamically: {_e}")
     return CITY_CODE_MAP.get(c, c) or c
 
+def resolve_city_names(codes: Iterable[str]) -> Dict[str, str]:
+    """Batch variant of resolve_city_name: load the city map once for all ``codes``.
+
+    Returns a mapping from each given code to its display name.
+    """
+    m: Dict[str, str] | None = None
+    try:
+        if get_city_code_map:
+            m = get_city_code_map()
+    except Exception as _e:
+        logger.warning(f"Failed to load city code map dynamically: {_e}")
+    names: Dict[str, str] = {}
+    for code3 in codes:
+        c = (code3 or "").strip().upper()
+        names[code3] = m.get(c, c) if m is not None else (CITY_CODE_MAP.get(c, c) or c)
+    return names
+
+
 # Initial warm-up load (non-fatal if missing); further lookups use get_city_code_map()
 try:
     if get_city_code_map:
@@ -141,6 +163,12 @@ def _resolve_data_path(name: str | Path) -> Path:
     return base / text
 
 
+# Hostname/model helpers below are pure string functions over a small set of
+# distinct values that repeats across every netspeed file, so they are memoized.
+_STRING_HELPER_CACHE_SIZE = 16384
+
+
+@lru_cache(maxsize=_STRING_HELPER_CACHE_SIZE)
 def is_mac_like(value: str) -> bool:
     """Return True if value looks like a MAC address (12 hex, with/without separators, optional SEP prefix)."""
     s = str(value or "").strip().upper()
@@ -152,6 +180,21 @@ def is_mac_like(value: str) -> bool:
     return len(hex_only) == 12
 
 
+def vlan_sort_key(vlan: str) -> tuple:
+    """Sort VLAN ids numerically, non-numeric VLANs last.
+
+    An isdecimal() guard replaces the try/int() parse so non-numeric ids do
+    not pay for a raised ValueError.
+    """
+    return (0, int(vlan)) if vlan.isdecimal() else (1, vlan)
+
+
+# Location code patterns, tried in order at the start of the upper-cased hostname:
+# 2 letters + X + 2 digits | 3 letters + X + 2 digits (X dropped) | 3 letters + 2 digits
+_LOCATION_RE = re.compile(r"([^\W\d_]{2}X\d{2})|([^\W\d_]{3})X(\d{2})|([^\W\d_]{3}\d{2})")
+
+
+@lru_cache(maxsize=_STRING_HELPER_CACHE_SIZE)
 def extract_location(hostname: str) -> str | None:
     """Extract a location code from the switch hostname.
 
@@ -170,33 +213,26 @@ def extract_location(hostname: str) -> str | None:
     """
     if not hostname:
         return None
-    h = hostname.strip().upper()
-    if len(h) < 4:
+    m = _LOCATION_RE.match(hostname.strip().upper())
+    if not m:
         return None
+    # Pattern 1/3 capture the full code, pattern 2 captures letters and digits separately
+    return "".join(g for g in m.groups() if g)
 
-    # Pattern 1: 2 letters + 'x' + 2 digits (e.g., ABX01)
-    if (len(h) >= 5 and
-        h[0].isalpha() and h[1].isalpha() and
-        h[2] == 'X' and
-        h[3].isdigit() and h[4].isdigit()):
-        return h[:5]
-
-    # Pattern 2: 3 letters + x + 2 digits (e.g., WORx51 -> WOR51)
-    if (len(h) >= 6 and
-        h[0].isalpha() and h[1].isalpha() and h[2].isalpha() and
-        h[3] == 'X' and
-        h[4].isdigit() and h[5].isdigit()):
-        return h[0:3] + h[4:6]  # Take letters + digits, skip the 'x'
-
-    # Pattern 3: 3 letters + 2 digits (e.g., ABC01)
-    if (len(h) >= 5 and
-        h[0].isalpha() and h[1].isalpha() and h[2].isalpha() and
-        h[3].isdigit() and h[4].isdigit()):
-        return h[:5]
 
-    return None
+def extract_locations(hostnames: Iterable[str]) -> Dict[str, str | None]:
+    """Extract location codes for a batch of hostnames.
+
+    Each distinct hostname is matched once against the shared location regex,
+    so callers aggregating whole CSV columns avoid per-row parsing.
+
+    Returns:
+        Mapping of hostname -> location code (or None if no pattern matches)
+    """
+    return {h: extract_location(h) for h in set(hostnames) if h}
 
 
+@lru_cache(maxsize=_STRING_HELPER_CACHE_SIZE)
 def is_jva_switch(hostname: str) -> bool:
     """Determine if a switch hostname belongs to JVA (Prison) based on location pattern.
 
@@ -213,7 +249,15 @@ def is_jva_switch(hostname: str) -> bool:
     if not hostname:
         return False
 
-    location = extract_location(hostname)
+    return is_jva_location(extract_location(hostname))
+
+
+def is_jva_location(location: str | None) -> bool:
+    """Return True if an already extracted location code is a JVA location (ends in 50/51).
+
+    Lets batch callers (see extract_locations) classify switches without
+    parsing the hostname a second time.
+    """
     if not location:
         return False
 
@@ -317,7 +361,7 @@ async def get_current_stats(filename: str = "netspeed.csv") -> Dict:
                             "phonesByModelJustizDetails": src.get("phonesByModelJustizDetails", []),
                             "phonesByModelJVADetails": src.get("phonesByModelJVADetails", []),
                             "cities": sorted(
-                                [{"code": c, "name": resolve_city_name(c)} for c in (src.get("cityCodes") or [])],
+                                [{"code": c, "name": n} for c, n in resolve_city_names(src.get("cityCodes") or []).items()],
                                 key=lambda x: x["name"]
                             ),
                         },
@@ -1024,7 +1068,7 @@ async def get_stats_timeline_top_locations(count: int = 10, extra: str = "", lim
                     if ckey:
                         per_key_map[str(ckey)] = dmap
                 if not dates_set:
-                    labels_map = {str(k): f"{resolve_city_name(str(k))} ({str(k)})" for k in selected_keys}
+                    labels_map = {k: f"{n} ({k})" for k, n in resolve_city_names(str(k) for k in selected_keys).items()}
                     result = {"success": True, "message": "No top-cities timeline data available (per_key)", "dates": [], "keys": selected_keys, "seriesByKey": {}, "labels": labels_map, "mode": "per_key", "group": "city"}
                     _TIMELINE_TOP_CACHE[cache_key] = (now + 60.0, result)
                     return result
@@ -1041,7 +1085,7 @@ async def get_stats_timeline_top_locations(count: int = 10, extra: str = "", lim
                         arrays["totalSwitches"].append(int(last.get("totalSwitches", 0)))
                         arrays["phonesWithKEM"].append(int(last.get("phonesWithKEM", 0)))
                     seriesByKey[k] = arrays
-                labels_map = {str(k): f"{resolve_city_name(str(k))} ({str(k)})" for k in selected_keys}
+                labels_map = {k: f"{n} ({k})" for k, n in resolve_city_names(str(k) for k in selected_keys).items()}
                 result = {"success": True, "message": f"Computed top-cities per-key timeline over {len(window)} days (snapshot)", "dates": window, "keys": selected_keys, "seriesByKey": seriesByKey, "labels": labels_map, "mode": "per_key", "group": "city"}
             else:
                 body_series = {
@@ -1243,8 +1287,8 @@ async def debug_cities(filename: str = "netspeed.csv", limit: int = 25) -> Dict:
         except Exception:
             city_codes = set()
 
-        missing_in_mapping = sorted([p for p in city_codes if p not in map_keys])
-        missing_in_csv = sorted([k for k in map_keys if k not in city_codes])
+        missing_in_mapping = sorted(p for p in city_codes if p not in map_keys)
+        missing_in_csv = sorted(k for k in map_keys if k not in city_codes)
 
         if limit and limit > 0:
             missing_in_mapping = missing_in_mapping[:limit]
@@ -1524,9 +1568,7 @@ async def get_current_stats_fast() -> Dict:
 
         # Get city codes and resolve names
         city_codes = snapshot.get("cityCodes", [])
-        cities = []
-        for code in city_codes:
-            cities.append({"code": code, "name": resolve_city_name(code)})
+        cities = [{"code": code, "name": name} for code, name in resolve_city_names(city_codes).items()]
         cities.sort(key=lambda x: x["name"])
 
         # Optional consistency correction: if per-location kemPhones exist for the same date,
@@ -1690,7 +1732,7 @@ async def get_cities_fast() -> Dict:
                     codes = cc
                     break
         # Resolve names
-        cities = sorted([{"code": c, "name": resolve_city_name(c)} for c in codes], key=lambda x: x["name"])
+        cities = sorted(({"code": c, "name": n} for c, n in resolve_city_names(codes).items()), key=lambda x: x["name"])
         city_map = {c["code"]: c["name"] for c in cities}
         return {"success": True, "cities": cities, "cityMap": city_map, "total": len(cities)}
     except Exception as e:
@@ -1835,16 +1877,18 @@ async def suggest_location_codes(q: str, limit: int = 50) -> Dict:
             }
             res = opensearch_config.client.search(index=opensearch_config.stats_loc_index, body=body)
             if "aggregations" in res and "matching_locations" in res["aggregations"]:
-                for bucket in res["aggregations"]["matching_locations"]["buckets"]:
+                buckets = res["aggregations"]["matching_locations"]["buckets"]
+                # Resolve each distinct city code once for all matching locations
+                try:
+                    city_names = resolve_city_names({b["key"][:3] for b in buckets if b["key"] and len(b["key"]) >= 3})
+                except Exception:
+                    city_names = {}
+                for bucket in buckets:
                     location_code = bucket["key"]
                     if location_code and len(location_code) >= 3:
                         city_code = location_code[:3]
-                        try:
-                            city_name = resolve_city_name(city_code)
-                            display = f"{location_code} ({city_name})" if city_name and city_name != city_code else location_code
-                        except Exception:
-                            city_name = city_code
-                            display = location_code
+                        city_name = city_names.get(city_code, city_code)
+                        display = f"{location_code} ({city_name})" if city_name and city_name != city_code else location_code
                         suggestions.append({
                             "code": location_code,
                             "display": display,
@@ -1962,7 +2006,7 @@ async def get_stats_by_location_fast(q: str) -> Dict:
 
         def _normalize_vlan_summary(doc: Dict[str, Any]) -> Dict[str, Any]:
             usage = doc.get("vlanUsage") or []
-            aggregated: Dict[str, int] = {}
+            aggregated: Counter[str] = Counter()
             for item in usage:
                 if not isinstance(item, dict):
                     continue
@@ -1970,7 +2014,7 @@ async def get_stats_by_location_fast(q: str) -> Dict:
                 if not vlan:
                     continue
                 count = max(_safe_int(item.get("count", 0)), 0)
-                aggregated[vlan] = aggregated.get(vlan, 0) + count
+                aggregated[vlan] += count
 
             sanitized_usage = [{"vlan": vlan, "count": count} for vlan, count in aggregated.items()]
             sanitized_usage.sort(key=lambda entry: _vlan_sort_key_from_value(entry["vlan"]))
@@ -2211,11 +2255,11 @@ async def get_stats_by_location_fast(q: str) -> Dict:
 
             # Efficient aggregation: Use direct dictionary operations instead of nested loops
             # Pre-allocate data structures for better performance
-            phones_by_model = {}
-            phones_by_model_justiz = {}
-            phones_by_model_jva = {}
-            vlan_usage = {}
-            switches_dict = {}  # hostname -> {vlan -> count}
+            phones_by_model: Counter[str] = Counter()
+            phones_by_model_justiz: Counter[str] = Counter()
+            phones_by_model_jva: Counter[str] = Counter()
+            vlan_usage: Counter[str] = Counter()
+            switches_dict: Dict[str, Counter[str]] = defaultdict(Counter)  # hostname -> {vlan -> count}
             kem_phones = []
 
             total_phones = 0
@@ -2236,24 +2280,24 @@ async def get_stats_by_location_fast(q: str) -> Dict:
                     for model_data in doc.get("phonesByModel", []):
                         model = model_data.get("model", "Unknown")
                         count = model_data.get("count", 0)
-                        phones_by_model[model] = phones_by_model.get(model, 0) + count
+                        phones_by_model[model] += count
 
                     for model_data in doc.get("phonesByModelJustiz", []):
                         model = model_data.get("model", "Unknown")
                         count = model_data.get("count", 0)
-                        phones_by_model_justiz[model] = phones_by_model_justiz.get(model, 0) + count
+                        phones_by_model_justiz[model] += count
 
                     for model_data in doc.get("phonesByModelJVA", []):
                         model = model_data.get("model", "Unknown")
                         count = model_data.get("count", 0)
-                        phones_by_model_jva[model] = phones_by_model_jva.get(model, 0) + count
+                        phones_by_model_jva[model] += count
 
                     # Efficient VLAN aggregation
                     for vlan_data in doc.get("vlanUsage", []):
                         vlan = vlan_data.get("vlan", "")
                         count = vlan_data.get("count", 0)
                         if vlan:
-                            vlan_usage[vlan] = vlan_usage.get(vlan, 0) + count
+                            vlan_usage[vlan] += count
 
                     # Efficient switch aggregation (ALL switches, no limits)
                     switches_data = doc.get("switches", [])
@@ -2263,8 +2307,7 @@ async def get_stats_by_location_fast(q: str) -> Dict:
                                 hostname = switch_data.get("hostname", "")
                                 vlans_data = switch_data.get("vlans", [])
                                 if hostname:
-                                    if hostname not in switches_dict:
-                                        switches_dict[hostname] = {}
+                                    switch_vlans = switches_dict[hostname]
 
                                     # Direct VLAN aggregation
                                     for vlan_obj in vlans_data:
@@ -2272,13 +2315,22 @@ async def get_stats_by_location_fast(q: str) -> Dict:
                                             vlan = vlan_obj.get("vlan", "")
                                             count = vlan_obj.get("count", 0)
                                             if vlan:
-                                                switches_dict[hostname][vlan] = switches_dict[hostname].get(vlan, 0) + count
+                                                switch_vlans[vlan] += count
 
                     # KEM phones aggregation
                     kem_phones_data = doc.get("kemPhones", [])
                     if kem_phones_data:
                         kem_phones.extend(kem_phones_data)
 
+            # Sort phone models by count (descending), then name; (model, count) pairs are
+            # sorted before the dicts are built so the key is a plain tuple
+            def model_list(counts):
+                return [{"model": m, "count": c} for m, c in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))]
+
+            # Sort VLANs numerically, in the same order as the snapshot docs
+            def vlan_list(counts):
+                return [{"vlan": v, "count": c} for v, c in sorted(counts.items(), key=lambda kv: vlan_sort_key(str(kv[0])))]
+
             # Convert aggregated data to final format efficiently
             location_doc = {
                 "query": query,
@@ -2287,10 +2339,10 @@ async def get_stats_by_location_fast(q: str) -> Dict:
                 "totalSwitches": total_switches,
                 # Align semantics: phonesWithKEM equals kemPhones length (unique phones)
                 "phonesWithKEM": len(kem_phones),
-                "phonesByModel": [{"model": m, "count": c} for m, c in phones_by_model.items()],
-                "phonesByModelJustiz": [{"model": m, "count": c} for m, c in phones_by_model_justiz.items()],
-                "phonesByModelJVA": [{"model": m, "count": c} for m, c in phones_by_model_jva.items()],
-                "vlanUsage": [{"vlan": v, "count": c} for v, c in vlan_usage.items()],
+                "phonesByModel": model_list(phones_by_model),
+                "phonesByModelJustiz": model_list(phones_by_model_justiz),
+                "phonesByModelJVA": model_list(phones_by_model_jva),
+                "vlanUsage": vlan_list(vlan_usage),
                 "topVLANs": [],
                 "uniqueVLANCount": 0,
                 "switches": [],
@@ -2298,30 +2350,11 @@ async def get_stats_by_location_fast(q: str) -> Dict:
                 "kemPhonesCount": len(kem_phones),
             }
 
-            # Sort phone models by count (descending)
-            location_doc["phonesByModel"].sort(key=lambda x: (-x["count"], x["model"]))
-            location_doc["phonesByModelJustiz"].sort(key=lambda x: (-x["count"], x["model"]))
-            location_doc["phonesByModelJVA"].sort(key=lambda x: (-x["count"], x["model"]))
-
-            # Sort VLANs numerically
-            def vlan_key(item):
-                v = item["vlan"]
-                try:
-                    return (0, int(v))
-                except:
-                    return (1, v)
-            location_doc["vlanUsage"].sort(key=vlan_key)
-
-            # Convert switches to final format - ALL switches included
-            switch_list = []
-            for hostname, vlans_dict in switches_dict.items():
-                vlans_list = [{"vlan": vlan, "count": count} for vlan, count in vlans_dict.items()]
-                vlans_list.sort(key=vlan_key)
-                switch_list.append({
-                    "hostname": hostname,
-                    "vlans": vlans_list
-                })
-            location_doc["switches"] = sorted(switch_list, key=lambda x: x["hostname"])
+            # Convert switches to final format - ALL switches included, sorted by hostname
+            location_doc["switches"] = [
+                {"hostname": hostname, "vlans": vlan_list(vlans_dict)}
+                for hostname, vlans_dict in sorted(switches_dict.items(), key=itemgetter(0))
+            ]
 
         location_doc = _normalize_vlan_summary(location_doc)
 
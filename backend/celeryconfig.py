@@ -24,3 +24,7 @@ enable_utc = True
 # Task result settings
 task_track_started = True
 task_time_limit = 30 * 60  # 30 minutes
+
+# Indexing/backfill tasks run for minutes; reserve one task at a time per worker
+# process so queued files go to idle workers instead of waiting behind a busy one
+worker_prefetch_multiplier = 1
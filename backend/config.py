@@ -40,6 +40,14 @@ class Settings(BaseSettings):
     SEARCH_TIMEOUT_SECONDS: int = 20
     SEARCH_MAX_RESULTS: int = 20000
 
+    # Indexing: number of CSV files parsed/aggregated ahead of the OpenSearch writes
+    INDEX_PREFETCH_WORKERS: int = 2
+    # Opt-in: prefetch in worker processes (dedicated worker hosts only); threads otherwise.
+    # Off by default since some tasks (e.g. stats backfill) also run inside the API process.
+    INDEX_PREFETCH_PROCESSES: bool = False
+    # Snapshot bulk writes: chunks sent concurrently while the next ones are serialized
+    OPENSEARCH_BULK_THREADS: int = 2
+
     # Archive retention (OpenSearch archive_netspeed)
     ARCHIVE_RETENTION_YEARS: int = 4
 
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 import logging
 
 # Configure logging
@@ -13,6 +13,10 @@ except Exception:  # Avoid hard failure on import cycles during startup
     resolve_current_file = None  # type: ignore
     NETSPEED_TIMESTAMP_PATTERN = None  # type: ignore
 
+# FileModel.from_path results keyed by (path, mtime_ns, size, current file)
+_FROM_PATH_CACHE: Dict[Tuple[Any, ...], "FileModel"] = {}
+_FROM_PATH_CACHE_MAX = 512
+
 
 class FileModel(BaseModel):
     """Model representing a CSV file."""
@@ -27,12 +31,48 @@ class FileModel(BaseModel):
         """
         Create a FileModel instance from a file path.
 
+        Results are cached per (path, mtime, size, current file) so repeated
+        lookups of an unchanged file skip the stat subprocess and the
+        content-based format detection.
+
         Args:
             file_path: Path to the CSV file
 
         Returns:
             FileModel: Instance representing the file
         """
+        import os
+
+        current_candidate = None
+        if callable(resolve_current_file):
+            try:
+                current_candidate = resolve_current_file()
+            except Exception:
+                current_candidate = None
+
+        cache_key: Optional[Tuple[Any, ...]] = None
+        try:
+            st = os.stat(file_path)
+            cache_key = (file_path, st.st_mtime_ns, st.st_size, str(current_candidate) if current_candidate is not None else None)
+        except (OSError, TypeError, ValueError):
+            cache_key = None
+
+        if cache_key is not None:
+            cached = _FROM_PATH_CACHE.get(cache_key)
+            if cached is not None:
+                return cached.model_copy()
+
+        model = cls._build_from_path(file_path, current_candidate)
+        if cache_key is not None:
+            if len(_FROM_PATH_CACHE) >= _FROM_PATH_CACHE_MAX:
+                _FROM_PATH_CACHE.clear()
+            _FROM_PATH_CACHE[cache_key] = model
+            return model.model_copy()
+        return model
+
+    @classmethod
+    def _build_from_path(cls, file_path: str, current_candidate: Any) -> "FileModel":
+        """Build a FileModel without caching (see from_path)."""
         # Import modules inside method to ensure they're available
         import os
         from pathlib import Path
@@ -54,12 +94,6 @@ class FileModel(BaseModel):
             path_obj = None  # type: ignore
 
         is_current = False
-        current_candidate = None
-        if callable(resolve_current_file):
-            try:
-                current_candidate = resolve_current_file()
-            except Exception:
-                current_candidate = None
         if current_candidate is not None:
             try:
                 if resolved_self is not None and resolved_self == Path(current_candidate).resolve():
@@ -1,16 +1,29 @@
+import multiprocessing
 import os
+import stat
+import time
 from celery import Celery
 import logging
+from collections import Counter, defaultdict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from itertools import compress
+from operator import itemgetter
 from pathlib import Path
-from typing import Optional, Dict, List, Any
+from typing import Callable, Iterator, Optional, Dict, List, Any
 from datetime import datetime
+from uuid import uuid4
 from opensearchpy.exceptions import ConnectionError as OpenSearchConnectionError
+from redis import Redis
 
 from config import settings
 from utils.opensearch import OpenSearchUnavailableError, opensearch_config
-from utils.index_state import load_state, save_state, update_file_state, update_totals, is_file_current, start_active, update_active, clear_active
+from utils.snapshot_cache import load_snapshot, prune_snapshots, store_snapshot
+from utils.index_state import load_state, save_state, save_state_throttled, update_file_state, update_totals, is_file_current, start_active, update_active, clear_active, files_fingerprint, load_checkpoint, save_checkpoint, clear_checkpoint
 from utils.csv_utils import (
     read_csv_file_normalized,
+    read_csv_file_columns,
+    rows_to_columns,
     count_unique_data_rows,
     deduplicate_phone_rows,
     phone_row_identity,
@@ -20,6 +33,15 @@ from utils.path_utils import (
     resolve_current_file,
     netspeed_files_ordered,
     collect_netspeed_files,
+    is_plain_netspeed_file,
+)
+from api.stats import (
+    extract_locations,
+    invalidate_caches,
+    is_jva_location,
+    is_mac_like,
+    resolve_city_names,
+    vlan_sort_key,
 )
 
 # Configure logging
@@ -41,6 +63,406 @@ app = Celery('csv_viewer')
 app.config_from_object('celeryconfig')
 
 
+# Columns needed to compute a stats snapshot from deduplicated phone rows
+_SNAPSHOT_COLUMNS = ("Switch Hostname", "Model Name", "KEM", "KEM 2", "Line Number")
+# Columns additionally needed for the per-location detail documents
+_DETAIL_COLUMNS = _SNAPSHOT_COLUMNS + ("MAC Address", "Serial Number", "IP Address", "Voice VLAN")
+# Version of the cached backfill aggregates (utils.snapshot_cache). Bump whenever
+# reading, normalizing, de-duplicating or aggregating rows changes their result.
+SNAPSHOT_CACHE_VERSION = 1
+
+
+def _kem_modules(kem1: str, kem2: str, line_number: str) -> int:
+    """Count KEM modules from stripped KEM/KEM 2 cells with Line Number fallback."""
+    count = (1 if kem1 else 0) + (1 if kem2 else 0)
+    if count == 0 and "KEM" in line_number:
+        count = line_number.count("KEM") or 1
+    return count
+
+
+@lru_cache(maxsize=4096)
+def _clean_model(model: str) -> str:
+    """Normalize a stripped model name for snapshot counts.
+
+    Empty, too short (<4 chars) or MAC-like names count as "Unknown". Cached
+    because the same few model strings repeat across every netspeed file.
+    """
+    if not model:
+        return "Unknown"
+    try:
+        if model != "Unknown" and (len(model) < 4 or is_mac_like(model)):
+            return "Unknown"
+    except Exception:
+        pass
+    return model
+
+
+def _model_count_list(counts: Dict[str, int]) -> List[Dict[str, Any]]:
+    """Format model counts as [{model, count}] ordered by count desc, then model.
+
+    Sorting the (model, count) pairs before building the dicts keeps the
+    sort key a plain tuple instead of two dict lookups per comparison.
+    """
+    return [{"model": m, "count": c} for m, c in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))]
+
+
+def _host_facts(hostnames: List[str]) -> tuple[Dict[str, tuple[Optional[str], bool]], List[Optional[str]], List[bool]]:
+    """Resolve (location, is_jva) once per unique switch and expand them into per-row columns.
+
+    JVA switches are those whose location code ends in 50/51 (see is_jva_switch).
+    The per-row columns are expanded with map over the per-host lookup; rows
+    without a hostname get (None, False).
+
+    Returns:
+        (host_info, row_locs, jva_flags)
+    """
+    try:
+        host_locs = extract_locations(hostnames)
+    except Exception:
+        host_locs = {}
+    host_info: Dict[str, tuple[Optional[str], bool]] = {}
+    for sh in dict.fromkeys(hostnames):
+        if sh:
+            loc = host_locs.get(sh) or None
+            host_info[sh] = (loc, is_jva_location(loc))
+    lookup = dict(host_info)
+    lookup[""] = (None, False)
+    infos = list(map(lookup.__getitem__, hostnames))
+    return host_info, list(map(itemgetter(0), infos)), list(map(itemgetter(1), infos))
+
+
+def _location_model_counts(row_locs: List[Optional[str]], models: List[str], jva_flags: List[bool]) -> tuple[Dict[str, Counter[str]], Dict[str, Counter[str]]]:
+    """Count models per location, split into (Justiz, JVA); rows without a location are skipped."""
+    justiz: Dict[str, Counter[str]] = {}
+    jva: Dict[str, Counter[str]] = {}
+    for (loc, model, is_jva), c in Counter(zip(row_locs, models, jva_flags)).items():
+        if loc is not None:
+            (jva if is_jva else justiz).setdefault(loc, Counter())[model] += c
+    return justiz, jva
+
+
+def _location_model_details(model_counts: Dict[str, Counter[str]], city_name: Callable[[str], str]) -> List[Dict[str, Any]]:
+    """Format one side of the _location_model_counts table as phonesByModel*Details entries.
+
+    Entries carry the location, its "CODE - City" display name, the phone total
+    and the model list, ordered by phone count desc, then location.
+    """
+    details = []
+    for loc, models in model_counts.items():
+        code3 = loc[:3] if len(loc) >= 3 else ""
+        cname = city_name(code3) if code3 else ""
+        disp = f"{loc} - {cname}" if cname and cname != code3 else loc
+        details.append({"location": loc, "locationDisplay": disp, "totalPhones": sum(models.values()), "models": _model_count_list(models)})
+    details.sort(key=lambda x: (-x["totalPhones"], x["location"]))
+    return details
+
+
+def _vlan_list(counts: Dict[str, int]) -> List[Dict[str, Any]]:
+    """Format VLAN counts as [{vlan, count}] in VLAN order, each key computed once."""
+    keyed = sorted(((vlan_sort_key(v), v, c) for v, c in counts.items()), key=itemgetter(0))
+    return [{"vlan": v, "count": c} for _, v, c in keyed]
+
+
+def _iter_location_docs(
+    cols: Dict[str, List[str]],
+    host_info: Dict[str, tuple[Optional[str], bool]],
+    row_locs: List[Optional[str]],
+    kems: List[int],
+    model_counts: tuple[Dict[str, Counter[str]], Dict[str, Counter[str]]],
+) -> Iterator[Dict[str, Any]]:
+    """Yield the stats_netspeed_loc documents of one file, sorted by location.
+
+    Documents are built one at a time so snapshot_current_with_details can
+    stream them into index_stats_location_snapshots; see _location_docs for
+    the list form. ``cols`` holds the _DETAIL_COLUMNS of the deduplicated rows, ``host_info``,
+    ``row_locs`` and ``kems`` come from _host_facts/_kem_modules, and
+    ``model_counts`` is the (Justiz, JVA) split from _location_model_counts
+    (callers decide how model names are normalized).
+    """
+    justiz_models, jva_models = model_counts
+    hostnames = cols["Switch Hostname"]
+    # Phones per location roll up from the (location, Justiz/JVA) model table,
+    # which already covers every row with a location; no second pass over row_locs
+    loc_phones: Counter[str] = Counter()
+    for side in model_counts:
+        for loc, counts in side.items():
+            loc_phones[loc] += sum(counts.values())
+
+    # host_info holds each switch once, so plain lists collect distinct switches
+    switches_by_location: Dict[str, List[str]] = {}
+    for sh, (loc, _) in host_info.items():
+        if loc:
+            switches_by_location.setdefault(loc, []).append(sh)
+
+    # Phones with >=1 KEM (KEM/KEM 2 or Line Number fallback), in row order; included even without IP
+    kem_phones: Dict[str, List[Dict[str, Any]]] = {}
+    raw_models = cols["Model Name"]; macs = cols["MAC Address"]; serials = cols["Serial Number"]; ips = cols["IP Address"]
+    for i in compress(range(len(kems)), kems):
+        loc = row_locs[i]
+        if loc:
+            item = {"model": raw_models[i] or "Unknown", "mac": macs[i], "serial": serials[i], "switch": hostnames[i], "kemModules": kems[i]}
+            if ips[i]:
+                item["ip"] = ips[i]
+            kem_phones.setdefault(loc, []).append(item)
+
+    # VLAN usage per location and per switch (a switch belongs to one location)
+    vlans_by_location: Dict[str, Counter[str]] = {}
+    switch_vlans: Dict[str, Counter[str]] = defaultdict(Counter)
+    for (loc, sh, vlan), c in Counter(zip(row_locs, hostnames, cols["Voice VLAN"])).items():
+        if loc and vlan:
+            vlans_by_location.setdefault(loc, Counter())[vlan] += c
+            switch_vlans[sh][vlan] += c
+
+    for loc in sorted(loc_phones):
+        jm = justiz_models.get(loc) or Counter()
+        jv = jva_models.get(loc) or Counter()
+        vlans = vlans_by_location.get(loc) or Counter()
+        vlan_usage = _vlan_list(vlans)
+        loc_switches = sorted(switches_by_location.get(loc, []))
+        loc_kem_phones = kem_phones.get(loc, [])
+        yield {
+            "key": loc,
+            "mode": "code",
+            "totalPhones": loc_phones[loc],
+            "totalSwitches": len(loc_switches),
+            "phonesWithKEM": len(loc_kem_phones),
+            "phonesByModel": _model_count_list(jm + jv),
+            "phonesByModelJustiz": _model_count_list(jm),
+            "phonesByModelJVA": _model_count_list(jv),
+            "vlanUsage": vlan_usage,
+            # Top three VLANs by count (desc); vlan_usage is already in VLAN order,
+            # so the stable sort keeps the numeric tie-breaker
+            "topVLANs": sorted(vlan_usage, key=lambda item: -item["count"])[:3],
+            "uniqueVLANCount": len(vlans),
+            "switches": [{"hostname": sw, "vlans": _vlan_list(switch_vlans.get(sw, {}))} for sw in loc_switches],
+            "kemPhones": loc_kem_phones,
+        }
+
+
+def _location_docs(
+    cols: Dict[str, List[str]],
+    host_info: Dict[str, tuple[Optional[str], bool]],
+    row_locs: List[Optional[str]],
+    kems: List[int],
+    model_counts: tuple[Dict[str, Counter[str]], Dict[str, Counter[str]]],
+) -> List[Dict[str, Any]]:
+    """Build the stats_netspeed_loc documents of one file as a list (see _iter_location_docs).
+
+    Used by backfill_location_snapshots, whose prefetch threads build the
+    documents ahead of the OpenSearch writes.
+    """
+    return list(_iter_location_docs(cols, host_info, row_locs, kems, model_counts))
+
+
+def _aggregate_snapshot(rows: List[Dict[str, Any]]) -> tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Compute global snapshot metrics and basic per-location docs from row dicts.
+
+    Rows are projected once into column lists; see _aggregate_snapshot_columns.
+    """
+    return _aggregate_snapshot_columns(rows_to_columns(rows, _SNAPSHOT_COLUMNS))
+
+
+def _aggregate_snapshot_columns(cols: Dict[str, List[str]]) -> tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Compute global snapshot metrics and basic per-location docs column-wise.
+
+    ``cols`` maps each of _SNAPSHOT_COLUMNS to stripped per-phone values.
+    Hostname parsing and model normalization run per unique value, and all
+    counting is done with set/Counter reductions over the columns instead of
+    per-row dict updates.
+
+    Returns:
+        (metrics, loc_docs) where loc_docs carry totalPhones/totalSwitches/phonesWithKEM.
+    """
+    hostnames = cols["Switch Hostname"]
+
+    # Hostname-derived facts, evaluated once per unique switch in one batch
+    host_info, row_locs, jva_flags = _host_facts(hostnames)
+
+    raw_models = cols["Model Name"]
+    model_map = {m: _clean_model(m) for m in set(raw_models)}
+    replaced_models = sorted(m for m, clean in model_map.items() if m and clean != m)
+    if replaced_models:
+        logger.debug(f"Models counted as 'Unknown': {replaced_models}")
+    models = list(map(model_map.__getitem__, raw_models))
+    kems = list(map(_kem_modules, cols["KEM"], cols["KEM 2"], cols["Line Number"]))
+
+    # host_info is keyed by unique switch, so switch counts need no extra sets
+    total_switches = len(host_info)
+    jva_switch_count = sum(1 for _, is_jva in host_info.values() if is_jva)
+    locations = {loc for loc, _ in host_info.values() if loc}
+    jva_locations = {loc for loc, is_jva in host_info.values() if loc and is_jva}
+    justiz_locations = {loc for loc, is_jva in host_info.values() if loc and not is_jva}
+    city_codes = {loc[:3] for loc in locations}
+    jva_city_codes = {loc[:3] for loc in jva_locations}
+    justiz_city_codes = {loc[:3] for loc in justiz_locations}
+
+    model_counts = Counter(models)
+    jva_model_counts = Counter(compress(models, jva_flags))
+    justiz_model_counts = model_counts - jva_model_counts
+
+    jva_kems = list(compress(kems, jva_flags))
+    phones_with_kem_unique = len(kems) - kems.count(0)
+    total_kem_modules = sum(kems)
+    jva_phones_with_kem_unique = len(jva_kems) - jva_kems.count(0)
+    jva_total_kem_modules = sum(jva_kems)
+    justiz_phones_with_kem_unique = phones_with_kem_unique - jva_phones_with_kem_unique
+    justiz_total_kem_modules = total_kem_modules - jva_total_kem_modules
+
+    phones_by_model = _model_count_list(model_counts)
+    phones_by_model_justiz = _model_count_list(justiz_model_counts)
+    phones_by_model_jva = _model_count_list(jva_model_counts)
+    total_justiz_phones = sum(justiz_model_counts.values()); total_jva_phones = sum(jva_model_counts.values())
+
+    metrics = {
+        "totalPhones": len(hostnames),
+        "totalSwitches": total_switches,
+        "totalLocations": len(locations),
+        "totalCities": len(city_codes),
+        "phonesWithKEM": phones_with_kem_unique,
+        "totalKEMs": total_kem_modules,
+        "totalJustizPhones": total_justiz_phones,
+        "totalJVAPhones": total_jva_phones,
+        "justizSwitches": total_switches - jva_switch_count,
+        "justizLocations": len(justiz_locations),
+        "justizCities": len(justiz_city_codes),
+        "justizPhonesWithKEM": justiz_phones_with_kem_unique,
+        "totalJustizKEMs": justiz_total_kem_modules,
+        "jvaSwitches": jva_switch_count,
+        "jvaLocations": len(jva_locations),
+        "jvaCities": len(jva_city_codes),
+        "jvaPhonesWithKEM": jva_phones_with_kem_unique,
+        "totalJVAKEMs": jva_total_kem_modules,
+        "phonesByModel": phones_by_model,
+        "phonesByModelJustiz": phones_by_model_justiz,
+        "phonesByModelJVA": phones_by_model_jva,
+        "cityCodes": sorted(city_codes),
+    }
+
+    # Basic per-location counts (unique KEM phones, unique switches)
+    # Counter over the location column (and its KEM-filtered view via compress)
+    # keeps the group-by counting in C; rows without a location count as None
+    loc_phones = Counter(row_locs)
+    loc_phones.pop(None, None)
+    loc_kem_phones = Counter(compress(row_locs, kems))
+    # host_info holds one entry per unique switch, so this counts distinct switches per location
+    loc_switches = Counter(map(itemgetter(0), host_info.values()))
+    loc_docs = [
+        {
+            "key": loc,
+            "mode": "code",
+            "totalPhones": phones,
+            "totalSwitches": loc_switches[loc],
+            "phonesWithKEM": loc_kem_phones[loc],
+        }
+        for loc, phones in loc_phones.items()
+    ]
+    return metrics, loc_docs
+
+
+def _file_snapshot_aggregates(rows: List[Dict[str, Any]], file_path: Path) -> tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """(metrics, loc_docs) of one file's deduplicated rows; (None, []) when aggregation fails."""
+    try:
+        return _aggregate_snapshot(rows)
+    except Exception as _e:
+        logger.debug(f"Stats snapshot failed for {file_path}: {_e}")
+        return None, []
+
+
+def _prepare_file_snapshot(file_path: Path, aggregate: bool = True) -> Dict[str, Any]:
+    """Read, deduplicate and aggregate one CSV file for its snapshot documents.
+
+    Runs in a prefetch thread in index_all_csv_files so parsing upcoming files
+    overlaps with the OpenSearch writes of the current one. With ``aggregate``
+    off (file unchanged since its snapshots were written) only the rows are read.
+    """
+    from models.file import FileModel as _FM
+    fm = _FM.from_path(str(file_path))
+    date_str = fm.date.strftime('%Y-%m-%d') if fm.date else None
+    read_stats: Dict[str, int] = {}
+    _, rows_original = read_csv_file_normalized(str(file_path), stats=read_stats)
+    rows = deduplicate_phone_rows(rows_original)
+    if len(rows) != len(rows_original):
+        logger.debug(
+            "index_all_csv_files deduplicated %s rows: %d -> %d",
+            fm.name,
+            len(rows_original),
+            len(rows),
+        )
+
+    metrics: Optional[Dict[str, Any]] = None
+    loc_docs: List[Dict[str, Any]] = []
+    if aggregate:
+        metrics, loc_docs = _file_snapshot_aggregates(rows, file_path)
+    return {
+        "file": fm.name,
+        "date": date_str,
+        "aggregated": aggregate,
+        "metrics": metrics,
+        "loc_docs": loc_docs,
+        "rows": rows,
+        "line_count": read_stats.get("unique_data_rows"),
+    }
+
+
+def _snapshot_prefetch_pool(workers: int) -> Executor:
+    """Executor parsing/aggregating CSV files ahead of the OpenSearch writes.
+
+    Used for _prepare_file_snapshot in index_all_csv_files and by the backfill tasks.
+
+    A thread pool by default: the backfills are also called synchronously
+    from API handlers, where forking a process pool out of the threaded web
+    server is unsafe. With INDEX_PREFETCH_PROCESSES enabled a process pool
+    lets several files progress outside the GIL, except in daemonic
+    processes (Celery prefork children), which may not start processes.
+    """
+    if getattr(settings, "INDEX_PREFETCH_PROCESSES", False) and not multiprocessing.current_process().daemon:
+        return ProcessPoolExecutor(max_workers=workers)
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+def _snapshots_current(file_path: str, count: Optional[int] = None) -> bool:
+    """Return True when the index state already records this file, unchanged, with ``count`` documents.
+
+    Snapshots for such a file were written when it was recorded, so re-running
+    the reparse-and-aggregate path would only reproduce them. Without ``count``
+    only the file signature is compared (used before the document count is known).
+    """
+    try:
+        path = Path(file_path)
+        recorded = (load_state().get("files") or {}).get(path.name)
+        if not recorded or (count is not None and recorded.get("doc_count") != count):
+            return False
+        return is_file_current(path, recorded)
+    except Exception as e:
+        logger.debug(f"Index state check failed for {file_path}: {e}")
+        return False
+
+
+def _snapshot_docs_exist(file: str, date: Optional[str]) -> bool:
+    """Return True when the stats and archive snapshots of file/date exist.
+
+    Complements _snapshots_current, which only consults the index state: the
+    snapshots are gone after the stats or archive indices were recreated.
+    """
+    return (
+        opensearch_config.has_stats_snapshot(file=file, date=date)
+        and opensearch_config.has_archive_snapshot(file=file, date=date)
+    )
+
+
+def _index_csv_snapshots_current(file_path: str, count: int) -> bool:
+    """Index-state and snapshot-existence check of index_csv, as done per file in index_all_csv_files."""
+    if not _snapshots_current(file_path, count):
+        return False
+    try:
+        from models.file import FileModel as _FM
+        fm = _FM.from_path(file_path)
+        return _snapshot_docs_exist(fm.name, fm.date.strftime('%Y-%m-%d') if fm.date else None)
+    except Exception as e:
+        logger.debug(f"Snapshot existence check failed for {file_path}: {e}")
+        return False
+
+
 @app.task(name='tasks.search_opensearch')
 def search_opensearch(query: str,
                       field: Optional[str] = None,
@@ -80,11 +502,41 @@ def search_opensearch(query: str,
         }
 
 
+def _fallback_current_file(*dirs: Path | str) -> Optional[Path]:
+    """Return the first existing netspeed.csv among the fallback locations.
+
+    NETSPEED_CURRENT_DIR (used as is when it points at a file) comes first,
+    then ``dirs`` and the legacy /usr/scripts location. Each candidate costs
+    a single os.stat call.
+    """
+    candidates: List[str] = []
+    current_dir = getattr(settings, "NETSPEED_CURRENT_DIR", None)
+    if current_dir:
+        current_dir = str(current_dir)
+        try:
+            if stat.S_ISREG(os.stat(current_dir).st_mode):
+                return Path(current_dir)
+        except OSError:
+            pass
+        candidates.append(os.path.join(current_dir, "netspeed.csv"))
+    candidates.extend(os.path.join(str(d), "netspeed.csv") for d in dirs)
+    candidates.append("/usr/scripts/netspeed/netspeed.csv")
+    for cand in candidates:
+        try:
+            os.stat(cand)
+        except OSError:
+            continue
+        return Path(cand)
+    return None
+
+
 @app.task(name='tasks.snapshot_current_stats')
-def snapshot_current_stats(directory_path: Optional[str] = None) -> dict:
+def snapshot_current_stats(directory_path: Optional[str] = None, details_result: Optional[dict] = None) -> dict:
     """Compute and persist today's stats snapshot for netspeed.csv only.
 
     phonesWithKEM counts unique phones with >=1 KEM; totalKEMs counts modules.
+    ``details_result`` is the result of a snapshot_current_with_details run that
+    just succeeded; when it wrote the same file/date snapshot the CSV is not read again.
     """
     try:
         from models.file import FileModel as _FM
@@ -113,133 +565,24 @@ def snapshot_current_stats(directory_path: Optional[str] = None) -> dict:
             file_path = None
 
         if file_path is None:
-            fallback_candidates: List[Path] = []
             # Prefer configured directories
-            current_dir = getattr(settings, "NETSPEED_CURRENT_DIR", None)
-            if current_dir:
-                current_path = Path(current_dir)
-                if current_path.is_file():
-                    fallback_candidates.append(current_path)
-                else:
-                    fallback_candidates.append(current_path / "netspeed.csv")
-            fallback_candidates.append(data_dir / "netspeed.csv")
-            fallback_candidates.append(get_data_root() / "netspeed.csv")
-            fallback_candidates.append(Path("/usr/scripts/netspeed/netspeed.csv"))
-            for cand in fallback_candidates:
-                if cand.exists():
-                    file_path = cand
-                    break
+            file_path = _fallback_current_file(data_dir, get_data_root())
 
         if file_path is None:
             return {"status": "warning", "message": f"Current file not found near {directory_path}"}
 
         fm = _FM.from_path(str(file_path))
         date_str = fm.date.strftime('%Y-%m-%d') if fm.date else None
-        _, rows_original = read_csv_file_normalized(str(file_path))
-        rows = deduplicate_phone_rows(rows_original)
-        if len(rows) != len(rows_original):
-            logger.debug(
-                "snapshot_current_stats deduplicated %s rows: %d -> %d",
-                fm.name,
-                len(rows_original),
-                len(rows),
-            )
-
-        total_phones = len(rows)
-        switches = set(); locations = set(); city_codes = set()
-        phones_with_kem_unique = 0; total_kem_modules = 0
-        model_counts: Dict[str, int] = {}
-        justiz_model_counts: Dict[str, int] = {}; jva_model_counts: Dict[str, int] = {}
-        justiz_switches = set(); justiz_locations = set(); justiz_city_codes = set(); justiz_phones_with_kem_unique = 0; justiz_total_kem_modules = 0
-        jva_switches = set(); jva_locations = set(); jva_city_codes = set(); jva_phones_with_kem_unique = 0; jva_total_kem_modules = 0
-
-        unknown_models_debug = []
-        for r in rows:
-            sh = (r.get("Switch Hostname") or "").strip(); is_jva = False
-            if sh:
-                switches.add(sh)
-                try:
-                    from api.stats import is_jva_switch
-                    is_jva = is_jva_switch(sh)
-                except Exception:
-                    is_jva = False
-                if is_jva:
-                    jva_switches.add(sh)
-                else:
-                    justiz_switches.add(sh)
-                try:
-                    from api.stats import extract_location
-                    loc = extract_location(sh)
-                    if loc:
-                        locations.add(loc); city_codes.add(loc[:3])
-                        if is_jva:
-                            jva_locations.add(loc); jva_city_codes.add(loc[:3])
-                        else:
-                            justiz_locations.add(loc); justiz_city_codes.add(loc[:3])
-                except Exception:
-                    pass
-
-            kem_count = 0
-            if (r.get("KEM") or "").strip(): kem_count += 1
-            if (r.get("KEM 2") or "").strip(): kem_count += 1
-            if kem_count == 0:
-                ln = (r.get("Line Number") or "").strip()
-                if "KEM" in ln: kem_count = ln.count("KEM") or 1
-            if kem_count > 0:
-                phones_with_kem_unique += 1; total_kem_modules += kem_count
-                if is_jva:
-                    jva_phones_with_kem_unique += 1; jva_total_kem_modules += kem_count
-                else:
-                    justiz_phones_with_kem_unique += 1; justiz_total_kem_modules += kem_count
-
-            model_orig = (r.get("Model Name") or "").strip() or "Unknown"
-            model = model_orig
-            if model != "Unknown":
-                try:
-                    from api.stats import is_mac_like
-                    if len(model) < 4 or is_mac_like(model):
-                        unknown_models_debug.append(model_orig)
-                        model = "Unknown"
-                except Exception:
-                    pass
-            model_counts[model] = model_counts.get(model, 0) + 1
-            if is_jva:
-                jva_model_counts[model] = jva_model_counts.get(model, 0) + 1
-            else:
-                justiz_model_counts[model] = justiz_model_counts.get(model, 0) + 1
-
-        if unknown_models_debug:
-            logger.warning(f"DEBUG: Folgende Modelle wurden als 'Unknown' ersetzt: {unknown_models_debug}")
-
-        phones_by_model = [{"model": m, "count": c} for m, c in model_counts.items()]; phones_by_model.sort(key=lambda x: (-x["count"], x["model"]))
-        phones_by_model_justiz = [{"model": m, "count": c} for m, c in justiz_model_counts.items()]; phones_by_model_justiz.sort(key=lambda x: (-x["count"], x["model"]))
-        phones_by_model_jva = [{"model": m, "count": c} for m, c in jva_model_counts.items()]; phones_by_model_jva.sort(key=lambda x: (-x["count"], x["model"]))
-        total_justiz_phones = sum(justiz_model_counts.values()); total_jva_phones = sum(jva_model_counts.values())
-
-        metrics = {
-            "totalPhones": total_phones,
-            "totalSwitches": len(switches),
-            "totalLocations": len(locations),
-            "totalCities": len(city_codes),
-            "phonesWithKEM": phones_with_kem_unique,
-            "totalKEMs": total_kem_modules,
-            "totalJustizPhones": total_justiz_phones,
-            "totalJVAPhones": total_jva_phones,
-            "justizSwitches": len(justiz_switches),
-            "justizLocations": len(justiz_locations),
-            "justizCities": len(justiz_city_codes),
-            "justizPhonesWithKEM": justiz_phones_with_kem_unique,
-            "totalJustizKEMs": justiz_total_kem_modules,
-            "jvaSwitches": len(jva_switches),
-            "jvaLocations": len(jva_locations),
-            "jvaCities": len(jva_city_codes),
-            "jvaPhonesWithKEM": jva_phones_with_kem_unique,
-            "totalJVAKEMs": jva_total_kem_modules,
-            "phonesByModel": phones_by_model,
-            "phonesByModelJustiz": phones_by_model_justiz,
-            "phonesByModelJVA": phones_by_model_jva,
-            "cityCodes": sorted(list(city_codes)),
-        }
+        if (
+            isinstance(details_result, dict)
+            and details_result.get("status") == "success"
+            and details_result.get("file") == fm.name
+            and details_result.get("date") == date_str
+        ):
+            return {"status": "skipped", "message": "Snapshot already indexed with details", "file": fm.name, "date": date_str}
+        # Only the snapshot columns are kept (deduplicated while streaming)
+        cols = read_csv_file_columns(str(file_path), _SNAPSHOT_COLUMNS)
+        metrics, _ = _aggregate_snapshot_columns(cols)
         # Preserve detail arrays if an existing snapshot for the same day already has them
         try:
             existing = opensearch_config.get_stats_snapshot(file=fm.name, date=date_str)
@@ -291,20 +634,7 @@ def snapshot_current_with_details(file_path: Optional[str] = None, force_date: O
                 p = None
 
         if p is None:
-            fallback_candidates: List[Path] = []
-            current_dir = getattr(settings, "NETSPEED_CURRENT_DIR", None)
-            if current_dir:
-                current_path = Path(current_dir)
-                if current_path.is_file():
-                    fallback_candidates.append(current_path)
-                else:
-                    fallback_candidates.append(current_path / "netspeed.csv")
-            fallback_candidates.append(get_data_root() / "netspeed.csv")
-            fallback_candidates.append(Path("/usr/scripts/netspeed/netspeed.csv"))
-            for cand in fallback_candidates:
-                if cand.exists():
-                    p = cand
-                    break
+            p = _fallback_current_file(get_data_root())
 
         if p is None:
             return {"status": "warning", "message": "File not found for snapshot"}
@@ -313,139 +643,73 @@ def snapshot_current_with_details(file_path: Optional[str] = None, force_date: O
         from models.file import FileModel as _FM
         fm = _FM.from_path(str(p))
         date_str = force_date or (fm.date.strftime('%Y-%m-%d') if fm.date else None)
-        _, rows_original = read_csv_file_normalized(str(p))
-        rows = deduplicate_phone_rows(rows_original)
-        if len(rows) != len(rows_original):
-            logger.debug(
-                "snapshot_current_with_details deduplicated %s rows: %d -> %d",
-                fm.name,
-                len(rows_original),
-                len(rows),
-            )
-
-        # Aggregators
-        switches: set = set(); locations: set = set(); city_codes: set = set()
-        model_counts: Dict[str, int] = {}; justiz_model_counts: Dict[str, int] = {}; jva_model_counts: Dict[str, int] = {}
-        phones_with_kem_unique = 0; total_kem_modules = 0
-        justiz_phones_with_kem_unique = 0; jva_phones_with_kem_unique = 0
-        justiz_total_kem_modules = 0; jva_total_kem_modules = 0
-        justiz_switches = set(); jva_switches = set(); justiz_locations=set(); jva_locations=set(); justiz_city_codes=set(); jva_city_codes=set()
-
-        per_loc_counts: Dict[str, Dict[str, int]] = {}
-        location_details: Dict[str, Dict[str, Any]] = {}
-        justiz_details_by_location: Dict[str, Dict[str, int]] = {}
-        jva_details_by_location: Dict[str, Dict[str, int]] = {}
-
-        for r in rows:
-            sh = (r.get("Switch Hostname") or "").strip(); loc=None; is_jva=False
-            if sh:
-                switches.add(sh)
-                try:
-                    from api.stats import is_jva_switch, extract_location, is_mac_like
-                    is_jva = is_jva_switch(sh)
-                    loc = extract_location(sh)
-                except Exception:
-                    pass
-                (jva_switches if is_jva else justiz_switches).add(sh)
-                if loc:
-                    locations.add(loc); city_codes.add(loc[:3])
-                    (jva_locations if is_jva else justiz_locations).add(loc)
-                    (jva_city_codes if is_jva else justiz_city_codes).add(loc[:3])
-                    plc = per_loc_counts.setdefault(loc,{"totalPhones":0,"phonesWithKEM":0,"totalSwitches":0})
-                    plc["totalPhones"] += 1
-                    det = location_details.setdefault(loc,{"vlans":{},"switches":set(),"switch_vlans":{},"kem_phones":[]})
-                    if sh not in det["switches"]:
-                        det["switches"].add(sh); plc["totalSwitches"] += 1
-
-            # KEM counting (modules + unique phones)
-            kem_modules = 0
-            for fld in ("KEM","KEM 2"):
-                if (r.get(fld) or "").strip(): kem_modules += 1
-            if kem_modules == 0:  # fallback in line number
-                ln = (r.get("Line Number") or "").strip()
-                if "KEM" in ln:
-                    kem_modules = ln.count("KEM") or 1
-            if kem_modules>0:
-                phones_with_kem_unique +=1; total_kem_modules += kem_modules
-                if is_jva:
-                    jva_phones_with_kem_unique +=1; jva_total_kem_modules += kem_modules
-                else:
-                    justiz_phones_with_kem_unique +=1; justiz_total_kem_modules += kem_modules
-                if loc:
-                    det = location_details.setdefault(loc,{"vlans":{},"switches":set(),"switch_vlans":{},"kem_phones":[]})
-                    item = {"model": (r.get("Model Name") or "").strip() or "Unknown","mac":(r.get("MAC Address") or "").strip(),"serial":(r.get("Serial Number") or "").strip(),"switch":sh,"kemModules":kem_modules}
-                    ip=(r.get("IP Address") or "").strip()
-                    if ip: item["ip"]=ip
-                    det["kem_phones"].append(item)
-                    per_loc_counts[loc]["phonesWithKEM"] +=1
-
-            # Model
-            model = (r.get("Model Name") or "").strip() or "Unknown"
-            if model != "Unknown":
-                try:
-                    from api.stats import is_mac_like
-                    if len(model)<4 or is_mac_like(model):
-                        model="Unknown"
-                except Exception: pass
-            model_counts[model] = model_counts.get(model,0)+1
-            if sh and loc:
-                if is_jva:
-                    jva_model_counts[model] = jva_model_counts.get(model,0)+1
-                    jva_details_by_location.setdefault(loc,{})[model] = jva_details_by_location.setdefault(loc,{}).get(model,0)+1
-                else:
-                    justiz_model_counts[model] = justiz_model_counts.get(model,0)+1
-                    justiz_details_by_location.setdefault(loc,{})[model] = justiz_details_by_location.setdefault(loc,{}).get(model,0)+1
-
-            # VLAN
-            vlan = (r.get("Voice VLAN") or "").strip()
-            if vlan and loc:
-                det = location_details.setdefault(loc,{"vlans":{},"switches":set(),"switch_vlans":{},"kem_phones":[]})
-                det["vlans"][vlan] = det["vlans"].get(vlan,0)+1
-                if sh not in det["switch_vlans"]:
-                    det["switch_vlans"][sh] = {}
-                det["switch_vlans"][sh][vlan] = det["switch_vlans"][sh].get(vlan,0)+1
+        # Stream the file, keeping only the needed columns (deduplicated on the fly);
+        # hostnames and models are then resolved per unique value
+        cols = read_csv_file_columns(str(p), _DETAIL_COLUMNS)
+        hostnames = cols["Switch Hostname"]
+        host_info, row_locs, jva_flags = _host_facts(hostnames)
+
+        raw_models = cols["Model Name"]
+        model_map = {m: _clean_model(m) for m in set(raw_models)}
+        models = list(map(model_map.__getitem__, raw_models))
+        kems = list(map(_kem_modules, cols["KEM"], cols["KEM 2"], cols["Line Number"]))
+
+        # Global aggregates
+        # host_info is keyed by unique switch, so switch counts need no extra sets
+        total_switches = len(host_info)
+        jva_switch_count = sum(1 for _, is_jva in host_info.values() if is_jva)
+        locations = {loc for loc, _ in host_info.values() if loc}
+        jva_locations = {loc for loc, is_jva in host_info.values() if loc and is_jva}
+        justiz_locations = {loc for loc, is_jva in host_info.values() if loc and not is_jva}
+        city_codes = {loc[:3] for loc in locations}
+        jva_city_codes = {loc[:3] for loc in jva_locations}
+        justiz_city_codes = {loc[:3] for loc in justiz_locations}
+
+        jva_kems = list(compress(kems, jva_flags))
+        phones_with_kem_unique = len(kems) - kems.count(0); total_kem_modules = sum(kems)
+        jva_phones_with_kem_unique = len(jva_kems) - jva_kems.count(0); jva_total_kem_modules = sum(jva_kems)
+        justiz_phones_with_kem_unique = phones_with_kem_unique - jva_phones_with_kem_unique
+        justiz_total_kem_modules = total_kem_modules - jva_total_kem_modules
+
+        # Per-location model counts (rows on a switch with a resolvable location only);
+        # the Justiz/JVA model totals are summed from them
+        model_counts: Counter[str] = Counter(models)
+        justiz_details_by_location, jva_details_by_location = _location_model_counts(row_locs, models, jva_flags)
+        justiz_model_counts: Counter[str] = Counter(); jva_model_counts: Counter[str] = Counter()
+        for c in justiz_details_by_location.values(): justiz_model_counts.update(c)
+        for c in jva_details_by_location.values(): jva_model_counts.update(c)
 
         # Format globals
-        phones_by_model = sorted(([{"model":m,"count":c} for m,c in model_counts.items()]), key=lambda x: (-int(x["count"]), x["model"]))
-        phones_by_model_justiz = sorted(([{"model":m,"count":c} for m,c in justiz_model_counts.items()]), key=lambda x: (-int(x["count"]), x["model"]))
-        phones_by_model_jva = sorted(([{"model":m,"count":c} for m,c in jva_model_counts.items()]), key=lambda x: (-int(x["count"]), x["model"]))
+        phones_by_model = _model_count_list(model_counts)
+        phones_by_model_justiz = _model_count_list(justiz_model_counts)
+        phones_by_model_jva = _model_count_list(jva_model_counts)
         total_justiz_phones = sum(justiz_model_counts.values()); total_jva_phones = sum(jva_model_counts.values())
 
-        def _city_name(cd: str) -> str:
-            try:
-                from api.stats import resolve_city_name
-                return resolve_city_name(cd)
-            except Exception: return cd
-
-        phones_by_model_justiz_details = []
-        for loc, models in justiz_details_by_location.items():
-            ml = sorted(([{"model":m,"count":c} for m,c in models.items()]), key=lambda x: (-int(x["count"]), x["model"]))
-            code3 = loc[:3] if len(loc)>=3 else ""; cname=_city_name(code3) if code3 else ""; disp=f"{loc} - {cname}" if cname and cname!=code3 else loc
-            phones_by_model_justiz_details.append({"location":loc,"locationDisplay":disp,"totalPhones":sum(models.values()),"models":ml})
-        phones_by_model_justiz_details.sort(key=lambda x:(-x["totalPhones"], x["location"]))
-
-        phones_by_model_jva_details = []
-        for loc, models in jva_details_by_location.items():
-            ml = sorted(([{"model":m,"count":c} for m,c in models.items()]), key=lambda x: (-int(x["count"]), x["model"]))
-            code3 = loc[:3] if len(loc)>=3 else ""; cname=_city_name(code3) if code3 else ""; disp=f"{loc} - {cname}" if cname and cname!=code3 else loc
-            phones_by_model_jva_details.append({"location":loc,"locationDisplay":disp,"totalPhones":sum(models.values()),"models":ml})
-        phones_by_model_jva_details.sort(key=lambda x:(-x["totalPhones"], x["location"]))
+        # City names for all city codes, resolved with a single map load
+        try:
+            city_names = resolve_city_names(city_codes)
+        except Exception:
+            city_names = {}
+        _city_name = lambda cd: city_names.get(cd, cd)
+
+        phones_by_model_justiz_details = _location_model_details(justiz_details_by_location, _city_name)
+        phones_by_model_jva_details = _location_model_details(jva_details_by_location, _city_name)
 
         metrics = {
-            "totalPhones": len(rows),
-            "totalSwitches": len(switches),
+            "totalPhones": len(hostnames),
+            "totalSwitches": total_switches,
             "totalLocations": len(locations),
             "totalCities": len(city_codes),
             "phonesWithKEM": phones_with_kem_unique,
             "totalKEMs": total_kem_modules,
             "totalJustizPhones": total_justiz_phones,
             "totalJVAPhones": total_jva_phones,
-            "justizSwitches": len(justiz_switches),
+            "justizSwitches": total_switches - jva_switch_count,
             "justizLocations": len(justiz_locations),
             "justizCities": len(justiz_city_codes),
             "justizPhonesWithKEM": justiz_phones_with_kem_unique,
             "totalJustizKEMs": justiz_total_kem_modules,
-            "jvaSwitches": len(jva_switches),
+            "jvaSwitches": jva_switch_count,
             "jvaLocations": len(jva_locations),
             "jvaCities": len(jva_city_codes),
             "jvaPhonesWithKEM": jva_phones_with_kem_unique,
@@ -455,53 +719,26 @@ def snapshot_current_with_details(file_path: Optional[str] = None, force_date: O
             "phonesByModelJVA": phones_by_model_jva,
             "phonesByModelJustizDetails": phones_by_model_justiz_details,
             "phonesByModelJVADetails": phones_by_model_jva_details,
-            "cityCodes": sorted(list(city_codes)),
+            "cityCodes": sorted(city_codes),
         }
 
-        ok = opensearch_config.index_stats_snapshot(file=fm.name, date=date_str, metrics=metrics)
-
-        def vlan_key(item: Dict[str, Any]):
-            v = item["vlan"]
-            try: return (0,int(v))
-            except: return (1,v)
-
-        loc_docs = []
-        for loc, agg in per_loc_counts.items():
-            det = location_details.get(loc,{"vlans":{} ,"switches":set(),"switch_vlans":{},"kem_phones":[]})
-            vlan_usage = sorted(([{"vlan":v,"count":c} for v,c in det["vlans"].items()]), key=vlan_key)
-            switches_fmt = []
-            for sw in sorted(det["switches"]):
-                vl = det.get("switch_vlans",{}).get(sw,{})
-                sw_vlans_sorted = sorted(([{"vlan":v,"count":c} for v,c in vl.items()]), key=vlan_key)
-                switches_fmt.append({"hostname": sw, "vlans": sw_vlans_sorted})
-            jm_raw = justiz_details_by_location.get(loc, {})
-            jvm_raw = jva_details_by_location.get(loc, {})
-            all_raw: Dict[str,int] = {}
-            for source in (jm_raw, jvm_raw):
-                for m,c in source.items():
-                    all_raw[m] = all_raw.get(m,0)+c
-            tolist = lambda d: sorted(([{"model":m,"count":c} for m,c in d.items()]), key=lambda x:(-int(x["count"]), x["model"]))
-            loc_docs.append({
-                "key": loc,
-                "mode": "code",
-                "totalPhones": agg["totalPhones"],
-                "totalSwitches": agg["totalSwitches"],
-                "phonesWithKEM": agg.get("phonesWithKEM",0),
-                "phonesByModel": tolist(all_raw),
-                "phonesByModelJustiz": tolist(jm_raw),
-                "phonesByModelJVA": tolist(jvm_raw),
-                "vlanUsage": vlan_usage,
-                "switches": switches_fmt,
-                "kemPhones": det.get("kem_phones", []),
-            })
-        if loc_docs:
-            logger.info(f"Indexing {len(loc_docs)} location documents to stats_netspeed_loc for file {fm.name}, date {date_str}")
-            opensearch_config.index_stats_location_snapshots(file=fm.name, date=date_str, loc_docs=loc_docs)
-            logger.info(f"Successfully indexed location statistics for {len(loc_docs)} locations")
-        else:
-            logger.warning("No location documents to index - this will cause missing View by Location data!")
+        # The global snapshot write is independent of the location docs: send it
+        # while they are being built and indexed, then collect its result
+        with ThreadPoolExecutor(max_workers=1) as snapshot_pool:
+            stats_future = snapshot_pool.submit(opensearch_config.index_stats_snapshot, file=fm.name, date=date_str, metrics=metrics)
+
+            # One document per resolved location, streamed into the bulk writer as it is built
+            loc_count = len(locations)
+            if loc_count:
+                logger.info(f"Indexing {loc_count} location documents to stats_netspeed_loc for file {fm.name}, date {date_str}")
+                loc_docs = _iter_location_docs(cols, host_info, row_locs, kems, (justiz_details_by_location, jva_details_by_location))
+                opensearch_config.index_stats_location_snapshots(file=fm.name, date=date_str, loc_docs=loc_docs)
+                logger.info(f"Successfully indexed location statistics for {loc_count} locations")
+            else:
+                logger.warning("No location documents to index - this will cause missing View by Location data!")
+            ok = stats_future.result()
 
-        return {"status": "success" if ok else "error", "message": "Snapshot with details indexed" if ok else "Failed to index snapshot with details", "file": fm.name, "date": date_str, "loc_docs": len(loc_docs)}
+        return {"status": "success" if ok else "error", "message": "Snapshot with details indexed" if ok else "Failed to index snapshot with details", "file": fm.name, "date": date_str, "loc_docs": loc_count}
     except Exception as e:
         logger.error(f"snapshot_current_with_details failed: {e}")
         return {"status": "error", "message": str(e)}
@@ -548,26 +785,21 @@ def index_csv(self, file_path: str) -> dict:
         success, count = opensearch_config.index_csv_file(file_path)
 
         # NEU: Stats-Snapshot nach jedem erfolgreichen Index aktualisieren
-        try:
-            from models.file import FileModel as _FM
-            fm = _FM.from_path(file_path)
-            date_str = fm.date.strftime('%Y-%m-%d') if fm.date else None
-            _, _rows = read_csv_file_normalized(file_path)
-            # ...existing code für Statistiken, Modellzählung, Details...
-            # (Kopiere die Logik aus snapshot_current_stats und snapshot_current_with_details falls nötig)
-            # ...existing code...
-            # Kurzfassung: Rufe snapshot_current_stats und snapshot_current_with_details direkt auf
-            # (Dadurch werden alle Statistiken und Details aktualisiert)
+        # Skipped when nothing was indexed. The detail snapshot of this file is also skipped
+        # while the file is unchanged since the last recorded run and its snapshots exist;
+        # it writes the global stats document for its file/date, so the global snapshot
+        # only reads the CSV again when it targets another file or details were skipped
+        if success and count > 0:
+            details_result = None
+            if not _index_csv_snapshots_current(file_path, count):
+                try:
+                    details_result = snapshot_current_with_details(file_path=file_path)
+                except Exception as e:
+                    logger.warning(f"Fehler beim Aktualisieren des Detail-Snapshots: {e}")
             try:
-                snapshot_current_stats(directory_path=str(Path(file_path).parent))
+                snapshot_current_stats(directory_path=str(Path(file_path).parent), details_result=details_result)
             except Exception as e:
                 logger.warning(f"Fehler beim Aktualisieren des globalen Stats-Snapshots: {e}")
-            try:
-                snapshot_current_with_details(file_path=file_path)
-            except Exception as e:
-                logger.warning(f"Fehler beim Aktualisieren des Detail-Snapshots: {e}")
-        except Exception as e:
-            logger.warning(f"Fehler beim Stats-Snapshot nach Index: {e}")
 
         if success:
             return {
@@ -665,6 +897,35 @@ def index_csv(self, file_path: str) -> dict:
         }
 
 
+def _location_snapshot_docs(file_path: Path) -> tuple[str, Optional[str], List[Dict[str, Any]]]:
+    """Build the per-location snapshot docs of one netspeed file.
+
+    Runs in a prefetch thread in backfill_location_snapshots so upcoming files
+    are parsed and aggregated while the current one is written. The docs are
+    cached on disk by file size/mtime/content fingerprint and
+    SNAPSHOT_CACHE_VERSION (utils.snapshot_cache).
+
+    Returns:
+        (file name, snapshot date, loc_docs)
+    """
+    from models.file import FileModel as _FM
+    fm = _FM.from_path(str(file_path))
+    date_str = fm.date.strftime('%Y-%m-%d') if fm.date else None
+    loc_docs = load_snapshot("loc_docs", file_path, SNAPSHOT_CACHE_VERSION)
+    if loc_docs is not None:
+        return fm.name, date_str, loc_docs
+    cols = read_csv_file_columns(str(file_path), _DETAIL_COLUMNS)
+
+    # Backfilled docs count model names as found (empty cells as "Unknown"), without the
+    # short/MAC-like filter of the current snapshot
+    host_info, row_locs, jva_flags = _host_facts(cols["Switch Hostname"])
+    models = [m or "Unknown" for m in cols["Model Name"]]
+    kems = list(map(_kem_modules, cols["KEM"], cols["KEM 2"], cols["Line Number"]))
+    loc_docs = _location_docs(cols, host_info, row_locs, kems, _location_model_counts(row_locs, models, jva_flags))
+    store_snapshot("loc_docs", file_path, loc_docs, SNAPSHOT_CACHE_VERSION)
+    return fm.name, date_str, loc_docs
+
+
 @app.task(name='tasks.backfill_location_snapshots')
 def backfill_location_snapshots(directory_path: str | None = None) -> dict:
     """Backfill per-location snapshots (stats_netspeed_loc) for all netspeed files.
@@ -685,234 +946,98 @@ def backfill_location_snapshots(directory_path: str | None = None) -> dict:
 
         extras = [directory_path] if directory_path else None
         ordered_files = netspeed_files_ordered(extras, include_backups=False)
-        files: List[Path] = []
-        for p in ordered_files:
-            name = p.name
-            if name == "netspeed.csv" or (name.startswith("netspeed.csv.") and name.replace("netspeed.csv.", "").isdigit()):
-                files.append(p)
+        files: List[Path] = [p for p in ordered_files if is_plain_netspeed_file(p)]
         if not files:
             base_dir = Path(directory_path) if directory_path else get_data_root()
             return {"status": "warning", "message": f"No netspeed files found under {base_dir}", "files": 0, "loc_docs": 0}
         processed = 0
         total_loc_docs = 0
-        for f in files:
-            try:
-                from models.file import FileModel as _FM
-                fm = _FM.from_path(str(f))
-                date_str = fm.date.strftime('%Y-%m-%d') if fm.date else None
-                _, rows_original = read_csv_file_normalized(str(f))
-                rows = deduplicate_phone_rows(rows_original)
-                if len(rows) != len(rows_original):
-                    logger.debug(
-                        "backfill_location_snapshots deduplicated %s rows: %d -> %d",
-                        fm.name,
-                        len(rows_original),
-                        len(rows),
-                    )
-
-                # Calculate detailed model stats like index_csv does
-                justiz_details_by_location: Dict[str, Dict[str, int]] = {}
-                jva_details_by_location: Dict[str, Dict[str, int]] = {}
-
-                # Process each row for detailed model calculations
-                for r in rows:
-                    sh = (r.get("Switch Hostname") or "").strip()
-                    model = (r.get("Model Name") or "Unknown").strip()
-                    if not sh:
-                        continue
-
-                    try:
-                        from api.stats import extract_location as _extract_location
-                        location = _extract_location(sh)
-                    except Exception:
-                        location = None
-                    if not location:
-                        continue
-
-                    # Determine if this is JVA or Justiz
-                    try:
-                        from api.stats import is_jva_switch
-                        is_jva = is_jva_switch(sh)
-                    except Exception:
-                        is_jva = False
-
-                    if is_jva:
-                        if location not in jva_details_by_location:
-                            jva_details_by_location[location] = {}
-                        jva_details_by_location[location][model] = jva_details_by_location[location].get(model, 0) + 1
-                    else:
-                        if location not in justiz_details_by_location:
-                            justiz_details_by_location[location] = {}
-                        justiz_details_by_location[location][model] = justiz_details_by_location[location].get(model, 0) + 1
-
-                # Now do the basic location counting (for totalPhones, totalSwitches, phonesWithKEM)
-                per_loc_counts: Dict[str, Dict[str, int]] = {}
-                per_loc_switches: Dict[str, set] = {}
-                for r in rows:
-                    sh = (r.get("Switch Hostname") or "").strip()
-                    if not sh:
-                        continue
-                    try:
-                        from api.stats import extract_location as _extract_location
-                        loc = _extract_location(sh)
-                    except Exception:
-                        loc = None
-                    if not loc:
-                        continue
-                    plc = per_loc_counts.setdefault(loc, {"totalPhones": 0, "phonesWithKEM": 0, "totalSwitches": 0})
-                    plc["totalPhones"] += 1
-                    sset = per_loc_switches.setdefault(loc, set())
-                    if sh not in sset:
-                        sset.add(sh)
-                        plc["totalSwitches"] += 1
-                    # Unique phones with >=1 KEM considering KEM/KEM 2 and Line Number fallback
-                    kem1 = (r.get("KEM") or "").strip()
-                    kem2 = (r.get("KEM 2") or "").strip()
-                    has_kem = bool(kem1) or bool(kem2)
-                    if not has_kem:
-                        ln = (r.get("Line Number") or "").strip()
-                        if "KEM" in ln:
-                            has_kem = True
-                    if has_kem:
-                        plc["phonesWithKEM"] += 1
-
-                # Collect additional details for each location (VLANs, switches, KEM phones)
-                location_details = {}
-                for r in rows:
-                    sh = (r.get("Switch Hostname") or "").strip()
-                    if not sh:
-                        continue
-
-                    # Extract location code
-                    try:
-                        from api.stats import extract_location as _extract_location
-                        location = _extract_location(sh)
-                    except Exception:
-                        location = None
-
-                    if not location:
-                        continue
-
-                    if location not in location_details:
-                        location_details[location] = {
-                            "vlans": {},
-                            "switches": set(),
-                            "kem_phones": []
-                        }
-
-                    # Collect VLAN usage
-                    vlan = (r.get("Voice VLAN") or "").strip()
-                    if vlan:
-                        location_details[location]["vlans"][vlan] = location_details[location]["vlans"].get(vlan, 0) + 1
-
-                    # Collect switches
-                    location_details[location]["switches"].add(sh)
-
-                    # Collect KEM phones (>=1 KEM via KEM/KEM 2 or Line Number). Include even without IP. Track kemModules
-                    kem1 = (r.get("KEM") or "").strip()
-                    kem2 = (r.get("KEM 2") or "").strip()
-                    kem_modules = 0
-                    if kem1:
-                        kem_modules += 1
-                    if kem2:
-                        kem_modules += 1
-                    if kem_modules == 0:
-                        ln = (r.get("Line Number") or "").strip()
-                        if "KEM" in ln:
-                            kem_modules = ln.count("KEM") or 1
-                    if kem_modules > 0:
-                        ip = (r.get("IP Address") or "").strip()
-                        model = (r.get("Model Name") or "").strip() or "Unknown"
-                        mac = (r.get("MAC Address") or "").strip()
-                        serial = (r.get("Serial Number") or "").strip()
-                        item = {
-                            "model": model,
-                            "mac": mac,
-                            "serial": serial,
-                            "switch": sh,
-                            "kemModules": int(kem_modules)
-                        }
-                        if ip:
-                            item["ip"] = ip
-                        location_details[location]["kem_phones"].append(item)
-
-                # Build loc_docs with model details from calculated data
-                loc_docs = []
-                for k, agg in per_loc_counts.items():
-                    # Get model breakdowns for this location
-                    loc_justiz_models = []
-                    loc_jva_models = []
-                    loc_all_models = {}
-
-                    # Extract from justiz details
-                    if k in justiz_details_by_location:
-                        for model, count in justiz_details_by_location[k].items():
-                            loc_justiz_models.append({"model": model, "count": count})
-                            loc_all_models[model] = loc_all_models.get(model, 0) + count
-
-                    # Extract from JVA details
-                    if k in jva_details_by_location:
-                        for model, count in jva_details_by_location[k].items():
-                            loc_jva_models.append({"model": model, "count": count})
-                            loc_all_models[model] = loc_all_models.get(model, 0) + count
-
-                    # Create combined model list
-                    loc_all_models_list = [{"model": m, "count": c} for m, c in loc_all_models.items()]
-                    loc_all_models_list.sort(key=lambda x: (-x["count"], x["model"]))
-                    loc_justiz_models.sort(key=lambda x: (-x["count"], x["model"]))
-                    loc_jva_models.sort(key=lambda x: (-x["count"], x["model"]))
-
-                    # Get additional details for this location
-                    details = location_details.get(k, {"vlans": {}, "switches": set(), "kem_phones": []})
-
-                    # Format VLAN usage and derive summary stats
-                    vlans_dict = details.get("vlans", {}) or {}
-                    raw_vlan_usage = [{"vlan": v, "count": c} for v, c in vlans_dict.items()]
-
-                    # Sort VLANs numerically for full usage list
-                    def vlan_key(item):
-                        v = item["vlan"]
-                        try:
-                            return (0, int(v))
-                        except:
-                            return (1, v)
-
-                    vlan_usage = sorted(raw_vlan_usage, key=vlan_key)
-
-                    # Determine top three VLANs by count (desc) with numeric tie-breaker
-                    top_vlans = sorted(raw_vlan_usage, key=lambda item: (-item["count"], vlan_key(item)))[:3]
-                    unique_vlan_count = len(vlans_dict)
-
-                    # Format switches
-                    switches = [{"hostname": sw} for sw in sorted(details["switches"])]
-
-                    loc_docs.append({
-                        "key": k,
-                        "mode": "code",
-                        "totalPhones": agg["totalPhones"],
-                        "totalSwitches": agg["totalSwitches"],
-                        "phonesWithKEM": agg["phonesWithKEM"],
-                        "phonesByModel": loc_all_models_list,
-                        "phonesByModelJustiz": loc_justiz_models,
-                        "phonesByModelJVA": loc_jva_models,
-                        "vlanUsage": vlan_usage,
-                        "topVLANs": top_vlans,
-                        "uniqueVLANCount": int(unique_vlan_count),
-                        "switches": switches,
-                        "kemPhones": details["kem_phones"]
-                    })
-                if loc_docs:
-                    opensearch_config.index_stats_location_snapshots(file=fm.name, date=date_str, loc_docs=loc_docs)
-                    total_loc_docs += len(loc_docs)
-                processed += 1
-            except Exception as _e:
-                logger.warning(f"Backfill failed for {f}: {_e}")
+        # Parse/aggregate upcoming files in a small pool while the current one is written
+        prefetch_workers = max(1, int(getattr(settings, "INDEX_PREFETCH_WORKERS", 2)))
+        prefetched: Dict[int, Future] = {}
+        with _snapshot_prefetch_pool(prefetch_workers) as prefetch_pool:
+            for i, f in enumerate(files):
+                for j in range(i, min(i + prefetch_workers + 1, len(files))):
+                    if j not in prefetched:
+                        prefetched[j] = prefetch_pool.submit(_location_snapshot_docs, files[j])
+                try:
+                    file_name, date_str, loc_docs = prefetched.pop(i).result()
+                    if loc_docs:
+                        opensearch_config.index_stats_location_snapshots(file=file_name, date=date_str, loc_docs=loc_docs)
+                        total_loc_docs += len(loc_docs)
+                    processed += 1
+                except Exception as _e:
+                    logger.warning(f"Backfill failed for {f}: {_e}")
+        prune_snapshots()
         return {"status": "success", "files": processed, "loc_docs": total_loc_docs}
     except Exception as e:
         logger.error(f"Backfill error: {e}")
         return {"status": "error", "message": str(e)}
 
 
+def _backfill_stats_metrics(file_path: Path) -> Dict[str, Any]:
+    """Compute the stats_netspeed metrics of one netspeed file for backfill_stats_snapshots.
+
+    Results are cached on disk by file size/mtime/content fingerprint and
+    SNAPSHOT_CACHE_VERSION (utils.snapshot_cache), so unchanged history files
+    are only aggregated once.
+    """
+    cached = load_snapshot("stats_metrics", file_path, SNAPSHOT_CACHE_VERSION)
+    if cached is not None:
+        return cached
+    cols = read_csv_file_columns(str(file_path), _SNAPSHOT_COLUMNS)
+    total_phones = len(cols["Switch Hostname"])
+
+    # Unique switches in one set() pass over the hostname column;
+    # locations are then resolved once per switch
+    switches = set(cols["Switch Hostname"])
+    switches.discard("")
+    try:
+        host_locs = extract_locations(switches)
+    except Exception:
+        host_locs = {}
+    locations = {loc for loc in host_locs.values() if loc}
+    city_codes = {loc[:3] for loc in locations}
+
+    kems = list(map(_kem_modules, cols["KEM"], cols["KEM 2"], cols["Line Number"]))
+    phones_with_kem_unique = len(kems) - kems.count(0)
+    total_kem_modules = sum(kems)
+
+    # Empty model cells count as "Unknown", which is left out here
+    model_counts = Counter(cols["Model Name"])
+    model_counts.pop("", None)
+    model_counts.pop("Unknown", None)
+    phones_by_model = _model_count_list(model_counts)
+
+    metrics = {
+        "totalPhones": total_phones,
+        "totalSwitches": len(switches),
+        "totalLocations": len(locations),
+        "totalCities": len(city_codes),
+        "phonesWithKEM": phones_with_kem_unique,
+        "totalKEMs": total_kem_modules,
+        "phonesByModel": phones_by_model,
+        "cityCodes": sorted(city_codes),
+    }
+    store_snapshot("stats_metrics", file_path, metrics, SNAPSHOT_CACHE_VERSION)
+    return metrics
+
+
+# Files per bulk request when backfill_stats_snapshots writes its timeline docs
+_STATS_SNAPSHOT_BATCH_SIZE = 50
+
+
+def _flush_stats_snapshots(pending: List[Dict[str, Any]]) -> None:
+    """Write buffered stats snapshot docs in one bulk request (best-effort) and clear the buffer."""
+    if not pending:
+        return
+    try:
+        opensearch_config.index_stats_snapshots(list(pending))
+    except Exception as _e:
+        logger.warning(f"Backfill stats write failed for {len(pending)} files: {_e}")
+    pending.clear()
+
+
 @app.task(name='tasks.backfill_stats_snapshots')
 def backfill_stats_snapshots(directory_path: str | None = None) -> dict:
     """Backfill global stats snapshots (stats_netspeed) for all netspeed files.
@@ -934,84 +1059,31 @@ def backfill_stats_snapshots(directory_path: str | None = None) -> dict:
 
         extras = [directory_path] if directory_path else None
         ordered_files = netspeed_files_ordered(extras, include_backups=False)
-        files: List[Path] = []
-        for p in ordered_files:
-            name = p.name
-            if name == "netspeed.csv" or (name.startswith("netspeed.csv.") and name.replace("netspeed.csv.", "").isdigit()):
-                files.append(p)
+        files: List[Path] = [p for p in ordered_files if is_plain_netspeed_file(p)]
         if not files:
             base_dir = Path(directory_path) if directory_path else get_data_root()
             return {"status": "warning", "message": f"No netspeed files found under {base_dir}", "files": 0}
         processed = 0
-        for f in files:
-            try:
-                from models.file import FileModel as _FM
-                fm = _FM.from_path(str(f))
-                date_str = fm.date.strftime('%Y-%m-%d') if fm.date else None
-                _, rows_original = read_csv_file_normalized(str(f))
-                rows = deduplicate_phone_rows(rows_original)
-                if len(rows) != len(rows_original):
-                    logger.debug(
-                        "backfill_stats_snapshots deduplicated %s rows: %d -> %d",
-                        fm.name,
-                        len(rows_original),
-                        len(rows),
-                    )
-
-                total_phones = len(rows)
-                switches: set[str] = set()
-                locations: set[str] = set()
-                city_codes: set[str] = set()
-                phones_with_kem_unique = 0
-                total_kem_modules = 0
-                model_counts: Dict[str, int] = {}
-
-                for r in rows:
-                    sh = (r.get("Switch Hostname") or "").strip()
-                    if sh:
-                        switches.add(sh)
-                        try:
-                            from api.stats import extract_location
-                            loc = extract_location(sh)
-                            if loc:
-                                locations.add(loc)
-                                city_codes.add(loc[:3])
-                        except Exception:
-                            pass
-
-                    kem_count = 0
-                    if (r.get("KEM") or "").strip():
-                        kem_count += 1
-                    if (r.get("KEM 2") or "").strip():
-                        kem_count += 1
-                    if kem_count == 0:
-                        ln = (r.get("Line Number") or "").strip()
-                        if "KEM" in ln:
-                            kem_count = ln.count("KEM") or 1
-                    if kem_count > 0:
-                        phones_with_kem_unique += 1
-                        total_kem_modules += kem_count
-
-                    model = (r.get("Model Name") or "").strip() or "Unknown"
-                    if model != "Unknown":
-                        model_counts[model] = model_counts.get(model, 0) + 1
-
-                phones_by_model = [{"model": m, "count": c} for m, c in model_counts.items()]
-
-                metrics = {
-                    "totalPhones": total_phones,
-                    "totalSwitches": len(switches),
-                    "totalLocations": len(locations),
-                    "totalCities": len(city_codes),
-                    "phonesWithKEM": phones_with_kem_unique,
-                    "totalKEMs": total_kem_modules,
-                    "phonesByModel": phones_by_model,
-                    "cityCodes": sorted(list(city_codes)),
-                }
-                opensearch_config.index_stats_snapshot(file=fm.name, date=date_str, metrics=metrics)
-                processed += 1
-            except Exception as _e:
-                logger.warning(f"Backfill stats failed for {f}: {_e}")
+        # Snapshot docs are written in batches of files, one bulk request each
+        pending: List[Dict[str, Any]] = []
+        # Files are aggregated in parallel (metrics are small), results are collected in order
+        workers = max(1, int(getattr(settings, "INDEX_PREFETCH_WORKERS", 2)))
+        with _snapshot_prefetch_pool(workers) as pool:
+            futures = [pool.submit(_backfill_stats_metrics, f) for f in files]
+            for f, future in zip(files, futures):
+                try:
+                    from models.file import FileModel as _FM
+                    fm = _FM.from_path(str(f))
+                    date_str = fm.date.strftime('%Y-%m-%d') if fm.date else None
+                    metrics = future.result()
+                    pending.append({"file": fm.name, "date": date_str, "metrics": metrics})
+                    processed += 1
+                    if len(pending) >= _STATS_SNAPSHOT_BATCH_SIZE:
+                        _flush_stats_snapshots(pending)
+                except Exception as _e:
+                    logger.warning(f"Backfill stats failed for {f}: {_e}")
+        _flush_stats_snapshots(pending)
+        prune_snapshots()
         return {"status": "success", "files": processed}
     except Exception as e:
         logger.error(f"Backfill stats error: {e}")
@@ -1043,8 +1115,7 @@ def rebuild_stats_snapshots_deduplicated(directory_path: str | None = None) -> d
             logger.debug(f"Refresh after dedupe rebuild failed: {refresh_err}")
 
         try:
-            from api.stats import invalidate_caches as _invalidate
-            _invalidate("rebuild stats snapshots deduplicated")
+            invalidate_caches("rebuild stats snapshots deduplicated")
         except Exception as cache_err:
             logger.debug(f"Cache invalidation after dedupe rebuild failed: {cache_err}")
 
@@ -1109,15 +1180,100 @@ def _ensure_opensearch_available(directory_label: str) -> dict | None:
     return None
 
 
-def _check_concurrent_indexing(task_request, directory_label: str, extras: List[str] | None) -> dict | None:
+# Redis lock held by index_all_csv_files; the TTL outlives task_time_limit so a killed
+# worker cannot block indexing for good
+_INDEX_LOCK_KEY = "csv-viewer:index_all_csv_files:lock"
+_INDEX_LOCK_TTL_SECONDS = 60 * 60
+# Delete the lock only if it still holds our task id (atomic compare-and-delete)
+_RELEASE_LOCK_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+
+@lru_cache(maxsize=1)
+def _redis_client() -> Redis:
+    # Short timeouts: an unreachable Redis falls back to the index-state guard quickly
+    return Redis.from_url(settings.REDIS_URL, decode_responses=True, socket_connect_timeout=2, socket_timeout=2)
+
+
+def _lock_owner(task_request) -> str:
+    """Lock owner for one index run: the Celery task id, or a unique id for direct calls."""
+    task_id = getattr(task_request, 'id', None) or os.environ.get('CELERY_TASK_ID')
+    return str(task_id) if task_id else f"manual-{uuid4()}"
+
+
+def _active_index_run(task_id: str) -> Optional[str]:
+    """Task id of another index run the index state records as running, if any.
+
+    Fallback guard while Redis is unreachable; entries older than the lock TTL
+    are ignored so a killed run cannot block indexing for good.
+    """
+    try:
+        active = load_state().get("active") or {}
+        existing = active.get("task_id")
+        if active.get("status") != "running" or not existing or existing == task_id:
+            return None
+        started = datetime.fromisoformat(str(active.get("started_at")))
+        if (datetime.now(started.tzinfo) - started).total_seconds() > _INDEX_LOCK_TTL_SECONDS:
+            return None
+        return existing
+    except Exception as e:
+        logger.warning(f"Failed to check for concurrent tasks: {e}")
+        return None
+
+
+def _acquire_index_lock(task_id: str) -> tuple[bool, Optional[str]]:
+    """Atomically take the index lock with SET NX EX.
+
+    Returns (acquired, holder). When Redis is unreachable the running run
+    recorded in the index state is checked instead (_active_index_run).
+    """
+    try:
+        client = _redis_client()
+        if client.set(_INDEX_LOCK_KEY, task_id, nx=True, ex=_INDEX_LOCK_TTL_SECONDS):
+            return True, None
+        holder = client.get(_INDEX_LOCK_KEY)
+        if holder is None:
+            # Released or expired in between; compete for it again like any other task
+            if client.set(_INDEX_LOCK_KEY, task_id, nx=True, ex=_INDEX_LOCK_TTL_SECONDS):
+                return True, None
+            return False, client.get(_INDEX_LOCK_KEY)
+        if holder == task_id:
+            # A retry of the same task refreshes its own lock
+            client.set(_INDEX_LOCK_KEY, task_id, ex=_INDEX_LOCK_TTL_SECONDS)
+            return True, None
+        return False, holder
+    except Exception as e:
+        logger.warning(f"Index lock unavailable, falling back to the index state: {e}")
+        existing = _active_index_run(task_id)
+        return existing is None, existing
+
+
+def _release_index_lock(task_id: str) -> None:
+    try:
+        _redis_client().eval(_RELEASE_LOCK_SCRIPT, 1, _INDEX_LOCK_KEY, task_id)
+    except Exception as e:
+        logger.debug(f"Index lock release failed: {e}")
+
+
+def _check_concurrent_indexing(lock_owner: str, directory_label: str, extras: List[str] | None) -> dict | None:
     """
-    Check for concurrent indexing tasks and create pre-index snapshot.
+    Take the index lock for ``lock_owner`` (see _acquire_index_lock) and create the pre-index snapshot.
 
     Returns:
         dict | None: Error response dict if concurrent task found, None if safe to proceed
+        (the caller then owns the lock and must release it)
     """
+    current_task_id = lock_owner
+    acquired, existing_task_id = _acquire_index_lock(current_task_id)
+    if not acquired:
+        logger.warning(f"Another indexing task {existing_task_id} is already running. Aborting task {current_task_id}")
+        return {
+            "status": "aborted",
+            "message": f"Another indexing task {existing_task_id} is already running",
+            "directory": directory_label,
+            "files_processed": 0,
+            "total_documents": 0,
+        }
     try:
-        pre_state = load_state()
         current_file_path = resolve_current_file(extras)
         if current_file_path is not None:
             try:
@@ -1128,32 +1284,35 @@ def _check_concurrent_indexing(task_request, directory_label: str, extras: List[
                 result = snapshot_current_with_details(file_path=str(current_file_path), force_date=today_str)
                 logger.info(f"Pre-index snapshot_current_with_details result: {result}")
                 try:
-                    from api.stats import invalidate_caches as _invalidate
-                    _invalidate("pre-index location stats creation")
+                    invalidate_caches("pre-index location stats creation")
                 except Exception as cache_e:
                     logger.debug(f"Cache invalidation failed (pre-index): {cache_e}")
             except Exception as e:
                 logger.warning(f"Pre-index snapshot_current_with_details failed: {e}")
         else:
             logger.info("No current netspeed.csv detected in candidates before indexing")
-        active_task = pre_state.get("active_task", {})
-        if active_task.get("status") == "running":
-            existing_task_id = active_task.get("task_id")
-            current_task_id = getattr(task_request, 'id', 'unknown')
-            if existing_task_id and existing_task_id != current_task_id:
-                logger.warning(f"Another indexing task {existing_task_id} is already running. Aborting task {current_task_id}")
-                return {
-                    "status": "aborted",
-                    "message": f"Another indexing task {existing_task_id} is already running",
-                    "directory": directory_label,
-                    "files_processed": 0,
-                    "total_documents": 0,
-                }
     except Exception as e:
-        logger.warning(f"Failed to check for concurrent tasks: {e}")
+        logger.warning(f"Pre-index snapshot failed: {e}")
     return None
 
 
+def _update_progress_throttled(task, meta: Dict[str, Any], last_sent: float, min_interval: float = 0.5) -> float:
+    """Send a Celery PROGRESS update unless the previous one was less than min_interval seconds ago.
+
+    Counterpart of save_state_throttled for the result backend; the task's
+    final result replaces the last PROGRESS state, so skipped updates are
+    never stale for long. Returns the monotonic time of the last update sent.
+    """
+    now = time.monotonic()
+    if now - last_sent < min_interval:
+        return last_sent
+    try:
+        task.update_state(state='PROGRESS', meta=meta)
+    except Exception:
+        pass
+    return now
+
+
 @app.task(bind=True, name='tasks.index_all_csv_files')
 def index_all_csv_files(self, directory_path: str | None = None) -> dict:
     """Index all CSV files and persist snapshots with correct KEM semantics.
@@ -1171,48 +1330,19 @@ def index_all_csv_files(self, directory_path: str | None = None) -> dict:
     if availability_error:
         return availability_error
 
-    # Protection against concurrent indexing tasks
-    concurrent_error = _check_concurrent_indexing(self.request, directory_label, extras)
+    # Protection against concurrent indexing tasks (holds the Redis index lock on success)
+    lock_owner = _lock_owner(self.request)
+    concurrent_error = _check_concurrent_indexing(lock_owner, directory_label, extras)
     if concurrent_error:
         return concurrent_error
-
-    # Protection against concurrent indexing tasks
     try:
-        pre_state = load_state()
-        current_file_path = resolve_current_file(extras)
-        if current_file_path is not None:
-            try:
-                logger.info("Executing snapshot_current_with_details for detected current netspeed.csv before bulk indexing (location stats fix)")
-                from tasks.tasks import snapshot_current_with_details
-                from datetime import datetime as _dt
-                today_str = _dt.now().strftime('%Y-%m-%d')
-                result = snapshot_current_with_details(file_path=str(current_file_path), force_date=today_str)
-                logger.info(f"Pre-index snapshot_current_with_details result: {result}")
-                try:
-                    from api.stats import invalidate_caches as _invalidate
-                    _invalidate("pre-index location stats creation")
-                except Exception as cache_e:
-                    logger.debug(f"Cache invalidation failed (pre-index): {cache_e}")
-            except Exception as e:
-                logger.warning(f"Pre-index snapshot_current_with_details failed: {e}")
-        else:
-            logger.info("No current netspeed.csv detected in candidates before indexing")
-        active_task = pre_state.get("active_task", {})
-        if active_task.get("status") == "running":
-            existing_task_id = active_task.get("task_id")
-            current_task_id = getattr(self.request, 'id', 'unknown')
-            if existing_task_id and existing_task_id != current_task_id:
-                logger.warning(f"Another indexing task {existing_task_id} is already running. Aborting task {current_task_id}")
-                return {
-                    "status": "aborted",
-                    "message": f"Another indexing task {existing_task_id} is already running",
-                    "directory": directory_label,
-                    "files_processed": 0,
-                    "total_documents": 0,
-                }
-    except Exception as e:
-        logger.warning(f"Failed to check for concurrent tasks: {e}")
+        return _run_index_all_csv_files(self, extras, directory_label, directory_path)
+    finally:
+        _release_index_lock(lock_owner)
+
 
+def _run_index_all_csv_files(self, extras: List[str] | None, directory_label: str, directory_path: str | None = None) -> dict:
+    """Body of index_all_csv_files, run while the index lock is held (``self`` is the bound task)."""
     historical_files, current_file_candidate, backup_files = collect_netspeed_files(extras, include_backups=True)
     ordered_files: List[Path] = []
     # CRITICAL: Index current file FIRST, then historical files
@@ -1248,13 +1378,12 @@ def index_all_csv_files(self, directory_path: str | None = None) -> dict:
         task_id = getattr(self.request, 'id', os.environ.get('CELERY_TASK_ID', 'manual'))
         try:
             start_active(index_state, task_id, len(ordered_files))
-            save_state(index_state)
             try:
                 from config import settings as _settings
                 update_active(index_state, broker=_settings.REDIS_URL, opensearch=_settings.OPENSEARCH_URL)
-                save_state(index_state)
             except Exception:
                 pass
+            save_state(index_state)
             try:
                 self.update_state(state='PROGRESS', meta={"task_id": task_id, "status": "running", "current_file": None, "index": 0, "total_files": len(ordered_files), "documents_indexed": 0})
             except Exception:
@@ -1264,223 +1393,114 @@ def index_all_csv_files(self, directory_path: str | None = None) -> dict:
 
         start_time = datetime.utcnow()
 
-        for i, file_path in enumerate(ordered_files):
-            logger.info(f"Processing file {i+1}/{len(ordered_files)}: {file_path}")
-            try:
-                update_active(index_state, current_file=file_path.name, index=i + 1)
-                save_state(index_state)
+        # Resume an interrupted run over the same files (same paths and mtimes) at its next file
+        files_hash = files_fingerprint(ordered_files)
+        start_index = 0
+        checkpoint = load_checkpoint(files_hash)
+        if checkpoint:
+            start_index = min(int(checkpoint.get("next_index") or 0), len(ordered_files))
+            total_documents = int(checkpoint.get("total_documents") or 0)
+            results = list(checkpoint.get("results") or [])
+            logger.info(f"Resuming indexing run {checkpoint.get('run_id')} at file {start_index + 1}/{len(ordered_files)}")
+
+        # Parse/aggregate upcoming files in a small pool while the current one is written;
+        # files are still indexed and reported strictly in order.
+        prefetch_workers = max(1, int(getattr(settings, "INDEX_PREFETCH_WORKERS", 2)))
+        prefetched: Dict[int, Future] = {}
+        # On-disk progress is written at most every few seconds, Celery PROGRESS at most twice a second
+        last_state_save = float("-inf")
+        last_progress = float("-inf")
+
+        # Suspend periodic index refreshes while bulk writing; restored (and refreshed) afterwards
+        with _snapshot_prefetch_pool(prefetch_workers) as prefetch_pool, opensearch_config.bulk_ingest_settings():
+            for i, file_path in enumerate(ordered_files[start_index:], start_index):
+                for j in range(i, min(i + prefetch_workers + 1, len(ordered_files))):
+                    if j not in prefetched:
+                        # Unchanged files skip aggregation; their rows are still needed for the search index
+                        prefetched[j] = prefetch_pool.submit(_prepare_file_snapshot, ordered_files[j], not _snapshots_current(str(ordered_files[j])))
+                logger.info(f"Processing file {i+1}/{len(ordered_files)}: {file_path}")
                 try:
-                    self.update_state(state='PROGRESS', meta={"task_id": getattr(self.request, 'id', None), "status": "running", "current_file": file_path.name, "index": i + 1, "total_files": len(ordered_files), "documents_indexed": total_documents})
+                    update_active(index_state, current_file=file_path.name, index=i + 1)
+                    last_state_save = save_state_throttled(index_state, last_state_save)
+                    last_progress = _update_progress_throttled(self, {"task_id": getattr(self.request, 'id', None), "status": "running", "current_file": file_path.name, "index": i + 1, "total_files": len(ordered_files), "documents_indexed": total_documents}, last_progress)
                 except Exception:
                     pass
-            except Exception:
-                pass
-
-            try:
-                success, count = opensearch_config.index_csv_file(str(file_path))
-                total_documents += count
-
-                # Count lines (excluding header)
-                line_count = count_unique_data_rows(file_path)
-
-                try:
-                    update_file_state(index_state, file_path, line_count, count)
-                except Exception as e:
-                    logger.warning(f"Failed to update index state for {file_path}: {e}")
-
-                results.append({"file": str(file_path), "success": success, "count": count, "line_count": line_count})
-                logger.info(f"Completed {file_path}: {count} documents indexed")
 
-                # Stats snapshot for timeline (best-effort) using correct semantics
                 try:
-                    from models.file import FileModel as _FM
-                    fm = _FM.from_path(str(file_path))
-                    date_str = fm.date.strftime('%Y-%m-%d') if fm.date else None
-                    _, _rows_original = read_csv_file_normalized(str(file_path))
-                    _rows = deduplicate_phone_rows(_rows_original)
-                    if len(_rows) != len(_rows_original):
-                        logger.debug(
-                            "index_all_csv_files deduplicated %s rows: %d -> %d",
-                            fm.name,
-                            len(_rows_original),
-                            len(_rows),
-                        )
-
-                    total_phones = len(_rows)
-                    switches = set(); locations = set(); city_codes = set()
-                    phones_with_kem_unique = 0; total_kem_modules = 0
-                    model_counts: Dict[str, int] = {}; justiz_model_counts: Dict[str, int] = {}; jva_model_counts: Dict[str, int] = {}
-                    justiz_switches = set(); justiz_locations = set(); justiz_city_codes = set(); justiz_phones_with_kem_unique = 0; justiz_total_kem_modules = 0
-                    jva_switches = set(); jva_locations = set(); jva_city_codes = set(); jva_phones_with_kem_unique = 0; jva_total_kem_modules = 0
-
-                    try:
-                        from api.stats import extract_location as _extract_location, is_jva_switch as _is_jva_switch, is_mac_like as _is_mac_like
-                    except Exception:
-                        _extract_location = lambda _value: None  # type: ignore
-                        _is_jva_switch = lambda _value: False  # type: ignore
-                        _is_mac_like = lambda _value: False  # type: ignore
-
-                    for r in _rows:
-                        sh = (r.get("Switch Hostname") or "").strip()
-                        loc = None
-                        is_jva = False
-                        if sh:
-                            switches.add(sh)
-                            try:
-                                loc = _extract_location(sh)
-                            except Exception:
-                                loc = None
-                            if loc:
-                                locations.add(loc)
-                                city_codes.add(loc[:3])
-                            try:
-                                is_jva = _is_jva_switch(sh)
-                            except Exception:
-                                is_jva = False
-                            if is_jva:
-                                jva_switches.add(sh)
-                                if loc:
-                                    jva_locations.add(loc)
-                                    jva_city_codes.add(loc[:3])
-                            else:
-                                justiz_switches.add(sh)
-                                if loc:
-                                    justiz_locations.add(loc)
-                                    justiz_city_codes.add(loc[:3])
-
-                        model = (r.get("Model Name") or "").strip() or "Unknown"
-                        if model != "Unknown":
-                            try:
-                                if len(model) < 4 or _is_mac_like(model):
-                                    model = "Unknown"
-                            except Exception:
-                                pass
-                        model_counts[model] = model_counts.get(model, 0) + 1
-                        if is_jva:
-                            jva_model_counts[model] = jva_model_counts.get(model, 0) + 1
-                        else:
-                            justiz_model_counts[model] = justiz_model_counts.get(model, 0) + 1
-
-                        kem_count = 0
-                        if (r.get("KEM") or "").strip():
-                            kem_count += 1
-                        if (r.get("KEM 2") or "").strip():
-                            kem_count += 1
-                        if kem_count == 0:
-                            ln = (r.get("Line Number") or "").strip()
-                            if "KEM" in ln:
-                                kem_count = ln.count("KEM") or 1
-                        if kem_count > 0:
-                            phones_with_kem_unique += 1
-                            total_kem_modules += kem_count
-                            if is_jva:
-                                jva_phones_with_kem_unique += 1
-                                jva_total_kem_modules += kem_count
-                            else:
-                                justiz_phones_with_kem_unique += 1
-                                justiz_total_kem_modules += kem_count
-
-                    phones_by_model = [{"model": m, "count": c} for m, c in model_counts.items()]
-                    phones_by_model.sort(key=lambda x: (-x["count"], x["model"]))
-                    phones_by_model_justiz = [{"model": m, "count": c} for m, c in justiz_model_counts.items()]; phones_by_model_justiz.sort(key=lambda x: (-x["count"], x["model"]))
-                    phones_by_model_jva = [{"model": m, "count": c} for m, c in jva_model_counts.items()]; phones_by_model_jva.sort(key=lambda x: (-x["count"], x["model"]))
-                    total_justiz_phones = sum(justiz_model_counts.values()); total_jva_phones = sum(jva_model_counts.values())
-
-                    metrics = {
-                        "totalPhones": total_phones,
-                        "totalSwitches": len(switches),
-                        "totalLocations": len(locations),
-                        "totalCities": len(city_codes),
-                        "phonesWithKEM": phones_with_kem_unique,
-                        "totalKEMs": total_kem_modules,
-                        "totalJustizPhones": total_justiz_phones,
-                        "totalJVAPhones": total_jva_phones,
-                        "justizSwitches": len(justiz_switches),
-                        "justizLocations": len(justiz_locations),
-                        "justizCities": len(justiz_city_codes),
-                        "justizPhonesWithKEM": justiz_phones_with_kem_unique,
-                        "totalJustizKEMs": justiz_total_kem_modules,
-                        "jvaSwitches": len(jva_switches),
-                        "jvaLocations": len(jva_locations),
-                        "jvaCities": len(jva_city_codes),
-                        "jvaPhonesWithKEM": jva_phones_with_kem_unique,
-                        "totalJVAKEMs": jva_total_kem_modules,
-                        "phonesByModel": phones_by_model,
-                        "phonesByModelJustiz": phones_by_model_justiz,
-                        "phonesByModelJVA": phones_by_model_jva,
-                        "cityCodes": sorted(list(city_codes)),
-                    }
-                    opensearch_config.index_stats_snapshot(file=fm.name, date=date_str, metrics=metrics)
-
-                    # Basic per-location snapshots (unique KEM phones)
+                    # Parsed rows for the search index and snapshots; the unique line count comes from the same read
+                    prepared: Optional[Dict[str, Any]] = None
                     try:
-                        per_loc_counts: Dict[str, Dict[str, int]] = {}
-                        per_loc_switches: Dict[str, set] = {}
-                        for r in _rows:
-                            sh2 = (r.get("Switch Hostname") or "").strip()
-                            if not sh2:
-                                continue
-                            try:
-                                from api.stats import extract_location as _extract_location
-                                loc2 = _extract_location(sh2)
-                            except Exception:
-                                loc2 = None
-                            if not loc2:
-                                continue
-                            plc = per_loc_counts.setdefault(loc2, {"totalPhones": 0, "phonesWithKEM": 0, "totalSwitches": 0})
-                            plc["totalPhones"] += 1
-                            sset = per_loc_switches.setdefault(loc2, set())
-                            if sh2 not in sset:
-                                sset.add(sh2)
-                                plc["totalSwitches"] += 1
-                            kem1 = (r.get("KEM") or "").strip()
-                            kem2 = (r.get("KEM 2") or "").strip()
-                            has_kem = bool(kem1) or bool(kem2)
-                            if not has_kem:
-                                ln = (r.get("Line Number") or "").strip()
-                                if "KEM" in ln:
-                                    has_kem = True
-                            if has_kem:
-                                plc["phonesWithKEM"] += 1
-                        loc_docs = [
-                            {
-                                "key": k,
-                                "mode": "code",
-                                "totalPhones": agg["totalPhones"],
-                                "totalSwitches": agg["totalSwitches"],
-                                "phonesWithKEM": agg["phonesWithKEM"],
-                            }
-                            for k, agg in per_loc_counts.items()
-                        ]
-                        if loc_docs:
-                            opensearch_config.index_stats_location_snapshots(file=fm.name, date=date_str, loc_docs=loc_docs)
+                        prepared = prefetched.pop(i).result()
                     except Exception as _e:
-                        logger.debug(f"Per-location snapshot indexing failed for {file_path}: {_e}")
-                except Exception as _e:
-                    logger.debug(f"Stats snapshot failed for {file_path}: {_e}")
+                        logger.warning(f"Prefetched snapshot preparation failed for {file_path}: {_e}; retrying inline")
+                        # Retried here, as the file is recorded as indexed below and
+                        # later runs would otherwise never write its snapshots
+                        try:
+                            prepared = _prepare_file_snapshot(file_path)
+                        except Exception as _e2:
+                            logger.warning(f"Snapshot preparation failed for {file_path}: {_e2}")
+
+                    # Without prepared rows index_csv_file reads the file itself
+                    success, count = opensearch_config.index_csv_file(str(file_path), rows=prepared["rows"] if prepared else None)
+                    total_documents += count
+                    # Checked before update_file_state records this run; the stats and archive
+                    # snapshots must still exist, e.g. after those indices were recreated
+                    snapshots_current = (
+                        success
+                        and prepared is not None
+                        and _snapshots_current(str(file_path), count)
+                        and _snapshot_docs_exist(prepared["file"], prepared["date"])
+                    )
 
-                # Archive snapshot
-                try:
-                    if '_rows' not in locals():
-                        _, _rows_fallback = read_csv_file_normalized(str(file_path))
-                        _rows = deduplicate_phone_rows(_rows_fallback)
-                    opensearch_config.index_archive_snapshot(file=file_path.name, date=date_str, rows=_rows)
-                except Exception as _e:
-                    logger.debug(f"Archive snapshot failed for {file_path}: {_e}")
+                    # Count lines (excluding header)
+                    line_count = prepared.get("line_count") if prepared else None
+                    if line_count is None:
+                        line_count = count_unique_data_rows(file_path)
 
-                # Progress update
-                try:
-                    update_active(index_state, current_file=file_path.name, index=i + 1, documents_indexed=total_documents)
+                    try:
+                        update_file_state(index_state, file_path, line_count, count)
+                    except Exception as e:
+                        logger.warning(f"Failed to update index state for {file_path}: {e}")
+
+                    results.append({"file": str(file_path), "success": success, "count": count, "line_count": line_count})
+                    logger.info(f"Completed {file_path}: {count} documents indexed")
+
+                    # Stats, per-location and archive snapshots (best-effort) in one bulk write;
+                    # skipped for files unchanged since their snapshots were written
+                    if snapshots_current:
+                        logger.debug(f"Snapshots of {file_path} are current; skipping aggregation and snapshot writes")
+                    elif prepared is not None:
+                        if not prepared["aggregated"]:
+                            prepared["metrics"], prepared["loc_docs"] = _file_snapshot_aggregates(prepared["rows"], file_path)
+                        try:
+                            opensearch_config.index_file_snapshots(
+                                file=prepared["file"],
+                                date=prepared["date"],
+                                metrics=prepared["metrics"],
+                                loc_docs=prepared["loc_docs"],
+                                rows=prepared["rows"],
+                                refresh=False,
+                            )
+                        except Exception as _e:
+                            logger.debug(f"Snapshot indexing failed for {file_path}: {_e}")
+
+                    # Progress update
+                    try:
+                        update_active(index_state, current_file=file_path.name, index=i + 1, documents_indexed=total_documents)
+                    except Exception as e:
+                        logger.debug(f"Progress update failed: {e}")
+                    last_progress = _update_progress_throttled(self, {"task_id": task_id, "status": "running", "current_file": file_path.name, "index": i + 1, "total_files": len(ordered_files), "documents_indexed": total_documents}, last_progress)
+                    # Unthrottled: a resumed run skips every file before the checkpoint,
+                    # so their state records must be on disk first
                     save_state(index_state)
+                    last_state_save = time.monotonic()
+                    save_checkpoint(task_id, files_hash, i + 1, total_documents, results)
                 except Exception as e:
-                    logger.debug(f"Progress update failed: {e}")
-                try:
-                    self.update_state(state='PROGRESS', meta={"task_id": task_id, "status": "running", "current_file": file_path.name, "index": i + 1, "total_files": len(ordered_files), "documents_indexed": total_documents})
-                except Exception:
-                    pass
-            except Exception as e:
-                logger.error(f"Error indexing {file_path}: {e}")
-                results.append({"file": str(file_path), "success": False, "error": str(e), "count": 0})
+                    logger.error(f"Error indexing {file_path}: {e}")
+                    results.append({"file": str(file_path), "success": False, "error": str(e), "count": 0})
+                    prefetched.pop(i, None)
+
+        clear_checkpoint()
 
         # Persist state
         last_success_ts = None
@@ -1533,8 +1553,7 @@ def index_all_csv_files(self, directory_path: str | None = None) -> dict:
 
             # Cache invalidation after final snapshots
             try:
-                from api.stats import invalidate_caches as _invalidate
-                _invalidate("final snapshots complete")
+                invalidate_caches("final snapshots complete")
                 logger.info("Caches invalidated after final snapshots")
             except Exception as e:
                 logger.debug(f"Cache invalidation after final snapshots failed: {e}")
@@ -1,12 +1,16 @@
 import csv
 import hashlib
+import io
 import json
 import logging
 import os
 import re
 from datetime import datetime
+from functools import lru_cache
+from itertools import chain
+from operator import methodcaller
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional, Any
+from typing import List, Dict, Iterable, Iterator, Tuple, Optional, Any
 
 from utils.path_utils import collect_netspeed_files
 
@@ -14,6 +18,9 @@ from utils.path_utils import collect_netspeed_files
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Read buffer for full-file CSV passes (1 MiB instead of the 8 KiB default)
+CSV_READ_BUFFER_SIZE = 1 << 20
+
 # Define base headers for different known formats
 LEGACY_COLUMN_RENAMES = {
     "Speed Switch-Port": "Switch Port Mode",
@@ -251,11 +258,12 @@ def _normalize_field(value: Any, uppercase: bool = False) -> str:
 
 def phone_row_identity(row: Dict[str, Any]) -> str:
     """Derive a stable identity for a phone row to support de-duplication."""
-    serial = _normalize_field(row.get("Serial Number"), uppercase=True)
-    mac1 = _normalize_field(row.get("MAC Address"), uppercase=True)
-    mac2 = _normalize_field(row.get("MAC Address 2"), uppercase=True)
-    line_number = _normalize_field(row.get("Line Number"))
-    ip_address = _normalize_field(row.get("IP Address"))
+    get = row.get
+    serial = _normalize_field(get("Serial Number"), uppercase=True)
+    mac1 = _normalize_field(get("MAC Address"), uppercase=True)
+    mac2 = _normalize_field(get("MAC Address 2"), uppercase=True)
+    line_number = _normalize_field(get("Line Number"))
+    ip_address = _normalize_field(get("IP Address"))
 
     if serial:
         return f"serial::{serial}"
@@ -277,20 +285,31 @@ def phone_row_identity(row: Dict[str, Any]) -> str:
 
 def _kem_module_count(row: Dict[str, Any]) -> int:
     """Return the number of detected KEM modules for a phone row."""
-    kem_modules = 0
-    for field in ("KEM", "KEM 2"):
-        value = (row.get(field) or "").strip()
-        if value:
-            kem_modules += 1
+    get = row.get
+    kem1, kem2 = get("KEM"), get("KEM 2")
+    kem_modules = (1 if kem1 and kem1.strip() else 0) + (1 if kem2 and kem2.strip() else 0)
     if kem_modules:
         return kem_modules
-    line_number = (row.get("Line Number") or "").upper()
+    line_number = (get("Line Number") or "").upper()
     if "KEM" in line_number:
         count = line_number.count("KEM")
         return count or 1
     return 0
 
 
+def _dedupe_identity(row: Dict[str, Any]) -> str:
+    """phone_row_identity with a raw-payload hash fallback for unhashable rows."""
+    try:
+        return phone_row_identity(row)
+    except Exception:
+        pass
+    try:
+        payload = json.dumps(row, sort_keys=True, default=str)
+    except Exception:
+        payload = str(row)
+    return f"raw::{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
+
+
 def deduplicate_phone_rows(rows: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
     """Return a list of phone rows with duplicates (based on identity) removed."""
     if not rows:
@@ -300,17 +319,7 @@ def deduplicate_phone_rows(rows: Optional[List[Dict[str, Any]]]) -> List[Dict[st
     order: List[str] = []
 
     for row in rows:
-        try:
-            identity = phone_row_identity(row)
-        except Exception:
-            identity = None
-        if identity is None:
-            try:
-                payload = json.dumps(row, sort_keys=True, default=str)
-            except Exception:
-                payload = str(row)
-            identity = f"raw::{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
-
+        identity = _dedupe_identity(row)
         if identity not in best_rows:
             best_rows[identity] = row
             order.append(identity)
@@ -324,6 +333,58 @@ def deduplicate_phone_rows(rows: Optional[List[Dict[str, Any]]]) -> List[Dict[st
     return [best_rows[identity] for identity in order]
 
 
+def rows_to_columns(rows: List[Dict[str, Any]], fields: Tuple[str, ...] | List[str]) -> Dict[str, List[str]]:
+    """Project row dictionaries into stripped per-column value lists.
+
+    Aggregations that only touch a handful of columns can then work on flat
+    lists (set/Counter/zip) instead of re-reading every row dictionary.
+    Missing or None values become empty strings; empty cells skip strip().
+    """
+    return {field: [v.strip() if v else "" for v in map(methodcaller("get", field), rows)] for field in fields}
+
+
+def read_csv_file_columns(file_path: str, fields: Tuple[str, ...] | List[str], deduplicate: bool = True) -> Dict[str, List[str]]:
+    """Read selected columns of a CSV file into stripped per-column lists.
+
+    Rows are streamed from iter_csv_file_normalized and only ``fields`` are
+    kept, so the file is never held as a list of row dictionaries. Cells are
+    already stripped by intelligent_column_mapping, so values are only
+    defaulted to "" here. With
+    ``deduplicate`` the deduplicate_phone_rows rules are applied on the fly:
+    the first occurrence of a phone keeps its position and a duplicate with
+    more KEM modules replaces its values.
+    """
+    fields = tuple(fields)
+    _, rows = iter_csv_file_normalized(file_path)
+    if deduplicate:
+        best: Dict[str, Tuple[int, Tuple[str, ...]]] = {}
+        for row in rows:
+            identity = _dedupe_identity(row)
+            kem_modules = _kem_module_count(row)
+            current = best.get(identity)
+            if current is None or kem_modules > current[0]:
+                best[identity] = (kem_modules, tuple(v or "" for v in map(row.get, fields)))
+        projected = [values for _, values in best.values()]
+    else:
+        projected = [tuple(v or "" for v in map(row.get, fields)) for row in rows]
+    if not projected:
+        return {field: [] for field in fields}
+    return {field: list(values) for field, values in zip(fields, zip(*projected))}
+
+
+def _count_unique_lines(lines: Iterable[str]) -> int:
+    """Count unique, non-empty lines after the first (header) line."""
+    iterator = iter(lines)
+    if not next(iterator, ""):
+        return 0
+    unique_rows: set[str] = set()
+    for raw_line in iterator:
+        normalized = raw_line.rstrip('\r\n')
+        if normalized.strip():
+            unique_rows.add(normalized)
+    return len(unique_rows)
+
+
 def count_unique_data_rows(file_path: str | Path | Any, opener: Optional[Any] = None) -> int:
     """Count unique, non-empty data rows in a CSV export, excluding the header."""
     open_fn = opener or open
@@ -338,19 +399,8 @@ def count_unique_data_rows(file_path: str | Path | Any, opener: Optional[Any] =
         else:
             target = str(file_path)
 
-        unique_rows: set[str] = set()
-        with open_fn(target, 'r', newline='') as handle:
-            first_line = handle.readline()
-            if not first_line:
-                return 0
-            for raw_line in handle:
-                normalized = raw_line.rstrip('\r\n')
-                if not normalized.strip():
-                    continue
-                if normalized in unique_rows:
-                    continue
-                unique_rows.add(normalized)
-        return len(unique_rows)
+        with open_fn(target, 'r', newline='', buffering=CSV_READ_BUFFER_SIZE) as handle:
+            return _count_unique_lines(handle)
     except Exception as exc:
         logger.debug("Failed to count unique rows for %s: %s", file_path, exc)
         return 0
@@ -396,23 +446,22 @@ def _map_modern_format_row(row: List[str], headers: List[str]) -> Dict[str, str]
     will be recognized without code changes.
 
     Args:
-        row: Data cells from CSV row
+        row: Stripped data cells from CSV row (see intelligent_column_mapping)
         headers: Header names from first row of CSV file
 
     Returns:
         Dictionary mapping canonical field names to values
     """
-    cells = [c.strip() for c in row]
     mapped: Dict[str, str] = {}
 
     # Map each cell to its canonical name based on CSV headers
     # This automatically handles ANY column count and ANY new columns
     for idx, source_header in enumerate(headers):
-        if idx >= len(cells):
+        if idx >= len(row):
             break
         canonical = _get_display_name(source_header)
         if canonical:
-            mapped[canonical] = cells[idx]
+            mapped[canonical] = row[idx]
 
     return mapped
 
@@ -658,26 +707,63 @@ def filter_display_columns(headers: List[str], data: List[Dict[str, Any]]) -> Tu
     # IMPORTANT: Always return ALL columns, even if they're empty in this particular result set
     # This ensures consistent column display across all searches and matches Settings configuration
     display_headers = get_csv_column_order()
-
-    # Filter data to only include displayed columns, copying legacy values when necessary
-    filtered_data = []
-    for row in data:
-        filtered_row = {}
-        row_with_aliases = dict(row)
-        for legacy, renamed in LEGACY_COLUMN_RENAMES.items():
-            if legacy in row_with_aliases and renamed not in row_with_aliases:
-                row_with_aliases[renamed] = row_with_aliases[legacy]
-        for alias, canonical in CALL_MANAGER_ALIASES.items():
-            if alias in row_with_aliases and canonical not in row_with_aliases:
-                row_with_aliases[canonical] = row_with_aliases[alias]
-        for header in display_headers:
-            # Include column even if value is missing - will show as empty
-            filtered_row[header] = row_with_aliases.get(header, "")
-        filtered_data.append(filtered_row)
+    projection = _display_projection(tuple(display_headers))
+
+    # Include every column even if the value is missing - it will show as empty
+    filtered_data = [
+        {
+            header: row.get(source, "") if source is not None else _first_present(row, sources)
+            for header, source, sources in projection
+        }
+        for row in data
+    ]
 
     return display_headers, filtered_data
 
 
+@lru_cache(maxsize=32)
+def _display_projection(display_headers: Tuple[str, ...]) -> Tuple[Tuple[str, Optional[str], Tuple[str, ...]], ...]:
+    """Column plan for filter_display_columns, computed once per header order.
+
+    Each entry is (header, single source key or None, all source keys);
+    headers without legacy/alias fallbacks are read with a plain row.get.
+    """
+    plan = []
+    for header in display_headers:
+        sources = _column_sources(header)
+        plan.append((header, sources[0] if len(sources) == 1 else None, sources))
+    return tuple(plan)
+
+
+def _first_present(row: Dict[str, Any], sources: Tuple[str, ...]) -> Any:
+    """Value of the first key in ``sources`` present in row ("" when none is)."""
+    for source in sources:
+        if source in row:
+            return row[source]
+    return ""
+
+
+def _column_sources(header: str) -> Tuple[str, ...]:
+    """Return the row keys that may supply ``header``, in lookup priority order.
+
+    Mirrors the legacy rename pass followed by the Call Manager alias pass: the
+    canonical key wins, then legacy names, then Call Manager aliases (which may
+    themselves be filled from a legacy name).
+    """
+    def with_legacy(name: str) -> List[str]:
+        return [name] + [legacy for legacy, renamed in LEGACY_COLUMN_RENAMES.items() if renamed == name]
+
+    sources = with_legacy(header)
+    for alias, canonical in CALL_MANAGER_ALIASES.items():
+        if canonical == header:
+            sources.extend(with_legacy(alias))
+    return tuple(dict.fromkeys(sources))
+
+
+# Header order keyed by (path, mtime_ns, size) of the current CSV file
+_COLUMN_ORDER_CACHE: Dict[Tuple[str, int, int], List[str]] = {}
+
+
 def get_csv_column_order() -> list:
     """
     Liefert die Spaltenreihenfolge (inkl. OpenSearch-Mapping) gemäß aktueller CSV-Datei.
@@ -689,6 +775,11 @@ def get_csv_column_order() -> list:
         from utils.path_utils import resolve_current_file
         current_file = resolve_current_file()
         if current_file and current_file.exists():
+            st = current_file.stat()
+            cache_key = (str(current_file), st.st_mtime_ns, st.st_size)
+            cached = _COLUMN_ORDER_CACHE.get(cache_key)
+            if cached is not None:
+                return metadata_fields + cached
             with open(current_file, 'r', encoding='utf-8-sig') as f:
                 first_line = f.readline().strip()
                 if ';' in first_line:
@@ -700,6 +791,9 @@ def get_csv_column_order() -> list:
                 for raw_header in raw_headers:
                     display_name = _get_display_name(raw_header.strip())
                     csv_headers.append(display_name)
+            # Only the current file's order is worth keeping around
+            _COLUMN_ORDER_CACHE.clear()
+            _COLUMN_ORDER_CACHE[cache_key] = list(csv_headers)
     except Exception as e:
         logger.warning(f"Could not read CSV header order, falling back to default: {e}")
     return metadata_fields + csv_headers
@@ -733,7 +827,7 @@ def read_csv_file(file_path: str) -> Tuple[List[str], List[Dict[str, Any]]]:
         all_rows = []
         file_headers = None  # Will be populated if file has headers
 
-        with open(file_path, 'r', newline='') as csv_file:
+        with open(file_path, 'r', newline='', buffering=CSV_READ_BUFFER_SIZE) as csv_file:
             content = csv_file.read()
             csv_file.seek(0)
 
@@ -789,10 +883,8 @@ def read_csv_file(file_path: str) -> Tuple[List[str], List[Dict[str, Any]]]:
             if not row:
                 continue
 
-            cleaned_row = [cell.strip() for cell in row]
-
-            # Map row using headers (modern) or pattern detection (legacy)
-            row_dict = intelligent_column_mapping(cleaned_row, headers=file_headers)
+            # Map row using headers (modern) or pattern detection (legacy); cells are stripped there
+            row_dict = intelligent_column_mapping(row, headers=file_headers)
 
             # Merge KEM information into Line Number for display
             line_number = row_dict.get("Line Number", "")
@@ -837,71 +929,92 @@ def read_csv_file(file_path: str) -> Tuple[List[str], List[Dict[str, Any]]]:
         return [], []
 
 
-def read_csv_file_normalized(file_path: str) -> Tuple[List[str], List[Dict[str, Any]]]:
-    """Read a CSV file and return normalized dictionaries with ALL fields preserved.
+class _TrailingDelimiterReader:
+    """csv.reader wrapper that drops the empty cell produced by a trailing delimiter."""
 
-    MODERN files (with timestamp): Reads headers from first row - fully automatic.
-    LEGACY files (without headers): Uses pattern detection - temporary solution.
+    def __init__(self, csv_file, delimiter):
+        self.reader = csv.reader(csv_file, delimiter=delimiter)
+        self.delimiter = delimiter
 
-    This variant preserves original KEM/KEM 2 fields (doesn't merge into Line Number).
-    Intended for backend analytics (statistics) where full field access is required.
+    def __iter__(self):
+        return self
 
-    Returns:
-        Tuple of (headers, rows) where headers are canonical field names
-    """
-    try:
-        # Read and parse CSV
-        all_rows = []
-        file_headers = None
+    def __next__(self):
+        row = next(self.reader)
+        if row and row[-1] == '':
+            original_line = self.delimiter.join(row)
+            if original_line.endswith(self.delimiter):
+                return row[:-1]
+        return row
 
-        with open(file_path, 'r', newline='') as csv_file:
-            content = csv_file.read()
-            csv_file.seek(0)
 
-            delimiter = ';' if ';' in content else ','
+def iter_csv_file_normalized(
+    file_path: str, stats: Optional[Dict[str, int]] = None
+) -> Tuple[Optional[List[str]], Iterator[Dict[str, Any]]]:
+    """Open a CSV file and normalize its data rows lazily.
 
-            class TrailingDelimiterReader:
-                def __init__(self, csv_file, delimiter):
-                    self.reader = csv.reader(csv_file, delimiter=delimiter)
-                    self.delimiter = delimiter
+    Same parsing rules as read_csv_file_normalized, but rows are parsed from the
+    already-read content and mapped one at a time, so no intermediate list of
+    raw rows is built. The header row (if any) is detected eagerly.
 
-                def __iter__(self):
-                    return self
+    Args:
+        file_path: Path to the CSV file
+        stats: Optional dict that receives "unique_data_rows" (see read_csv_file_normalized)
 
-                def __next__(self):
-                    row = next(self.reader)
-                    if row and row[-1] == '':
-                        original_line = self.delimiter.join(row)
-                        if original_line.endswith(self.delimiter):
-                            return row[:-1]
-                    return row
+    Returns:
+        Tuple of (file_headers, rows) where file_headers is the raw header row or
+        None for legacy files, and rows yields normalized dictionaries.
+    """
+    with open(file_path, 'r', newline='', buffering=CSV_READ_BUFFER_SIZE) as csv_file:
+        content = csv_file.read()
+    if stats is not None:
+        stats["unique_data_rows"] = _count_unique_lines(io.StringIO(content, newline=''))
+
+    delimiter = ';' if ';' in content else ','
+    reader = _TrailingDelimiterReader(io.StringIO(content, newline=''), delimiter)
+
+    first = next(reader, None)
+    if first is None:
+        return None, iter(())
+
+    # Check if first row is headers
+    file_headers: Optional[List[str]] = None
+    pending: Tuple[List[str], ...] = (first,)
+    first_row = [cell.strip().lstrip("\ufeff") for cell in first]
+    if _is_header_row(first_row):
+        file_headers = first_row
+        pending = ()
+
+    def _rows() -> Iterator[Dict[str, Any]]:
+        for row in chain(pending, reader):
+            if not row:
+                continue
+            yield intelligent_column_mapping(row, headers=file_headers)
 
-            reader = TrailingDelimiterReader(csv_file, delimiter)
-            all_rows = list(reader)
+    return file_headers, _rows()
 
-        if not all_rows:
-            return generate_headers_for_legacy_file(16), []
 
-        # Check if first row is headers
-        first_row = [cell.strip().lstrip("\ufeff") for cell in all_rows[0]]
-        if _is_header_row(first_row):
-            file_headers = first_row
-            all_rows = all_rows[1:]  # Skip header row
+def read_csv_file_normalized(file_path: str, stats: Optional[Dict[str, int]] = None) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Read a CSV file and return normalized dictionaries with ALL fields preserved.
 
-        if not all_rows:
-            if file_headers:
-                return [_get_display_name(h) for h in file_headers], []
-            return generate_headers_for_legacy_file(16), []
+    MODERN files (with timestamp): Reads headers from first row - fully automatic.
+    LEGACY files (without headers): Uses pattern detection - temporary solution.
 
-        # Process data rows
-        normalized_rows: List[Dict[str, Any]] = []
-        for row in all_rows:
-            if not row:
-                continue
+    This variant preserves original KEM/KEM 2 fields (doesn't merge into Line Number).
+    Intended for backend analytics (statistics) where full field access is required.
 
-            cleaned_row = [cell.strip() for cell in row]
-            row_dict = intelligent_column_mapping(cleaned_row, headers=file_headers)
-            normalized_rows.append(row_dict)
+    Args:
+        file_path: Path to the CSV file
+        stats: Optional dict that receives "unique_data_rows" (same semantics as
+            count_unique_data_rows) computed from the content already in memory,
+            sparing callers a second pass over the file.
+
+    Returns:
+        Tuple of (headers, rows) where headers are canonical field names
+    """
+    try:
+        file_headers, row_iter = iter_csv_file_normalized(file_path, stats=stats)
+        normalized_rows = list(row_iter)
 
         # Determine headers list
         if file_headers:
@@ -917,6 +1030,36 @@ def read_csv_file_normalized(file_path: str) -> Tuple[List[str], List[Dict[str,
         return generate_headers_for_legacy_file(16), []
 
 
+# Whitespace-only lines, which the preview row count skips
+_BLANK_LINE_RE = re.compile(r"^[^\S\n]*\n", re.MULTILINE)
+
+
+def _count_remaining_lines(handle: Any) -> int:
+    """Count the non-blank lines left in an open text file over large blocks.
+
+    str.count/regex matching run in C per block instead of building one
+    string per line. Each block is cut after its last newline (the rest is
+    carried into the next one) so whitespace-only lines are recognised across
+    block boundaries and subtracted; a final line without trailing newline is
+    counted unless blank.
+    """
+    count = 0
+    carry = ""
+    while True:
+        block = handle.read(CSV_READ_BUFFER_SIZE)
+        if not block:
+            break
+        text = carry + block
+        cut = text.rfind("\n") + 1
+        carry = text[cut:]
+        if cut:
+            text = text[:cut]
+            count += text.count("\n") - sum(1 for _ in _BLANK_LINE_RE.finditer(text))
+    if carry.strip():
+        count += 1
+    return count
+
+
 def read_csv_file_preview(file_path: str, limit: int = 100) -> Tuple[List[str], List[Dict[str, Any]], int]:
     """Read only the first N rows of a CSV file for fast preview.
 
@@ -979,15 +1122,12 @@ def read_csv_file_preview(file_path: str, limit: int = 100) -> Tuple[List[str],
                 if i >= limit:
                     break
                 if row:
-                    rows_read.append([cell.strip() for cell in row])
+                    rows_read.append(row)
 
             # Estimate total count by counting remaining lines quickly
             total_lines = len(rows_read)
             try:
-                # Quick count of remaining lines
-                for line in csv_file:
-                    if line.strip():
-                        total_lines += 1
+                total_lines += _count_remaining_lines(csv_file)
             except Exception:
                 # If counting fails, use what we have
                 pass
@@ -1,10 +1,16 @@
 import json
 import os
 import hashlib
+import time
 from urllib.parse import urlparse
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+
+try:
+    import orjson
+except ImportError:  # optional: state files fall back to the stdlib json encoder
+    orjson = None
 
 
 def _env_host(url: str) -> str:
@@ -49,6 +55,9 @@ def _compute_state_file() -> Path:
 
 
 STATE_FILE = _compute_state_file()
+# Progress of an interrupted index_all_csv_files run, next to the state file
+CHECKPOINT_FILE = STATE_FILE.with_name(STATE_FILE.stem + ".checkpoint.json")
+CHECKPOINT_MAX_AGE_SECONDS = 24 * 3600
 
 def _now_iso() -> str:
     return datetime.utcnow().replace(tzinfo=timezone.utc).isoformat()
@@ -74,17 +83,42 @@ def load_state() -> Dict[str, Any]:
         pass
     return {"last_run": None, "last_success": None, "files": {}, "totals": {"files_processed": 0, "total_documents": 0}, "active": None}
 
+def _write_json_atomic(path: Path, data: Dict[str, Any]) -> None:
+    """Write data as JSON to a temp file and move it over path (orjson when installed)."""
+    payload: Optional[bytes] = None
+    if orjson is not None:
+        try:
+            payload = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            payload = None
+    if payload is None:
+        payload = json.dumps(data).encode("utf-8")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(payload)
+    tmp.replace(path)
+
 def save_state(state: Dict[str, Any]) -> None:
     try:
-        STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
-        tmp = STATE_FILE.with_suffix(".tmp")
-        with open(tmp, "w") as f:
-            json.dump(state, f)
-        tmp.replace(STATE_FILE)
+        _write_json_atomic(STATE_FILE, state)
     except Exception:
         # Best-effort; ignore persistence errors
         pass
 
+def save_state_throttled(state: Dict[str, Any], last_saved: float, min_interval: float = 2.0) -> float:
+    """Save state unless the previous save was less than min_interval seconds ago.
+
+    Intended for progress updates inside loops; callers still do a final
+    save_state() so the last update is never lost. Returns the monotonic
+    timestamp of the most recent save (unchanged when the save was skipped).
+    """
+    now = time.monotonic()
+    if now - last_saved < min_interval:
+        return last_saved
+    save_state(state)
+    return now
+
 def file_signature(path: Path) -> Dict[str, Any]:
     st = path.stat()
     return {"size": st.st_size, "mtime": st.st_mtime}
@@ -133,3 +167,47 @@ def clear_active(state: Dict[str, Any], final_status: str) -> None:
     # Frontend treats non-running as finished and will rely on last_success timestamp for health.
     # Optionally could null it out:
     # state["active"] = None
+
+def files_fingerprint(paths: List[Path]) -> str:
+    """Hash of the ordered file list and mtimes; a checkpoint is only valid for the same set."""
+    h = hashlib.sha1()
+    for p in paths:
+        try:
+            mtime = p.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        h.update(f"{p}|{mtime}\n".encode("utf-8"))
+    return h.hexdigest()
+
+def save_checkpoint(run_id: str, files_hash: str, next_index: int, total_documents: int, results: List[Dict[str, Any]]) -> None:
+    try:
+        _write_json_atomic(CHECKPOINT_FILE, {
+            "run_id": run_id,
+            "files_hash": files_hash,
+            "next_index": next_index,
+            "total_documents": total_documents,
+            "results": results,
+            "timestamp": time.time(),
+        })
+    except Exception:
+        # Best-effort; a lost checkpoint only means a full re-run
+        pass
+
+def load_checkpoint(files_hash: str) -> Optional[Dict[str, Any]]:
+    """Return the checkpoint of an interrupted run over the same files, if recent enough."""
+    try:
+        with open(CHECKPOINT_FILE, "r") as f:
+            cp = json.load(f)
+    except Exception:
+        return None
+    if cp.get("files_hash") != files_hash:
+        return None
+    if time.time() - float(cp.get("timestamp") or 0) > CHECKPOINT_MAX_AGE_SECONDS:
+        return None
+    return cp
+
+def clear_checkpoint() -> None:
+    try:
+        CHECKPOINT_FILE.unlink()
+    except OSError:
+        pass
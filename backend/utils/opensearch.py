@@ -1,20 +1,54 @@
 from opensearchpy import OpenSearch, helpers
+from opensearchpy.serializer import JSONSerializer
 from config import settings
 import logging
 import re
+import threading
 import time
+from contextlib import contextmanager
+from itertools import chain
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Generator, Optional, Tuple
+from typing import List, Dict, Any, Generator, Iterable, Iterator, Optional, Tuple
 from .csv_utils import read_csv_file, read_csv_file_normalized
-from utils.path_utils import collect_netspeed_files, get_data_root, _configured_roots, _within_allowed_roots
+from utils.path_utils import NETSPEED_PLAIN_PATTERN, collect_netspeed_files, get_data_root, _configured_roots, _within_allowed_roots
 import os
 
+try:
+    import orjson
+except ImportError:  # optional: request bodies fall back to the stdlib json encoder
+    orjson = None
+
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Per-thread memo of netspeed file-name discovery, active only inside search()
+_FILE_NAME_SCOPE = threading.local()
+
+
+class _OrjsonSerializer(JSONSerializer):
+    """JSONSerializer that encodes request bodies with orjson.
+
+    Bulk snapshot writes (archive rows, location docs) spend most of their
+    client-side time in json.dumps. Anything orjson rejects is encoded by the
+    stdlib serializer as before.
+    """
+
+    def dumps(self, data: Any) -> str:
+        if isinstance(data, str):
+            return data
+        try:
+            return orjson.dumps(data, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            return super().dumps(data)
+
+
+def _client_serializer() -> JSONSerializer:
+    """Serializer passed to new OpenSearch clients (orjson when installed)."""
+    return _OrjsonSerializer() if orjson is not None else JSONSerializer()
+
 
 class OpenSearchUnavailableError(RuntimeError):
     """Raised when OpenSearch cannot be reached within a grace period."""
@@ -405,7 +439,8 @@ class OpenSearchConfig:
                     'ssl_show_warn': False,
                     'request_timeout': 30,
                     'retry_on_timeout': True,
-                    'max_retries': 2
+                    'max_retries': 2,
+                    'serializer': _client_serializer(),
                 }
                 if pwd:
                     opensearch_params['http_auth'] = ('admin', pwd)
@@ -430,7 +465,8 @@ class OpenSearchConfig:
                         'ssl_show_warn': False,
                         'request_timeout': 30,
                         'retry_on_timeout': True,
-                        'max_retries': 1
+                        'max_retries': 1,
+                        'serializer': _client_serializer(),
                     }
                     if pwd:
                         params['http_auth'] = ('admin', pwd)
@@ -951,6 +987,18 @@ class OpenSearchConfig:
             logger.error(f"Error creating stats loc index {self.stats_loc_index}: {e}")
             return False
 
+    def _stats_snapshot_action(self, *, file: str, date: str | None, metrics: dict) -> Dict[str, Any]:
+        """Build the bulk action for a timeline snapshot document."""
+        action: Dict[str, Any] = {
+            "_op_type": "index",
+            "_index": self.stats_index,
+            "_source": {"file": file, "date": date, **metrics},
+        }
+        # Use deterministic id to avoid duplicates if re-run: file + date
+        if date:
+            action["_id"] = f"{file}:{date}"
+        return action
+
     def index_stats_snapshot(self, *, file: str, date: str | None, metrics: dict) -> bool:
         """Index a single timeline snapshot document.
 
@@ -961,17 +1009,50 @@ class OpenSearchConfig:
         """
         try:
             self.create_stats_index()
-            # Use deterministic id to avoid duplicates if re-run: file + date
-            doc_id = None
-            if date:
-                doc_id = f"{file}:{date}"
-            body = {"file": file, "date": date, **metrics}
-            self.client.index(index=self.stats_index, id=doc_id, body=body)
+            action = self._stats_snapshot_action(file=file, date=date, metrics=metrics)
+            self.client.index(index=self.stats_index, id=action.get("_id"), body=action["_source"])
             return True
         except Exception as e:
             logger.error(f"Error indexing stats snapshot for {file}@{date}: {e}")
             return False
 
+    def index_stats_snapshots(self, snapshots: Iterable[Dict[str, Any]]) -> bool:
+        """Bulk index timeline snapshot documents of several files in one bulk stream.
+
+        Each item carries the index_stats_snapshot keyword arguments
+        (file, date, metrics), so backfills can write many files per request.
+        """
+        try:
+            self.create_stats_index()
+            _, failed = self._parallel_bulk(
+                (self._stats_snapshot_action(**snapshot) for snapshot in snapshots),
+                chunk_size=500,
+            )
+            if failed:
+                logger.warning(f"Stats snapshot bulk had {failed} failed docs")
+            return not failed
+        except Exception as e:
+            logger.error(f"Error bulk indexing stats snapshots: {e}")
+            return False
+
+    def has_stats_snapshot(self, *, file: str, date: Optional[str]) -> bool:
+        """Return True when a stats snapshot document exists for file and date (HEAD request, no _source)."""
+        if not date:
+            return False
+        try:
+            return bool(self.client.exists(index=self.stats_index, id=f"{file}:{date}"))
+        except Exception:
+            return False
+
+    def has_archive_snapshot(self, *, file: str, date: Optional[str]) -> bool:
+        """Return True when the archive holds a snapshot for file and date (HEAD on its first row id)."""
+        if not date:
+            return False
+        try:
+            return bool(self.client.exists(index=self.archive_index, id=f"{file}:{date}:1"))
+        except Exception:
+            return False
+
     def get_stats_snapshot(self, *, file: str, date: Optional[str]) -> Optional[Dict[str, Any]]:
         """Fetch an existing stats snapshot document by file and date.
 
@@ -1004,7 +1085,38 @@ class OpenSearchConfig:
             logger.error(f"Error fetching stats snapshot for {file}@{date}: {e}")
             return None
 
-    def index_stats_location_snapshots(self, *, file: str, date: str | None, loc_docs: List[Dict[str, Any]]) -> bool:
+    def _stats_location_actions(self, *, file: str, date: str, loc_docs: Iterable[Dict[str, Any]]) -> Generator[Dict[str, Any], None, None]:
+        """Yield bulk actions for per-location snapshot docs (docs without key are skipped)."""
+        for d in loc_docs:
+            key = d.get('key')
+            if not key:
+                continue
+            body = {
+                "file": file,
+                "date": date,
+                "key": key,
+                "mode": d.get('mode', 'code'),
+                "totalPhones": int(d.get('totalPhones', 0)),
+                "totalSwitches": int(d.get('totalSwitches', 0)),
+                "phonesWithKEM": int(d.get('phonesWithKEM', 0)),
+                "phonesByModel": d.get('phonesByModel', []),
+                "phonesByModelJustiz": d.get('phonesByModelJustiz', []),
+                "phonesByModelJVA": d.get('phonesByModelJVA', []),
+                "vlanUsage": d.get('vlanUsage', []),
+                "topVLANs": d.get('topVLANs', []),
+                "uniqueVLANCount": int(d.get('uniqueVLANCount', 0) or 0),
+                "switches": d.get('switches', []),
+                "kemPhones": d.get('kemPhones', []),
+            }
+            doc_id = f"{file}:{date}:{key}"
+            yield {
+                "_op_type": "index",
+                "_index": self.stats_loc_index,
+                "_id": doc_id,
+                "_source": body,
+            }
+
+    def index_stats_location_snapshots(self, *, file: str, date: str | None, loc_docs: Iterable[Dict[str, Any]]) -> bool:
         """Bulk index per-location snapshot docs for a given file/date.
 
         Each doc in loc_docs must contain: { key, mode='code', totalPhones, totalSwitches, phonesWithKEM, phonesByModel, phonesByModelJustiz, phonesByModelJVA }
@@ -1014,38 +1126,12 @@ class OpenSearchConfig:
             if not date:
                 from datetime import datetime as _dt
                 date = _dt.utcnow().strftime('%Y-%m-%d')
-            actions = []
-            for d in loc_docs:
-                key = d.get('key')
-                if not key:
-                    continue
-                body = {
-                    "file": file,
-                    "date": date,
-                    "key": key,
-                    "mode": d.get('mode', 'code'),
-                    "totalPhones": int(d.get('totalPhones', 0)),
-                    "totalSwitches": int(d.get('totalSwitches', 0)),
-                    "phonesWithKEM": int(d.get('phonesWithKEM', 0)),
-                    "phonesByModel": d.get('phonesByModel', []),
-                    "phonesByModelJustiz": d.get('phonesByModelJustiz', []),
-                    "phonesByModelJVA": d.get('phonesByModelJVA', []),
-                    "vlanUsage": d.get('vlanUsage', []),
-                    "topVLANs": d.get('topVLANs', []),
-                    "uniqueVLANCount": int(d.get('uniqueVLANCount', 0) or 0),
-                    "switches": d.get('switches', []),
-                    "kemPhones": d.get('kemPhones', []),
-                }
-                doc_id = f"{file}:{date}:{key}"
-                actions.append({
-                    "_op_type": "index",
-                    "_index": self.stats_loc_index,
-                    "_id": doc_id,
-                    "_source": body,
-                })
-            if not actions:
-                return True
-            helpers.bulk(self.client, actions)
+            # Location docs carry KEM phone and switch lists, so they are streamed in small chunks
+            self._parallel_bulk(
+                self._stats_location_actions(file=file, date=date, loc_docs=loc_docs),
+                chunk_size=500,
+                raise_on_error=True,
+            )
             return True
         except Exception as e:
             logger.error(f"Error indexing stats per-location for {file}@{date}: {e}")
@@ -1089,60 +1175,90 @@ class OpenSearchConfig:
             logger.error(f"Error creating archive index {self.archive_index}: {e}")
             return False
 
-    def index_archive_snapshot(self, *, file: str, date: str | None, rows: List[Dict[str, Any]]) -> Tuple[bool, int]:
+    def _prepare_archive_snapshot(self, *, file: str, snapshot_date: str) -> None:
+        """Apply archive retention and drop an existing snapshot for file+date (best-effort)."""
+        # Retention: keep only the last 4 years (approx). Best-effort cleanup.
+        try:
+            from config import settings as _settings
+            years = getattr(_settings, 'ARCHIVE_RETENTION_YEARS', 4)
+            self.purge_archive_older_than_years(years)
+        except Exception:
+            pass
+        # Delete existing snapshot docs (best-effort)
+        try:
+            self.client.delete_by_query(
+                index=self.archive_index,
+                body={
+                    "query": {
+                        "bool": {
+                            "must": [
+                                {"term": {"snapshot_file": file}},
+                                {"term": {"snapshot_date": snapshot_date}}
+                            ]
+                        }
+                    }
+                }
+            )
+        except Exception:
+            pass
+
+    def _parallel_bulk(self, actions: Iterable[Dict[str, Any]], *, chunk_size: int, raise_on_error: bool = False) -> Tuple[int, int]:
+        """Stream bulk actions through helpers.parallel_bulk.
+
+        Chunks are sent from OPENSEARCH_BULK_THREADS worker threads while the
+        action generator builds the next ones, so serialization overlaps with
+        OpenSearch I/O. Actions are consumed lazily.
+
+        Returns:
+            (succeeded, failed) document counts
+        """
+        threads = max(1, int(getattr(settings, "OPENSEARCH_BULK_THREADS", 2)))
+        success = failed = 0
+        for ok, _item in helpers.parallel_bulk(
+            self.client,
+            actions,
+            thread_count=threads,
+            chunk_size=chunk_size,
+            max_chunk_bytes=10 * 1024 * 1024,
+            raise_on_error=raise_on_error,
+            request_timeout=60,
+        ):
+            if ok:
+                success += 1
+            else:
+                failed += 1
+        return success, failed
+
+    def _archive_actions(self, *, file: str, snapshot_date: str, rows: Iterable[Dict[str, Any]]) -> Generator[Dict[str, Any], None, None]:
+        """Yield archive bulk actions with sequential ids for idempotency (rows are consumed lazily)."""
+        for i, r in enumerate(rows, start=1):
+            # Ensure string values; keep existing fields
+            doc = {k: (str(v) if v is not None else "") for k, v in r.items()}
+            doc["snapshot_date"] = snapshot_date
+            doc["snapshot_file"] = file
+            yield {
+                "_index": self.archive_index,
+                "_id": f"{file}:{snapshot_date}:{i}",
+                "_source": doc
+            }
+
+    def index_archive_snapshot(self, *, file: str, date: str | None, rows: Iterable[Dict[str, Any]]) -> Tuple[bool, int]:
         """Persist a full snapshot of rows for a given file/date into the archive index.
 
         This deletes any existing snapshot for the same file+date, then bulk-indexes the rows
         with additional fields snapshot_date and snapshot_file. Uses sequential ids for idempotency.
+        rows may be any iterable (e.g. a row generator); actions are built and sent chunk by chunk.
         """
         try:
             if not self.create_archive_index():
                 return False, 0
-            # Retention: keep only the last 4 years (approx). Best-effort cleanup.
-            try:
-                from config import settings as _settings
-                years = getattr(_settings, 'ARCHIVE_RETENTION_YEARS', 4)
-                self.purge_archive_older_than_years(years)
-            except Exception:
-                pass
             snapshot_date = date or datetime.utcnow().strftime('%Y-%m-%d')
-            # Delete existing snapshot docs (best-effort)
-            try:
-                self.client.delete_by_query(
-                    index=self.archive_index,
-                    body={
-                        "query": {
-                            "bool": {
-                                "must": [
-                                    {"term": {"snapshot_file": file}},
-                                    {"term": {"snapshot_date": snapshot_date}}
-                                ]
-                            }
-                        }
-                    }
-                )
-            except Exception:
-                pass
-
-            def _actions() -> Generator[Dict[str, Any], None, None]:
-                for i, r in enumerate(rows, start=1):
-                    # Ensure string values; keep existing fields
-                    doc = {k: (str(v) if v is not None else "") for k, v in r.items()}
-                    doc["snapshot_date"] = snapshot_date
-                    doc["snapshot_file"] = file
-                    yield {
-                        "_index": self.archive_index,
-                        "_id": f"{file}:{snapshot_date}:{i}",
-                        "_source": doc
-                    }
+            self._prepare_archive_snapshot(file=file, snapshot_date=snapshot_date)
 
-            success, failed = helpers.bulk(
-                self.client,
-                _actions(),
-                chunk_size=1000,
-                max_chunk_bytes=10 * 1024 * 1024,
-                request_timeout=60,
-                refresh=False
+            success, failed = self._parallel_bulk(
+                self._archive_actions(file=file, snapshot_date=snapshot_date, rows=rows),
+                chunk_size=2000,
+                raise_on_error=True,
             )
             self.client.indices.refresh(index=self.archive_index)
             if failed:
@@ -1152,6 +1268,55 @@ class OpenSearchConfig:
             logger.error(f"Error indexing archive snapshot for {file}@{date}: {e}")
             return False, 0
 
+    def index_file_snapshots(
+        self,
+        *,
+        file: str,
+        date: str | None,
+        metrics: Optional[dict],
+        loc_docs: List[Dict[str, Any]],
+        rows: Iterable[Dict[str, Any]],
+        refresh: bool = True,
+    ) -> Tuple[bool, int]:
+        """Write the stats, per-location and archive snapshots of one file in a single bulk stream.
+
+        Combines what index_stats_snapshot, index_stats_location_snapshots and
+        index_archive_snapshot do separately, so ingesting a file costs one
+        bulk pass instead of three independent write paths.
+
+        Args:
+            file: filename (e.g., netspeed.csv or netspeed.csv.N)
+            date: ISO date YYYY-MM-DD (today is used for location/archive docs if missing)
+            metrics: global snapshot metrics; skipped when None
+            loc_docs: per-location snapshot docs (see index_stats_location_snapshots)
+            rows: deduplicated CSV rows for the archive snapshot (any iterable, consumed lazily)
+            refresh: refresh the archive index afterwards (skip when the caller refreshes once at the end)
+
+        Returns:
+            (success, number of documents written)
+        """
+        try:
+            snapshot_date = date or datetime.utcnow().strftime('%Y-%m-%d')
+            head: List[Dict[str, Any]] = []
+            if metrics is not None and self.create_stats_index():
+                head.append(self._stats_snapshot_action(file=file, date=date, metrics=metrics))
+            if loc_docs and self.create_stats_loc_index():
+                head.extend(self._stats_location_actions(file=file, date=snapshot_date, loc_docs=loc_docs))
+            archive_ok = self.create_archive_index()
+            if archive_ok:
+                self._prepare_archive_snapshot(file=file, snapshot_date=snapshot_date)
+            archive_actions = self._archive_actions(file=file, snapshot_date=snapshot_date, rows=rows) if archive_ok else ()
+
+            success, failed = self._parallel_bulk(chain(head, archive_actions), chunk_size=5000)
+            if archive_ok and refresh:
+                self.client.indices.refresh(index=self.archive_index)
+            if failed:
+                logger.warning(f"File snapshots had {failed} failed docs for {file}@{snapshot_date}")
+            return not failed, success
+        except Exception as e:
+            logger.error(f"Error indexing file snapshots for {file}@{date}: {e}")
+            return False, 0
+
     def purge_archive_older_than_years(self, years: int) -> int:
         """Delete archived snapshot docs older than the specified number of years.
 
@@ -1217,6 +1382,41 @@ class OpenSearchConfig:
             logger.error(f"Error cleaning up indices with pattern {pattern}: {e}")
             return 0
 
+    @contextmanager
+    def bulk_ingest_settings(self, indices: Optional[List[str]] = None) -> Iterator[None]:
+        """Suspend periodic refreshes on the target indices for a bulk ingest run.
+
+        Sets refresh_interval=-1 (replicas are kept at 0) while the block runs and
+        restores the configured 30s interval afterwards, followed by one explicit
+        refresh so all written documents become searchable. Failures are logged
+        and never abort the ingest itself.
+
+        Args:
+            indices: index names/patterns; defaults to netspeed_*, stats and archive indices
+        """
+        target = ",".join(indices or ["netspeed_*", self.stats_index, self.stats_loc_index, self.archive_index])
+        options: Dict[str, Any] = {"allow_no_indices": True, "ignore_unavailable": True, "expand_wildcards": "open"}
+        try:
+            self.client.indices.put_settings(
+                index=target,
+                body={"index": {"refresh_interval": "-1", "number_of_replicas": 0}},
+                **options,
+            )
+        except Exception as e:
+            logger.warning(f"Could not suspend refresh for bulk ingest on {target}: {e}")
+        try:
+            yield
+        finally:
+            try:
+                self.client.indices.put_settings(
+                    index=target,
+                    body={"index": {"refresh_interval": "30s"}},
+                    **options,
+                )
+                self.client.indices.refresh(index=target, **options)
+            except Exception as e:
+                logger.warning(f"Could not restore refresh settings on {target}: {e}")
+
     def update_index_settings(self, index_name: str) -> bool:
         """
         Update settings for an existing index.
@@ -1251,30 +1451,34 @@ class OpenSearchConfig:
             logger.error(f"Error updating settings for {index_name}: {e}")
             return False
 
-    def generate_actions(self, index_name: str, file_path: str) -> Generator[Dict[str, Any], None, None]:
+    def generate_actions(
+        self, index_name: str, file_path: str, rows: Optional[Iterable[Dict[str, Any]]] = None
+    ) -> Generator[Dict[str, Any], None, None]:
         """
         Generate actions for bulk indexing (optimized version).
 
         Args:
             index_name: Name of the index to index into
             file_path: Path to the CSV file to index
+            rows: Already read and deduplicated rows of file_path; the file is read when omitted
 
         Yields:
             Dict[str, Any]: Action for bulk indexing
         """
-        # Use read_csv_file_normalized to preserve ALL columns for indexing
-        _, rows_raw = read_csv_file_normalized(file_path)
-
-        # CRITICAL: Deduplicate phone rows before indexing to OpenSearch
-        # This prevents duplicate entries in search results (e.g., KEM search returning 3628 instead of 1813)
-        from utils.csv_utils import deduplicate_phone_rows
-        rows = deduplicate_phone_rows(rows_raw)
-
-        if len(rows) != len(rows_raw):
-            logger.info(
-                f"Deduplicated {file_path}: {len(rows_raw)} -> {len(rows)} rows "
-                f"({len(rows_raw) - len(rows)} duplicates removed)"
-            )
+        if rows is None:
+            # Use read_csv_file_normalized to preserve ALL columns for indexing
+            _, rows_raw = read_csv_file_normalized(file_path)
+
+            # CRITICAL: Deduplicate phone rows before indexing to OpenSearch
+            # This prevents duplicate entries in search results (e.g., KEM search returning 3628 instead of 1813)
+            from utils.csv_utils import deduplicate_phone_rows
+            rows = deduplicate_phone_rows(rows_raw)
+
+            if len(rows) != len(rows_raw):
+                logger.info(
+                    f"Deduplicated {file_path}: {len(rows_raw)} -> {len(rows)} rows "
+                    f"({len(rows_raw) - len(rows)} duplicates removed)"
+                )
 
         # Note: Data repair is now handled separately after all files are indexed
         # This ensures historical data is available when repairing the current file
@@ -1399,12 +1603,13 @@ class OpenSearchConfig:
         logger.info(f"DATA REPAIR: DISABLED - Skipping repair for {file_path} to prevent CSV corruption")
         return rows  # Return original rows unchanged
 
-    def index_csv_file(self, file_path: str) -> Tuple[bool, int]:
+    def index_csv_file(self, file_path: str, rows: Optional[Iterable[Dict[str, Any]]] = None) -> Tuple[bool, int]:
         """
         Index a CSV file into OpenSearch.
 
         Args:
             file_path: Path to the CSV file to index
+            rows: Optional deduplicated rows already parsed from file_path (skips a second read)
 
         Returns:
             Tuple[bool, int]: (success, number of documents indexed)
@@ -1420,7 +1625,7 @@ class OpenSearchConfig:
             # Bulk index documents with optimized settings
             success, failed = helpers.bulk(
                 self.client,
-                self.generate_actions(index_name, file_path),
+                self.generate_actions(index_name, file_path, rows),
                 chunk_size=1000,  # Process in chunks of 1000 docs
                 max_chunk_bytes=10 * 1024 * 1024,  # 10MB chunks
                 request_timeout=60,  # 60 second timeout
@@ -1480,8 +1685,35 @@ class OpenSearchConfig:
         logger.info(f"Deduplicated {len(documents)} documents to {len(unique_documents)} unique documents")
         return unique_documents
 
+    @contextmanager
+    def _file_name_scope(self) -> Iterator[None]:
+        """Reuse one netspeed file-name discovery for everything inside the block.
+
+        A single search resolves the preferred file order several times (query
+        body, sort scripts, MAC seeding); each resolution scans the data
+        directories and lists indices. Nested scopes share the outer memo.
+        """
+        if getattr(_FILE_NAME_SCOPE, "names", None) is not None:
+            yield
+            return
+        _FILE_NAME_SCOPE.names = {}
+        try:
+            yield
+        finally:
+            _FILE_NAME_SCOPE.names = None
+
     def _netspeed_filenames(self) -> List[str]:
         """Return canonical netspeed file names based on configured data directories."""
+        scoped = getattr(_FILE_NAME_SCOPE, "names", None)
+        if scoped is None:
+            return self._discover_netspeed_filenames()
+        key = id(self)
+        if key not in scoped:
+            scoped[key] = self._discover_netspeed_filenames()
+        return list(scoped[key])
+
+    def _discover_netspeed_filenames(self) -> List[str]:
+        """Scan data directories and indices for netspeed file names."""
         extras: List[Path | str] = []
         try:
             extras.append(get_data_root())
@@ -1567,7 +1799,7 @@ class OpenSearchConfig:
                         if name not in ordered:
                             ordered.append(name)
                         continue
-                    if name == "netspeed.csv" or (name.startswith("netspeed.csv.") and name.split("netspeed.csv.", 1)[1].isdigit()):
+                    if NETSPEED_PLAIN_PATTERN.match(name):
                         if name not in ordered:
                             ordered.append(name)
 
@@ -2520,7 +2752,7 @@ class OpenSearchConfig:
 
         # Add any additional columns from documents that aren't in the CSV headers
         # (this handles legacy data or special computed fields)
-        extra_columns = sorted([col for col in doc_keys if col not in headers])
+        extra_columns = sorted(col for col in doc_keys if col not in headers)
         headers.extend(extra_columns)
 
         return headers
@@ -2983,6 +3215,23 @@ class OpenSearchConfig:
         """
         Search OpenSearch for documents matching the query.
 
+        Args:
+            query: Query string
+            field: Optional field to search in (if None, searches across all fields)
+            include_historical: Whether to include historical indices
+            size: Maximum number of results to return
+
+        Returns:
+            Tuple[List[str], List[Dict[str, Any]]]: (headers, matching documents)
+        """
+        with self._file_name_scope():
+            return self._search(query, field, include_historical, size)
+
+    def _search(self, query: str, field: Optional[str] = None, include_historical: bool = False,
+                size: int = 20000) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        Run a search with file-name discovery memoized by the caller.
+
         Args:
             query: Query string
             field: Optional field to search in (if None, searches across all fields)
@@ -8,6 +8,10 @@ from typing import Iterable, List, Optional, Tuple
 from config import settings
 
 NETSPEED_TIMESTAMP_PATTERN = re.compile(r"^netspeed_(\d{8})-(\d{6})\.csv(?:\.(\d+))?$")
+# Plain exports without timestamp: netspeed.csv and numbered rotations netspeed.csv.N
+NETSPEED_PLAIN_PATTERN = re.compile(r"^netspeed\.csv(?:\.\d+)?$")
+# Numbered rotations, optionally backed up: netspeed.csv.N / netspeed.csv.N_bak
+NETSPEED_ROTATION_PATTERN = re.compile(r"^netspeed\.csv\.(\d+)(?:_bak)?$")
 
 
 def get_data_root() -> Path:
@@ -277,25 +281,7 @@ def _is_historical_file(path: Path) -> bool:
     if match:
         rotation = match.group(3)
         return rotation is not None
-    if not name.startswith("netspeed.csv"):
-        return False
-    if name == "netspeed.csv":
-        return False
-    if name.startswith("netspeed.csv."):
-        suffix = name.split("netspeed.csv.", 1)[1]
-        if suffix.endswith("_bak"):
-            suffix = suffix[:-4]
-        return suffix.isdigit()
-    return False
-
-
-def _is_backup_file(path: Path) -> bool:
-    name = path.name
-    if name.endswith("_bak"):
-        return True
-    if name.startswith("netspeed.csv") and name.count("_bak") > 0:
-        return True
-    return False
+    return NETSPEED_ROTATION_PATTERN.match(name) is not None
 
 
 def _historical_sort_key(path: Path) -> tuple[int, str, int]:
@@ -305,12 +291,9 @@ def _historical_sort_key(path: Path) -> tuple[int, str, int]:
         rotation = match.group(3)
         rotation_order = int(rotation) if rotation is not None else -1
         return (0, f"{match.group(1)}{match.group(2)}", rotation_order)
-    if name.startswith("netspeed.csv."):
-        suffix = name.split("netspeed.csv.", 1)[1]
-        if suffix.endswith("_bak"):
-            suffix = suffix[:-4]
-        if suffix.isdigit():
-            return (1, f"{int(suffix):06d}", 0)
+    match = NETSPEED_ROTATION_PATTERN.match(name)
+    if match:
+        return (1, f"{int(match.group(1)):06d}", 0)
     return (2, name, 0)
 
 
@@ -362,13 +345,21 @@ def collect_netspeed_files(
         for search_dir in _candidate_search_dirs(base_dir):
             if explicit_roots and not _within_allowed_roots(search_dir, explicit_roots):
                 continue
-            if not search_dir.exists() or not search_dir.is_dir():
+            # One directory listing instead of a glob per pattern ("netspeed.csv*", "netspeed_*.csv*");
+            # scandir's cached file type avoids a stat per entry
+            try:
+                entries = list(os.scandir(search_dir))
+            except OSError:
                 continue
-            for pattern in ("netspeed.csv*", "netspeed_*.csv*"):
-                for path in search_dir.glob(pattern):
-                    if not path.is_file():
-                        continue
-                    _store(path)
+            for entry in entries:
+                name = entry.name
+                if not (name.startswith("netspeed.csv") or (name.startswith("netspeed_") and ".csv" in name[9:])):
+                    continue
+                try:
+                    if entry.is_file():
+                        files_map[_path_key(Path(entry.path))] = Path(entry.path)
+                except OSError:
+                    continue
 
     historical: List[Path] = []
     timestamped: List[Tuple[str, int, Path]] = []
@@ -387,9 +378,8 @@ def collect_netspeed_files(
             legacy_current.append(path)
         elif _is_historical_file(path):
             historical.append(path)
-        elif include_backups and _is_backup_file(path):
-            backups.append(path)
         elif include_backups:
+            # Explicit *_bak copies and any other netspeed.csv* leftovers
             backups.append(path)
 
     historical.sort(key=_historical_sort_key)
@@ -419,6 +409,12 @@ def collect_netspeed_files(
     return historical, current_file, backups if include_backups else []
 
 
+def is_plain_netspeed_file(path: Path | str) -> bool:
+    """Return True for netspeed.csv or a numbered rotation (netspeed.csv.N)."""
+    name = path.name if isinstance(path, Path) else os.path.basename(str(path))
+    return NETSPEED_PLAIN_PATTERN.match(name) is not None
+
+
 def netspeed_files_ordered(
     extra_candidates: Optional[Iterable[Path | str]] = None,
     include_backups: bool = True,
@@ -442,4 +438,5 @@ __all__ = [
     "resolve_current_directory",
     "collect_netspeed_files",
     "netspeed_files_ordered",
+    "is_plain_netspeed_file",
 ]
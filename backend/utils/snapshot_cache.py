@@ -0,0 +1,96 @@
+import hashlib
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+
+# Cached aggregates live next to the index state, not in the mounted CSV directory
+SNAPSHOT_CACHE_DIR = Path(os.environ.get("SNAPSHOT_CACHE_DIR", "/app/var/snapshot_cache"))
+# Bump when the cache entry format changes; callers additionally pass a version
+# identifying their aggregation code (see tasks.tasks.SNAPSHOT_CACHE_VERSION)
+CACHE_VERSION = 2
+# Bytes hashed from the start (header) and the end of the file for the content fingerprint
+FINGERPRINT_BLOCK_SIZE = 64 * 1024
+# Entries not read or written for this long are removed by prune_snapshots()
+MAX_AGE_SECONDS = 90 * 24 * 3600
+
+
+def _content_fingerprint(path: Path, size: int) -> str:
+    """Hash of the first and last FINGERPRINT_BLOCK_SIZE bytes of the file.
+
+    Tells apart files that share size and mtime (coarse mount timestamps,
+    ``cp -p``/rsync copies) without reading whole exports.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(FINGERPRINT_BLOCK_SIZE))
+        if size > FINGERPRINT_BLOCK_SIZE:
+            f.seek(max(FINGERPRINT_BLOCK_SIZE, size - FINGERPRINT_BLOCK_SIZE))
+            h.update(f.read(FINGERPRINT_BLOCK_SIZE))
+    return h.hexdigest()
+
+
+def _entry_path(kind: str, path: Path, version: str) -> Optional[Path]:
+    """Cache file for one aggregate kind of a CSV file, keyed by size, mtime and content fingerprint.
+
+    The file name is left out of the key so rotated history files
+    (netspeed.csv.N -> netspeed.csv.N+1) keep hitting their entries.
+    """
+    try:
+        st = path.stat()
+        fingerprint = _content_fingerprint(path, st.st_size)
+    except OSError:
+        return None
+    key = f"{CACHE_VERSION}:{version}:{kind}:{st.st_size}:{st.st_mtime_ns}:{fingerprint}"
+    return SNAPSHOT_CACHE_DIR / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.pkl"
+
+
+def load_snapshot(kind: str, path: Path, version: int = 0) -> Optional[Any]:
+    """Return the cached aggregate of ``kind`` for path, or None on a miss.
+
+    ``version`` identifies the code that computed the aggregate; entries
+    stored under another version are never returned.
+    """
+    entry = _entry_path(kind, path, version)
+    if entry is None:
+        return None
+    try:
+        with open(entry, "rb") as f:
+            value = pickle.load(f)
+        os.utime(entry)
+        return value
+    except Exception:
+        return None
+
+
+def store_snapshot(kind: str, path: Path, value: Any, version: int = 0) -> None:
+    """Cache an aggregate of ``kind`` for path (best-effort)."""
+    entry = _entry_path(kind, path, version)
+    if entry is None:
+        return
+    try:
+        SNAPSHOT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = entry.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(entry)
+    except Exception:
+        # Best-effort; the aggregate is simply recomputed next time
+        pass
+
+
+def prune_snapshots() -> None:
+    """Remove entries not read or written for MAX_AGE_SECONDS.
+
+    Scans the whole cache directory, so callers run it once per backfill
+    rather than per stored file.
+    """
+    cutoff = time.time() - MAX_AGE_SECONDS
+    for old in SNAPSHOT_CACHE_DIR.glob("*.pkl"):
+        try:
+            if old.stat().st_mtime < cutoff:
+                old.unlink()
+        except OSError:
+            pass
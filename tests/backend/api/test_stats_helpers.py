@@ -1,6 +1,6 @@
 import pytest
 
-from backend.api.stats import is_mac_like, extract_location
+from backend.api.stats import is_mac_like, extract_location, extract_locations, is_jva_location, is_jva_switch, resolve_city_name, resolve_city_names, vlan_sort_key
 
 
 def test_is_mac_like_various():
@@ -30,4 +30,39 @@ def test_extract_location_happy_and_none():
     assert extract_location("") is None
 
 
+def test_extract_locations_batch_matches_scalar():
+    hostnames = ["WORx51ZSL9999P.juwin.bayern.de", "abc01-sw01", "abc01-sw01", "AB01-host", ""]
+    result = extract_locations(hostnames)
+    # One entry per distinct non-empty hostname
+    assert result == {
+        "WORx51ZSL9999P.juwin.bayern.de": "WOR51",
+        "abc01-sw01": "ABC01",
+        "AB01-host": None,
+    }
+
+
+def test_is_jva_location_matches_switch_check():
+    for hostname in ["WORx51ZSL9999P.juwin.bayern.de", "ABx50sw", "abc01-sw01", "AB01-host", ""]:
+        assert is_jva_location(extract_location(hostname)) == is_jva_switch(hostname)
+    assert is_jva_location(None) is False
+
+
+def test_extract_location_is_memoized():
+    extract_location.cache_clear()
+    for _ in range(3):
+        assert extract_location("WORx51ZSL9999P.juwin.bayern.de") == "WOR51"
+    info = extract_location.cache_info()
+    assert info.misses == 1
+    assert info.hits == 2
+
+
+def test_resolve_city_names_matches_scalar():
+    codes = ["MXX", "abc", "ZZZ", ""]
+    assert resolve_city_names(codes) == {c: resolve_city_name(c) for c in codes}
+
+
 # EXCLUDED_LOCATIONS removed: CSV normalization and parsing fixes make exclusions unnecessary.
+
+
+def test_vlan_sort_key_orders_numeric_vlans_first():
+    assert sorted(["voice", "100", "20", "", "3"], key=vlan_sort_key) == ["3", "20", "100", "", "voice"]
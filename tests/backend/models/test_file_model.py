@@ -0,0 +1,32 @@
+"""Tests for FileModel construction and caching."""
+from unittest.mock import patch
+
+from models import file as file_module
+from models.file import FileModel
+
+
+def test_from_path_caches_unchanged_file(tmp_path):
+    csv_path = tmp_path / "netspeed.csv.1"
+    csv_path.write_text("10.0.0.1;100;SN1\n")
+    file_module._FROM_PATH_CACHE.clear()
+
+    with patch.object(FileModel, "_build_from_path", wraps=FileModel._build_from_path) as build:
+        first = FileModel.from_path(str(csv_path))
+        second = FileModel.from_path(str(csv_path))
+
+    assert build.call_count == 1
+    assert first == second
+    assert first is not second
+
+
+def test_from_path_rebuilds_after_file_change(tmp_path):
+    csv_path = tmp_path / "netspeed.csv.1"
+    csv_path.write_text("10.0.0.1;100;SN1\n")
+    file_module._FROM_PATH_CACHE.clear()
+
+    with patch.object(FileModel, "_build_from_path", wraps=FileModel._build_from_path) as build:
+        FileModel.from_path(str(csv_path))
+        csv_path.write_text("10.0.0.1;100;SN1\n10.0.0.2;101;SN2\n")
+        FileModel.from_path(str(csv_path))
+
+    assert build.call_count == 2
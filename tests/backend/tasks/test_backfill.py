@@ -11,12 +11,17 @@ from datetime import datetime
 from tasks.tasks import backfill_location_snapshots, backfill_stats_snapshots
 
 
+def _written_stats_files(mock_os_config):
+    """Count stats snapshot docs handed to the batched bulk writer."""
+    return sum(len(c.args[0]) for c in mock_os_config.index_stats_snapshots.call_args_list)
+
+
 class TestBackfillLocationSnapshots:
     """Test the backfill_location_snapshots task."""
 
     @patch('tasks.tasks.netspeed_files_ordered')
     @patch('tasks.tasks.opensearch_config')
-    @patch('tasks.tasks.read_csv_file_normalized')
+    @patch('utils.csv_utils.iter_csv_file_normalized')
     @patch('models.file.FileModel.from_path')
     def test_backfill_processes_all_files(
         self, mock_file_model, mock_read_csv, mock_os_config, mock_files_ordered
@@ -69,7 +74,7 @@ class TestBackfillLocationSnapshots:
 
     @patch('tasks.tasks.netspeed_files_ordered')
     @patch('tasks.tasks.opensearch_config')
-    @patch('tasks.tasks.read_csv_file_normalized')
+    @patch('utils.csv_utils.iter_csv_file_normalized')
     @patch('models.file.FileModel.from_path')
     def test_backfill_continues_on_individual_failures(
         self, mock_file_model, mock_read_csv, mock_os_config, mock_files_ordered
@@ -132,13 +137,13 @@ class TestBackfillStatsSnapshots:
 
     @patch('tasks.tasks.netspeed_files_ordered')
     @patch('tasks.tasks.opensearch_config')
-    @patch('tasks.tasks.read_csv_file_normalized')
+    @patch('utils.csv_utils.iter_csv_file_normalized')
     def test_backfill_stats_processes_files(
         self, mock_read_csv, mock_os_config, mock_files_ordered
     ):
         """Test that backfill stats processes discovered files."""
         mock_os_config.quick_ping.return_value = True
-        mock_os_config.index_stats_snapshot.return_value = True
+        mock_os_config.index_stats_snapshots.return_value = True
 
         mock_files_ordered.return_value = [
             Path('/app/data/netspeed.csv'),
@@ -154,11 +159,13 @@ class TestBackfillStatsSnapshots:
 
         assert result['status'] == 'success'
         assert result.get('files', 0) == 2
-        assert mock_os_config.index_stats_snapshot.call_count == 2
+        # Both files are written in a single bulk request
+        assert mock_os_config.index_stats_snapshots.call_count == 1
+        assert _written_stats_files(mock_os_config) == 2
 
     @patch('tasks.tasks.netspeed_files_ordered')
     @patch('tasks.tasks.opensearch_config')
-    @patch('tasks.tasks.read_csv_file_normalized')
+    @patch('utils.csv_utils.iter_csv_file_normalized')
     def test_backfill_stats_handles_errors(
         self, mock_read_csv, mock_os_config, mock_files_ordered
     ):
@@ -173,7 +180,7 @@ class TestBackfillStatsSnapshots:
         )
 
         # Stats indexing fails
-        mock_os_config.index_stats_snapshot.side_effect = Exception("Stats computation failed")
+        mock_os_config.index_stats_snapshots.side_effect = Exception("Stats computation failed")
 
         result = backfill_stats_snapshots('/app/data')
 
@@ -193,13 +200,13 @@ class TestBackfillStatsSnapshots:
 
     @patch('tasks.tasks.netspeed_files_ordered')
     @patch('tasks.tasks.opensearch_config')
-    @patch('tasks.tasks.read_csv_file_normalized')
+    @patch('utils.csv_utils.iter_csv_file_normalized')
     def test_backfill_stats_skips_invalid_files(
         self, mock_read_csv, mock_os_config, mock_files_ordered
     ):
         """Test that backfill skips files that cannot be processed."""
         mock_os_config.quick_ping.return_value = True
-        mock_os_config.index_stats_snapshot.return_value = True
+        mock_os_config.index_stats_snapshots.return_value = True
 
         mock_files_ordered.return_value = [
             Path('/app/data/netspeed.csv'),
@@ -219,7 +226,7 @@ class TestBackfillStatsSnapshots:
         # Should have attempted to read all 3 files
         assert mock_read_csv.call_count == 3
         # Only 2 should have been indexed (1 failed)
-        assert mock_os_config.index_stats_snapshot.call_count == 2
+        assert _written_stats_files(mock_os_config) == 2
         assert result.get('files', 0) == 2  # 2 successful
 
 
@@ -228,13 +235,13 @@ class TestBackfillIntegration:
 
     @patch('tasks.tasks.netspeed_files_ordered')
     @patch('tasks.tasks.opensearch_config')
-    @patch('tasks.tasks.read_csv_file_normalized')
+    @patch('utils.csv_utils.iter_csv_file_normalized')
     def test_backfill_both_tasks_process_same_files(
         self, mock_read_csv, mock_os_config, mock_files_ordered
     ):
         """Test that both backfill tasks can process the same file set."""
         mock_os_config.quick_ping.return_value = True
-        mock_os_config.index_stats_snapshot.return_value = True
+        mock_os_config.index_stats_snapshots.return_value = True
         mock_os_config.index_stats_location_snapshots.return_value = True
 
         files = [
@@ -261,11 +268,11 @@ class TestBackfillIntegration:
 
     @patch('tasks.tasks.netspeed_files_ordered')
     @patch('tasks.tasks.opensearch_config')
-    @patch('tasks.tasks.read_csv_file_normalized')
+    @patch('utils.csv_utils.iter_csv_file_normalized')
     def test_backfill_with_large_file_set(self, mock_read_csv, mock_os_config, mock_files_ordered):
         """Test backfill performance with many files."""
         mock_os_config.quick_ping.return_value = True
-        mock_os_config.index_stats_snapshot.return_value = True
+        mock_os_config.index_stats_snapshots.return_value = True
 
         # Simulate 100 files (using netspeed.csv.N naming)
         files = [Path(f'/app/data/netspeed.csv.{i}') for i in range(100)]
@@ -279,5 +286,7 @@ class TestBackfillIntegration:
         result = backfill_stats_snapshots('/app/data')
 
         # Should attempt to process all files
-        assert mock_os_config.index_stats_snapshot.call_count == 100
+        assert _written_stats_files(mock_os_config) == 100
+        # Files are batched into a few bulk requests instead of one write each
+        assert mock_os_config.index_stats_snapshots.call_count == 2
         assert result.get('files', 0) == 100
@@ -34,3 +34,61 @@ def test_index_csv_skips_when_wait_disabled(monkeypatch):
 
     assert result["status"] == "skipped"
     assert "OpenSearch" in result["message"]
+
+
+def _stub_indexing(monkeypatch, count):
+    import backend.tasks.tasks as tasks_module
+
+    monkeypatch.setattr(settings, "OPENSEARCH_WAIT_FOR_AVAILABILITY", False, raising=False)
+    monkeypatch.setattr(opensearch_config, "quick_ping", lambda: True)
+    monkeypatch.setattr(opensearch_config, "index_csv_file", lambda _path: (True, count))
+    calls = []
+    monkeypatch.setattr(tasks_module, "snapshot_current_stats", lambda **kw: calls.append("stats"))
+    monkeypatch.setattr(tasks_module, "snapshot_current_with_details", lambda **kw: calls.append("details"))
+    return tasks_module, calls
+
+
+def test_index_csv_skips_detail_snapshot_for_unchanged_file(monkeypatch, tmp_path):
+    csv_path = tmp_path / "netspeed.csv"
+    csv_path.write_text("a;b\n1;2\n")
+    tasks_module, calls = _stub_indexing(monkeypatch, 1)
+    state = {"files": {}}
+    tasks_module.update_file_state(state, csv_path, line_count=1, doc_count=1)
+    monkeypatch.setattr(tasks_module, "load_state", lambda: state)
+    monkeypatch.setattr(opensearch_config, "has_stats_snapshot", lambda **kw: True)
+    monkeypatch.setattr(opensearch_config, "has_archive_snapshot", lambda **kw: True)
+
+    # The global snapshot of the current file is still refreshed
+    assert index_csv.run(str(csv_path))["status"] == "success"
+    assert calls == ["stats"]
+
+    # A changed file (or a different document count) refreshes the detail snapshot too
+    calls.clear()
+    csv_path.write_text("a;b\n1;2\n3;4\n")
+    index_csv.run(str(csv_path))
+    assert calls == ["details", "stats"]
+
+
+def test_index_csv_rewrites_missing_snapshots_of_unchanged_file(monkeypatch, tmp_path):
+    csv_path = tmp_path / "netspeed.csv"
+    csv_path.write_text("a;b\n1;2\n")
+    tasks_module, calls = _stub_indexing(monkeypatch, 1)
+    state = {"files": {}}
+    tasks_module.update_file_state(state, csv_path, line_count=1, doc_count=1)
+    monkeypatch.setattr(tasks_module, "load_state", lambda: state)
+    # e.g. after the stats index was recreated
+    monkeypatch.setattr(opensearch_config, "has_stats_snapshot", lambda **kw: False)
+    monkeypatch.setattr(opensearch_config, "has_archive_snapshot", lambda **kw: True)
+
+    index_csv.run(str(csv_path))
+    assert calls == ["details", "stats"]
+
+
+def test_index_csv_skips_snapshots_when_nothing_indexed(monkeypatch, tmp_path):
+    csv_path = tmp_path / "netspeed.csv"
+    csv_path.write_text("a;b\n")
+    tasks_module, calls = _stub_indexing(monkeypatch, 0)
+    monkeypatch.setattr(tasks_module, "load_state", lambda: {"files": {}})
+
+    index_csv.run(str(csv_path))
+    assert calls == []
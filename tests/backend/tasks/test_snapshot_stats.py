@@ -43,12 +43,35 @@ class TestSnapshotCurrentStats:
         assert result['status'] in ['error', 'skipped', 'warning']
         assert 'message' in result or 'status' in result
 
+    @patch('tasks.tasks.read_csv_file_columns')
+    @patch('tasks.tasks.opensearch_config')
+    @patch('models.file.FileModel.from_path')
+    @patch('tasks.tasks.resolve_current_file')
+    def test_snapshot_skips_file_already_written_with_details(self, mock_resolve, mock_file_model, mock_os_config, mock_read_cols, tmp_path):
+        """No second CSV read when the detail snapshot covered the same file/date."""
+        from tasks.tasks import snapshot_current_stats
+
+        csv_path = tmp_path / 'netspeed.csv'
+        csv_path.write_text('a;b\n')
+        mock_resolve.return_value = csv_path
+        mock_fm = MagicMock()
+        mock_fm.name = 'netspeed.csv'
+        mock_fm.date = datetime(2025, 10, 9)
+        mock_file_model.return_value = mock_fm
+
+        details = {'status': 'success', 'file': 'netspeed.csv', 'date': '2025-10-09'}
+        result = snapshot_current_stats(directory_path=str(tmp_path), details_result=details)
+
+        assert result['status'] == 'skipped'
+        mock_read_cols.assert_not_called()
+        mock_os_config.index_stats_snapshot.assert_not_called()
+
 
 class TestSnapshotCurrentWithDetails:
     """Test snapshot_current_with_details function."""
 
     @patch('tasks.tasks.resolve_current_file')
-    @patch('tasks.tasks.read_csv_file_normalized')
+    @patch('utils.csv_utils.iter_csv_file_normalized')
     @patch('tasks.tasks.opensearch_config')
     @patch('models.file.FileModel.from_path')
     def test_snapshot_creates_location_details(self, mock_file_model, mock_os_config, mock_read_csv, mock_resolve):
@@ -76,3 +99,301 @@ class TestSnapshotCurrentWithDetails:
         # May return warning if location extraction fails
         assert result['status'] in ['success', 'warning']
         assert 'status' in result
+
+
+class TestFallbackCurrentFile:
+    """Test the netspeed.csv fallback lookup shared by the snapshot tasks."""
+
+    def test_prefers_current_dir_file_then_dirs(self, tmp_path):
+        from tasks.tasks import _fallback_current_file
+
+        current = tmp_path / "current"
+        current.mkdir()
+        other = tmp_path / "other"
+        other.mkdir()
+        (other / "netspeed.csv").write_text("a;b\n")
+
+        with patch('tasks.tasks.settings') as mock_settings:
+            mock_settings.NETSPEED_CURRENT_DIR = str(current)
+            assert _fallback_current_file(other) == other / "netspeed.csv"
+
+            (current / "netspeed.csv").write_text("a;b\n")
+            assert _fallback_current_file(other) == current / "netspeed.csv"
+
+            mock_settings.NETSPEED_CURRENT_DIR = str(other / "netspeed.csv")
+            assert _fallback_current_file() == other / "netspeed.csv"
+
+            mock_settings.NETSPEED_CURRENT_DIR = None
+            assert _fallback_current_file(tmp_path / "missing") in (None, Path("/usr/scripts/netspeed/netspeed.csv"))
+
+
+class TestLocationDocs:
+    """Test the per-location document builder shared by snapshot and backfill."""
+
+    def test_location_docs_include_switch_vlans_and_kem_phones(self):
+        from tasks.tasks import _DETAIL_COLUMNS, _host_facts, _kem_modules, _location_docs, _location_model_counts
+        from utils.csv_utils import rows_to_columns
+
+        rows = [
+            {"Switch Hostname": "ABX01SW1", "Model Name": "CP-8851", "KEM": "KEM", "Voice VLAN": "801", "IP Address": "10.0.0.1"},
+            {"Switch Hostname": "ABX01SW1", "Model Name": "CP-8851", "Voice VLAN": "801"},
+            {"Switch Hostname": "ABX50SW2", "Model Name": "CP-7841", "Voice VLAN": "12"},
+            {"Switch Hostname": "bad", "Model Name": "CP-7841"},
+        ]
+        cols = rows_to_columns(rows, _DETAIL_COLUMNS)
+        host_info, row_locs, jva_flags = _host_facts(cols["Switch Hostname"])
+        kems = list(map(_kem_modules, cols["KEM"], cols["KEM 2"], cols["Line Number"]))
+        docs = _location_docs(cols, host_info, row_locs, kems, _location_model_counts(row_locs, cols["Model Name"], jva_flags))
+
+        assert [d["key"] for d in docs] == ["ABX01", "ABX50"]
+        abx01, abx50 = docs
+        assert abx01["totalPhones"] == 2
+        assert abx01["phonesWithKEM"] == 1
+        assert abx01["kemPhones"][0]["ip"] == "10.0.0.1"
+        assert abx01["switches"] == [{"hostname": "ABX01SW1", "vlans": [{"vlan": "801", "count": 2}]}]
+        assert abx01["topVLANs"] == [{"vlan": "801", "count": 2}]
+        assert abx50["phonesByModelJVA"] == [{"model": "CP-7841", "count": 1}]
+        assert abx50["phonesByModelJustiz"] == []
+
+    def test_vlan_list_orders_numeric_before_named(self):
+        from tasks.tasks import _vlan_list
+
+        assert _vlan_list({"voice": 1, "801": 2, "12": 3}) == [
+            {"vlan": "12", "count": 3},
+            {"vlan": "801", "count": 2},
+            {"vlan": "voice", "count": 1},
+        ]
+
+
+class TestSnapshotPrefetchPool:
+    """Test the executor choice for the index_all_csv_files prefetch."""
+
+    def test_uses_threads_inside_daemonic_worker(self):
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        from tasks.tasks import _snapshot_prefetch_pool
+
+        daemon = MagicMock(daemon=True)
+        with patch('tasks.tasks.multiprocessing.current_process', return_value=daemon):
+            with _snapshot_prefetch_pool(1) as pool:
+                assert isinstance(pool, ThreadPoolExecutor)
+
+        with patch('tasks.tasks.settings') as mock_settings:
+            mock_settings.INDEX_PREFETCH_PROCESSES = False
+            with _snapshot_prefetch_pool(1) as pool:
+                assert isinstance(pool, ThreadPoolExecutor)
+            mock_settings.INDEX_PREFETCH_PROCESSES = True
+            with _snapshot_prefetch_pool(1) as pool:
+                assert isinstance(pool, ProcessPoolExecutor)
+
+
+class TestProgressThrottle:
+    """Test the throttled Celery PROGRESS updates of index_all_csv_files."""
+
+    def test_skips_updates_within_interval(self):
+        from tasks.tasks import _update_progress_throttled
+
+        task = MagicMock()
+        last = _update_progress_throttled(task, {"index": 1}, float("-inf"))
+        assert _update_progress_throttled(task, {"index": 2}, last, min_interval=60) == last
+        task.update_state.assert_called_once_with(state='PROGRESS', meta={"index": 1})
+
+
+class TestIndexLock:
+    """Test the Redis lock guarding concurrent index_all_csv_files runs."""
+
+    def test_second_task_is_refused_until_release(self):
+        from tasks.tasks import _acquire_index_lock, _release_index_lock
+
+        store = {}
+        client = MagicMock()
+        client.set.side_effect = lambda key, value, nx=False, ex=None: (
+            False if nx and key in store else store.__setitem__(key, value) or True
+        )
+        client.get.side_effect = store.get
+        client.eval.side_effect = lambda _script, _n, key, owner: store.pop(key) if store.get(key) == owner else 0
+
+        with patch('tasks.tasks._redis_client', return_value=client):
+            assert _acquire_index_lock("task-a") == (True, None)
+            assert _acquire_index_lock("task-b") == (False, "task-a")
+            _release_index_lock("task-b")
+            assert _acquire_index_lock("task-b") == (False, "task-a")
+            _release_index_lock("task-a")
+            assert _acquire_index_lock("task-b") == (True, None)
+
+    def test_expired_lock_is_retaken_with_nx(self):
+        from tasks.tasks import _acquire_index_lock
+
+        client = MagicMock()
+        # NX fails, the holder expires before GET, then another task wins the retry
+        client.set.return_value = False
+        client.get.side_effect = [None, "task-c"]
+        with patch('tasks.tasks._redis_client', return_value=client):
+            assert _acquire_index_lock("task-b") == (False, "task-c")
+        assert all(c.kwargs.get("nx") for c in client.set.call_args_list)
+
+    def test_direct_calls_get_unique_owners(self):
+        from tasks.tasks import _lock_owner
+
+        request = MagicMock(id=None)
+        with patch.dict('os.environ', {}, clear=False) as env:
+            env.pop('CELERY_TASK_ID', None)
+            first, second = _lock_owner(request), _lock_owner(request)
+        assert first.startswith("manual-") and first != second
+        assert _lock_owner(MagicMock(id="abc")) == "abc"
+
+    def test_falls_back_to_index_state_when_redis_is_unreachable(self):
+        from datetime import datetime, timedelta, timezone
+        from tasks.tasks import _acquire_index_lock
+
+        client = MagicMock()
+        client.set.side_effect = ConnectionError("redis down")
+        now = datetime.now(timezone.utc)
+        running = {"task_id": "task-b", "status": "running", "started_at": now.isoformat()}
+        stale = dict(running, started_at=(now - timedelta(days=1)).isoformat())
+        with patch('tasks.tasks._redis_client', return_value=client):
+            with patch('tasks.tasks.load_state', return_value={"files": {}, "active": None}):
+                assert _acquire_index_lock("task-a") == (True, None)
+            with patch('tasks.tasks.load_state', return_value={"files": {}, "active": running}):
+                assert _acquire_index_lock("task-a") == (False, "task-b")
+                assert _acquire_index_lock("task-b") == (True, None)
+            with patch('tasks.tasks.load_state', return_value={"files": {}, "active": stale}):
+                assert _acquire_index_lock("task-a") == (True, None)
+
+
+class TestPrepareFileSnapshot:
+    """Test the per-file preparation used by index_all_csv_files."""
+
+    @patch('tasks.tasks._aggregate_snapshot')
+    @patch('tasks.tasks.read_csv_file_normalized')
+    def test_unchanged_file_skips_aggregation(self, mock_read_csv, mock_aggregate, tmp_path):
+        from tasks.tasks import _prepare_file_snapshot
+
+        csv_path = tmp_path / 'netspeed.csv.1'
+        csv_path.write_text('a;b\n')
+        mock_read_csv.return_value = (['IP Address'], [{'IP Address': '10.0.0.1'}])
+        mock_aggregate.return_value = ({'totalPhones': 1}, [])
+
+        prepared = _prepare_file_snapshot(csv_path, aggregate=False)
+        assert prepared['aggregated'] is False
+        assert prepared['metrics'] is None
+        assert prepared['rows'] == [{'IP Address': '10.0.0.1'}]
+        mock_aggregate.assert_not_called()
+
+        prepared = _prepare_file_snapshot(csv_path)
+        assert prepared['metrics'] == {'totalPhones': 1}
+
+
+class TestIndexAllFinalSnapshots:
+    """Test the final snapshots run after index_all_csv_files indexed every file."""
+
+    @patch('tasks.tasks.snapshot_current_stats')
+    @patch('tasks.tasks.snapshot_current_with_details')
+    @patch('tasks.tasks.invalidate_caches')
+    @patch('tasks.tasks.save_state')
+    @patch('tasks.tasks.load_state', return_value={"files": {}, "active": None})
+    @patch('tasks.tasks.load_checkpoint', return_value=None)
+    @patch('tasks.tasks.clear_checkpoint')
+    @patch('tasks.tasks.save_checkpoint')
+    @patch('tasks.tasks.opensearch_config')
+    @patch('tasks.tasks.collect_netspeed_files')
+    def test_minimal_snapshot_uses_requested_directory(
+        self, mock_collect, mock_os_config, _save_cp, _clear_cp, _load_cp, _load_state, _save_state,
+        _invalidate, mock_details, mock_stats, tmp_path
+    ):
+        from tasks.tasks import _run_index_all_csv_files
+
+        csv_path = tmp_path / 'netspeed.csv'
+        csv_path.write_text('a;b\n')
+        mock_collect.return_value = ([], csv_path, [])
+        mock_os_config.index_csv_file.return_value = (True, 0)
+        mock_os_config.repair_current_file_after_indexing.return_value = {"success": True}
+        mock_details.return_value = {"status": "success"}
+        mock_stats.return_value = {"status": "success"}
+        task = MagicMock()
+        task.request.id = 't1'
+
+        with patch('tasks.tasks._snapshot_prefetch_pool') as mock_pool:
+            from concurrent.futures import ThreadPoolExecutor
+            mock_pool.side_effect = lambda workers: ThreadPoolExecutor(max_workers=workers)
+            result = _run_index_all_csv_files(task, [str(tmp_path)], str(tmp_path), str(tmp_path))
+
+        assert result['status'] == 'success'
+        mock_stats.assert_called_once_with(directory_path=str(tmp_path))
+
+    @patch('tasks.tasks.snapshot_current_stats', return_value={"status": "success"})
+    @patch('tasks.tasks.snapshot_current_with_details', return_value={"status": "success"})
+    @patch('tasks.tasks.invalidate_caches')
+    @patch('tasks.tasks.save_state_throttled', side_effect=lambda state, last: last)
+    @patch('tasks.tasks.save_state')
+    @patch('tasks.tasks.load_state', return_value={"files": {}, "active": None})
+    @patch('tasks.tasks.load_checkpoint', return_value=None)
+    @patch('tasks.tasks.clear_checkpoint')
+    @patch('tasks.tasks.save_checkpoint')
+    @patch('tasks.tasks.opensearch_config')
+    @patch('tasks.tasks.collect_netspeed_files')
+    def test_file_state_is_saved_before_checkpoint(
+        self, mock_collect, mock_os_config, mock_save_cp, _clear_cp, _load_cp, _load_state, mock_save_state,
+        _throttled, _invalidate, _details, _stats, tmp_path
+    ):
+        from tasks.tasks import _run_index_all_csv_files
+
+        files = [tmp_path / 'netspeed.csv', tmp_path / 'netspeed.csv.1']
+        for f in files:
+            f.write_text('a;b\n')
+        mock_collect.return_value = ([files[1]], files[0], [])
+        mock_os_config.index_csv_file.return_value = (True, 0)
+        mock_os_config.repair_current_file_after_indexing.return_value = {"success": True}
+        # File names persisted by the latest save_state, and at each checkpoint
+        persisted = [set()]
+        mock_save_state.side_effect = lambda state: persisted.append(set(state["files"]))
+        saved_files = []
+        mock_save_cp.side_effect = lambda *args: saved_files.append(persisted[-1])
+        task = MagicMock()
+        task.request.id = 't1'
+
+        with patch('tasks.tasks._snapshot_prefetch_pool') as mock_pool:
+            from concurrent.futures import ThreadPoolExecutor
+            mock_pool.side_effect = lambda workers: ThreadPoolExecutor(max_workers=workers)
+            _run_index_all_csv_files(task, [str(tmp_path)], str(tmp_path), str(tmp_path))
+
+        # Each checkpoint only follows a state save that already records its files
+        assert len(saved_files) == 2
+        assert len(saved_files[0]) == 1
+        assert saved_files[1] == {f.name for f in files}
+
+    @patch('tasks.tasks.snapshot_current_stats', return_value={"status": "success"})
+    @patch('tasks.tasks.snapshot_current_with_details', return_value={"status": "success"})
+    @patch('tasks.tasks.invalidate_caches')
+    @patch('tasks.tasks.save_state')
+    @patch('tasks.tasks.load_state', return_value={"files": {}, "active": None})
+    @patch('tasks.tasks.load_checkpoint', return_value=None)
+    @patch('tasks.tasks.clear_checkpoint')
+    @patch('tasks.tasks.save_checkpoint')
+    @patch('tasks.tasks.opensearch_config')
+    @patch('tasks.tasks.collect_netspeed_files')
+    def test_failed_prefetch_is_prepared_inline(
+        self, mock_collect, mock_os_config, _save_cp, _clear_cp, _load_cp, _load_state, _save_state,
+        _invalidate, _details, _stats, tmp_path
+    ):
+        from tasks.tasks import _run_index_all_csv_files
+
+        csv_path = tmp_path / 'netspeed.csv'
+        csv_path.write_text('a;b\n')
+        mock_collect.return_value = ([], csv_path, [])
+        mock_os_config.index_csv_file.return_value = (True, 1)
+        mock_os_config.repair_current_file_after_indexing.return_value = {"success": True}
+        prepared = {"file": "netspeed.csv", "date": "2024-01-01", "aggregated": True,
+                    "metrics": {"totalPhones": 1}, "loc_docs": [], "rows": [{}], "line_count": 1}
+        task = MagicMock()
+        task.request.id = 't1'
+
+        with patch('tasks.tasks._snapshot_prefetch_pool') as mock_pool, \
+                patch('tasks.tasks._prepare_file_snapshot', side_effect=[RuntimeError('boom'), prepared]) as mock_prepare:
+            from concurrent.futures import ThreadPoolExecutor
+            mock_pool.side_effect = lambda workers: ThreadPoolExecutor(max_workers=workers)
+            _run_index_all_csv_files(task, [str(tmp_path)], str(tmp_path), str(tmp_path))
+
+        assert mock_prepare.call_count == 2
+        mock_prepare.assert_called_with(csv_path)
+        mock_os_config.index_file_snapshots.assert_called_once()
+        assert mock_os_config.index_file_snapshots.call_args.kwargs["metrics"] == {"totalPhones": 1}
@@ -8,7 +8,7 @@ from pathlib import Path
 # Add the backend directory to the Python path to fix the import issues
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "backend"))
 
-from backend.utils.csv_utils import read_csv_file, read_csv_file_normalized, deduplicate_phone_rows
+from backend.utils.csv_utils import read_csv_file, read_csv_file_normalized, iter_csv_file_normalized, deduplicate_phone_rows, rows_to_columns, count_unique_data_rows, filter_display_columns, read_csv_file_columns
 
 class TestCsvUtils:
     """Test the CSV utilities."""
@@ -162,3 +162,115 @@ def test_deduplicate_phone_rows_uses_line_number_kem_hint():
 
     assert len(result) == 1
     assert result[0]["Model Name"] == "Line KEM"
+
+
+def test_rows_to_columns_strips_and_fills_missing():
+    """Column projection strips values and maps missing/None cells to empty strings."""
+    rows = [
+        {"Switch Hostname": " ABC01ZSL1 ", "KEM": None},
+        {"Switch Hostname": "DEF02ZSL1"},
+    ]
+
+    columns = rows_to_columns(rows, ("Switch Hostname", "KEM"))
+
+    assert columns == {"Switch Hostname": ["ABC01ZSL1", "DEF02ZSL1"], "KEM": ["", ""]}
+
+
+def test_read_csv_file_normalized_reports_unique_data_rows(tmp_path):
+    """The optional stats dict matches count_unique_data_rows without a second read."""
+    csv_path = tmp_path / "netspeed.csv"
+    csv_path.write_text(
+        "IPAddress;LineNumber;SwitchHostname\n"
+        "10.0.0.1;100;ABC01ZSL1\n"
+        "10.0.0.1;100;ABC01ZSL1\n"
+        "\n"
+        "10.0.0.2;101;ABC01ZSL1\n"
+    )
+
+    stats = {}
+    read_csv_file_normalized(str(csv_path), stats=stats)
+
+    assert stats["unique_data_rows"] == 2
+    assert stats["unique_data_rows"] == count_unique_data_rows(csv_path)
+
+
+def test_iter_csv_file_normalized_yields_rows_lazily(tmp_path):
+    """The iterator variant detects headers eagerly and yields the same rows as the list reader."""
+    csv_path = tmp_path / "netspeed.csv"
+    csv_path.write_text(
+        "IPAddress;LineNumber;SwitchHostname\n"
+        "10.0.0.1;100;ABC01ZSL1\n"
+        "10.0.0.2;101;ABC01ZSL1\n"
+    )
+
+    file_headers, rows = iter_csv_file_normalized(str(csv_path))
+
+    assert file_headers == ["IPAddress", "LineNumber", "SwitchHostname"]
+    first = next(rows)
+    assert first["IP Address"] == "10.0.0.1"
+    assert [first, *rows] == read_csv_file_normalized(str(csv_path))[1]
+
+
+def test_filter_display_columns_fills_from_legacy_and_alias_keys():
+    """Legacy and Call Manager alias keys back-fill canonical columns without overriding them."""
+    order = ["#", "Phone Port Speed", "Call Manager Active Sub", "Call Manager Standby Sub"]
+    rows = [
+        {"#": "1", "Speed 1": "100", "Call Manager 1": "cm1", "Call Manager 3": "cm3"},
+        {"#": "2", "Phone Port Speed": "1000", "Speed 1": "10", "CallManagerStandbySub": "sb"},
+    ]
+
+    with patch("backend.utils.csv_utils.get_csv_column_order", return_value=order):
+        headers, data = filter_display_columns([], rows)
+
+    assert headers == order
+    assert data == [
+        {"#": "1", "Phone Port Speed": "100", "Call Manager Active Sub": "cm1", "Call Manager Standby Sub": "cm3"},
+        {"#": "2", "Phone Port Speed": "1000", "Call Manager Active Sub": "", "Call Manager Standby Sub": "sb"},
+    ]
+
+
+def test_read_csv_file_columns_matches_deduplicated_rows(tmp_path):
+    """Column reader keeps only requested fields and applies phone de-duplication while streaming."""
+    csv_path = tmp_path / "netspeed.csv"
+    csv_path.write_text(
+        "IPAddress;LineNumber;SerialNumber;ModelName;KEM;SwitchHostname\n"
+        "10.0.0.1;100;S1;CP-8851;;ABC01ZSL1\n"
+        "10.0.0.2;101;S2;CP-7841;;ABC01ZSL1\n"
+        "10.0.0.1;100;S1;CP-8851;KEM;ABC01ZSL1\n"
+    )
+    fields = ("Serial Number", "Model Name", "KEM")
+
+    cols = read_csv_file_columns(str(csv_path), fields)
+
+    assert cols == {"Serial Number": ["S1", "S2"], "Model Name": ["CP-8851", "CP-7841"], "KEM": ["KEM", ""]}
+    rows = deduplicate_phone_rows(read_csv_file_normalized(str(csv_path))[1])
+    assert cols == rows_to_columns(rows, fields)
+    assert read_csv_file_columns(str(csv_path), fields, deduplicate=False)["Serial Number"] == ["S1", "S2", "S1"]
+
+
+@pytest.mark.parametrize("buffer_size", [1, 3, 7, 1024])
+def test_count_remaining_lines_skips_blank_lines_across_blocks(buffer_size):
+    """Preview row count skips whitespace-only lines like the per-line strip() filter."""
+    from backend.utils.csv_utils import _count_remaining_lines
+
+    text = "a;b\n\n  \n1;2\n \t \n\n3;4\n  "
+    expected = sum(1 for line in io.StringIO(text) if line.strip())
+
+    with patch("backend.utils.csv_utils.CSV_READ_BUFFER_SIZE", buffer_size):
+        assert _count_remaining_lines(io.StringIO(text)) == expected
+        assert _count_remaining_lines(io.StringIO(text + "5;6")) == expected + 1
+
+
+def test_read_csv_file_preview_strips_cells_during_mapping(tmp_path):
+    """Preview rows are stripped once by intelligent_column_mapping, not pre-stripped."""
+    from backend.utils.csv_utils import read_csv_file_preview
+
+    csv_path = tmp_path / "netspeed.csv"
+    csv_path.write_text("IPAddress;LineNumber;ModelName\n 10.0.0.1 ; 100 ;CP-8851 \n\n  \n10.0.0.2;101;CP-7841\n")
+
+    headers, rows, total = read_csv_file_preview(str(csv_path), limit=1)
+
+    assert rows[0]["IP Address"] == "10.0.0.1"
+    assert rows[0]["Line Number"] == "100"
+    assert rows[0]["Model Name"] == "CP-8851"
+    assert total == 2
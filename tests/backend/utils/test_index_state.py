@@ -46,3 +46,46 @@ def test_is_file_current(tmp_path):
     # Modify file so signature changes
     f.write_text('abcd')
     assert ist.is_file_current(f, sig) is False
+
+
+def test_save_state_throttled_skips_recent_saves():
+    state = {"files": {}}
+    with patch.object(ist, 'save_state') as save:
+        last = ist.save_state_throttled(state, float("-inf"), min_interval=60)
+        assert save.call_count == 1
+        # Within the interval: skipped, timestamp unchanged
+        assert ist.save_state_throttled(state, last, min_interval=60) == last
+        assert save.call_count == 1
+        ist.save_state_throttled(state, last, min_interval=0)
+        assert save.call_count == 2
+
+
+def test_checkpoint_only_resumes_same_files(tmp_path):
+    f1 = tmp_path / 'netspeed.csv'
+    f2 = tmp_path / 'netspeed.csv.0'
+    f1.write_text('a')
+    f2.write_text('b')
+    with patch.object(ist, 'CHECKPOINT_FILE', tmp_path / '.index_state.checkpoint.json'):
+        files_hash = ist.files_fingerprint([f1, f2])
+        ist.save_checkpoint('t1', files_hash, 1, 5, [{"file": str(f1), "success": True, "count": 5}])
+        cp = ist.load_checkpoint(files_hash)
+        assert cp['next_index'] == 1
+        assert cp['total_documents'] == 5
+        # Different order (or a rewritten file) invalidates the checkpoint
+        assert ist.load_checkpoint(ist.files_fingerprint([f2, f1])) is None
+        with patch.object(ist, 'CHECKPOINT_MAX_AGE_SECONDS', -1):
+            assert ist.load_checkpoint(files_hash) is None
+        ist.clear_checkpoint()
+        assert ist.load_checkpoint(files_hash) is None
+        ist.clear_checkpoint()
+
+
+def test_save_state_without_orjson_writes_same_data(tmp_path):
+    state = {"files": {"netspeed.csv": {"size": 1, "mtime": 1.5}}, "totals": {"files_processed": 1, "total_documents": 2}, "active": None}
+    with patch.object(ist, 'STATE_FILE', tmp_path / '.index_state.json'):
+        ist.save_state(state)
+        fast = ist.load_state()
+        with patch.object(ist, 'orjson', None):
+            ist.save_state(state)
+        assert ist.load_state() == fast
+        assert fast['files'] == state['files']
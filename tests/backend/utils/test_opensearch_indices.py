@@ -123,3 +123,27 @@ class TestWaitForAvailability:
         result = cfg.wait_for_availability(reason="unit-test")
 
         assert result is False
+
+
+class TestBulkIngestSettings:
+    def test_suspends_and_restores_refresh(self):
+        cfg = OpenSearchConfig()
+        cfg._client = MagicMock()
+
+        with cfg.bulk_ingest_settings(["netspeed_*"]):
+            first = cfg._client.indices.put_settings.call_args_list[0]
+            assert first.kwargs["body"]["index"]["refresh_interval"] == "-1"
+
+        restore = cfg._client.indices.put_settings.call_args_list[-1]
+        assert restore.kwargs["body"]["index"]["refresh_interval"] == "30s"
+        cfg._client.indices.refresh.assert_called_once()
+
+    def test_restores_when_block_raises(self):
+        cfg = OpenSearchConfig()
+        cfg._client = MagicMock()
+
+        with pytest.raises(RuntimeError):
+            with cfg.bulk_ingest_settings(["netspeed_*"]):
+                raise RuntimeError("boom")
+
+        assert cfg._client.indices.put_settings.call_count == 2
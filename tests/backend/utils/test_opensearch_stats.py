@@ -78,3 +78,161 @@ class TestStatsSnapshot:
 
         assert snapshot is not None
         assert snapshot['totalPhones'] == 1500
+
+    @patch('utils.opensearch.helpers.parallel_bulk')
+    @patch('utils.opensearch.OpenSearchConfig.client', new_callable=PropertyMock)
+    def test_index_file_snapshots_single_bulk(self, mock_client_prop, mock_bulk):
+        """Stats, per-location and archive docs for one file go through one bulk call."""
+        from utils.opensearch import opensearch_config
+
+        mock_client = MagicMock()
+        mock_client_prop.return_value = mock_client
+        mock_client.indices.exists.return_value = True
+        captured = []
+
+        def _consume(_client, actions, **_kwargs):
+            captured.extend(actions)
+            return [(True, {}) for _ in captured]
+
+        mock_bulk.side_effect = _consume
+
+        ok, count = opensearch_config.index_file_snapshots(
+            file='netspeed.csv',
+            date='2025-10-09',
+            metrics={'totalPhones': 2},
+            loc_docs=[{'key': 'ABC01', 'totalPhones': 2}],
+            rows=[{'IP Address': '10.0.0.1'}, {'IP Address': '10.0.0.2'}],
+        )
+
+        assert ok is True
+        assert count == 4
+        mock_bulk.assert_called_once()
+        assert [a['_id'] for a in captured] == [
+            'netspeed.csv:2025-10-09',
+            'netspeed.csv:2025-10-09:ABC01',
+            'netspeed.csv:2025-10-09:1',
+            'netspeed.csv:2025-10-09:2',
+        ]
+        mock_client.index.assert_not_called()
+
+    @patch('utils.opensearch.helpers.parallel_bulk')
+    @patch('utils.opensearch.OpenSearchConfig.client', new_callable=PropertyMock)
+    def test_index_stats_snapshots_bulk_writes_several_files(self, mock_client_prop, mock_bulk):
+        """Snapshot docs of several files are written in one bulk stream."""
+        from utils.opensearch import opensearch_config
+
+        mock_client = MagicMock()
+        mock_client_prop.return_value = mock_client
+        mock_client.indices.exists.return_value = True
+        captured = []
+
+        def _consume(_client, actions, **_kwargs):
+            captured.extend(actions)
+            return [(True, {}) for _ in captured]
+
+        mock_bulk.side_effect = _consume
+
+        ok = opensearch_config.index_stats_snapshots([
+            {'file': 'netspeed.csv', 'date': '2025-10-09', 'metrics': {'totalPhones': 2}},
+            {'file': 'netspeed.csv.0', 'date': '2025-10-08', 'metrics': {'totalPhones': 1}},
+        ])
+
+        assert ok is True
+        mock_bulk.assert_called_once()
+        assert [a['_id'] for a in captured] == ['netspeed.csv:2025-10-09', 'netspeed.csv.0:2025-10-08']
+        assert captured[1]['_source'] == {'file': 'netspeed.csv.0', 'date': '2025-10-08', 'totalPhones': 1}
+        mock_client.index.assert_not_called()
+
+    @patch('utils.opensearch.OpenSearchConfig.client', new_callable=PropertyMock)
+    def test_snapshot_existence_checks_use_document_ids(self, mock_client_prop):
+        """Existing stats/archive snapshots are detected with HEAD requests on their ids."""
+        from utils.opensearch import opensearch_config
+
+        mock_client = MagicMock()
+        mock_client_prop.return_value = mock_client
+        mock_client.exists.return_value = True
+
+        assert opensearch_config.has_stats_snapshot(file='netspeed.csv.1', date='2025-10-08') is True
+        assert opensearch_config.has_archive_snapshot(file='netspeed.csv.1', date='2025-10-08') is True
+        assert [c.kwargs['id'] for c in mock_client.exists.call_args_list] == ['netspeed.csv.1:2025-10-08', 'netspeed.csv.1:2025-10-08:1']
+        assert opensearch_config.has_archive_snapshot(file='netspeed.csv.1', date=None) is False
+
+        mock_client.exists.side_effect = ConnectionError("down")
+        assert opensearch_config.has_stats_snapshot(file='netspeed.csv.1', date='2025-10-08') is False
+
+    @patch('utils.opensearch.read_csv_file_normalized')
+    def test_generate_actions_reuses_parsed_rows(self, mock_read_csv):
+        """Rows parsed by the caller are indexed without reading the file again."""
+        from utils.opensearch import opensearch_config
+
+        actions = list(opensearch_config.generate_actions(
+            'netspeed_netspeed_csv', '/app/data/netspeed.csv', rows=[{'IP Address': '10.0.0.1'}]
+        ))
+
+        mock_read_csv.assert_not_called()
+        assert len(actions) == 1
+        assert actions[0]['_source']['IP Address'] == '10.0.0.1'
+        assert actions[0]['_source']['#'] == '1'
+
+    @patch('utils.opensearch.helpers.parallel_bulk')
+    @patch('utils.opensearch.OpenSearchConfig.client', new_callable=PropertyMock)
+    def test_index_archive_snapshot_accepts_row_generator(self, mock_client_prop, mock_bulk):
+        """Archive rows can be streamed from a generator."""
+        from utils.opensearch import opensearch_config
+
+        mock_client = MagicMock()
+        mock_client_prop.return_value = mock_client
+        mock_client.indices.exists.return_value = True
+        mock_bulk.side_effect = lambda _client, actions, **_kwargs: [(True, {}) for _ in actions]
+
+        rows = ({"IP Address": f"10.0.0.{i}"} for i in range(3))
+        ok, count = opensearch_config.index_archive_snapshot(file='netspeed.csv', date='2025-10-09', rows=rows)
+
+        assert ok is True
+        assert count == 3
+
+    @patch('utils.opensearch.helpers.parallel_bulk')
+    @patch('utils.opensearch.OpenSearchConfig.client', new_callable=PropertyMock)
+    def test_index_stats_location_snapshots_streams_keyed_docs(self, mock_client_prop, mock_bulk):
+        """Location docs are streamed lazily and docs without a key are skipped."""
+        from utils.opensearch import opensearch_config
+
+        mock_client = MagicMock()
+        mock_client_prop.return_value = mock_client
+        mock_client.indices.exists.return_value = True
+        captured = []
+
+        def _consume(_client, actions, **_kwargs):
+            assert not isinstance(actions, list)
+            captured.extend(actions)
+            return [(True, {}) for _ in captured]
+
+        mock_bulk.side_effect = _consume
+
+        ok = opensearch_config.index_stats_location_snapshots(
+            file='netspeed.csv',
+            date='2025-10-09',
+            loc_docs=[{'key': 'ABC01', 'totalPhones': 2}, {'totalPhones': 1}],
+        )
+
+        assert ok is True
+        assert [a['_id'] for a in captured] == ['netspeed.csv:2025-10-09:ABC01']
+
+
+class TestClientSerializer:
+    """Test the request body serializer handed to OpenSearch clients."""
+
+    def test_orjson_serializer_matches_stdlib_output(self):
+        from datetime import datetime
+        from opensearchpy.serializer import JSONSerializer
+        from utils.opensearch import _OrjsonSerializer, orjson
+
+        if orjson is None:
+            pytest.skip("orjson not installed")
+        docs = [
+            {'key': 'ABC01', 'totalPhones': 2, 'city': 'München', 'models': [{'model': '8851', 'count': 2}]},
+            {'date': datetime(2025, 10, 9, 12, 30), 1: None, 'big': 2 ** 70},
+            'already-serialized',
+        ]
+        for doc in docs:
+            assert _OrjsonSerializer().dumps(doc) == JSONSerializer().dumps(doc)
@@ -1,7 +1,8 @@
 import pytest
+from pathlib import Path
 
 from backend.utils import path_utils
-from backend.utils.path_utils import collect_netspeed_files
+from backend.utils.path_utils import collect_netspeed_files, is_plain_netspeed_file
 
 
 def test_collect_netspeed_files_includes_rotated_timestamp_files(tmp_path, monkeypatch):
@@ -39,3 +40,29 @@ def test_collect_netspeed_files_includes_rotated_timestamp_files(tmp_path, monke
     assert older in historical
     assert legacy in historical
     assert backups == []
+
+
+def test_is_plain_netspeed_file():
+    assert is_plain_netspeed_file(Path("/data/netspeed.csv"))
+    assert is_plain_netspeed_file("/data/history/netspeed.csv.12")
+    assert not is_plain_netspeed_file(Path("netspeed.csv.1_bak"))
+    assert not is_plain_netspeed_file(Path("netspeed_20250927-150339.csv"))
+    assert not is_plain_netspeed_file(Path("netspeed.csv.old"))
+
+
+def test_collect_netspeed_files_classifies_rotations_and_backups(tmp_path, monkeypatch):
+    monkeypatch.setattr(path_utils.settings, "CSV_FILES_DIR", str(tmp_path), raising=False)
+    monkeypatch.setattr(path_utils.settings, "NETSPEED_CURRENT_DIR", None, raising=False)
+    monkeypatch.setattr(path_utils.settings, "NETSPEED_HISTORY_DIR", None, raising=False)
+    monkeypatch.setattr(path_utils.settings, "_explicit_data_roots", (), raising=False)
+    monkeypatch.setattr(path_utils, "_configured_roots", lambda: [], raising=False)
+
+    for name in ("netspeed.csv", "netspeed.csv.10", "netspeed.csv.2", "netspeed.csv.3_bak", "netspeed.csv_bak", "netspeed.csv.old", "other.csv"):
+        (tmp_path / name).write_text("x")
+    (tmp_path / "netspeed.csv.4").mkdir()
+
+    historical, current_path, backups = collect_netspeed_files(extra_candidates=[tmp_path])
+
+    assert current_path == tmp_path / "netspeed.csv"
+    assert [p.name for p in historical] == ["netspeed.csv.2", "netspeed.csv.3_bak", "netspeed.csv.10"]
+    assert [p.name for p in backups] == ["netspeed.csv.old", "netspeed.csv_bak"]
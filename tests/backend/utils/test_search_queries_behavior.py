@@ -54,6 +54,24 @@ def test_preferred_file_names_orders_rotations(monkeypatch):
     ]
 
 
+
+def test_file_name_scope_reuses_discovery(monkeypatch):
+    cfg = OpenSearchConfig()
+    discover = MagicMock(return_value=["netspeed.csv", "netspeed.csv.1"])
+    monkeypatch.setattr(cfg, "_discover_netspeed_filenames", discover)
+
+    with cfg._file_name_scope():
+        cfg._preferred_file_names()
+        cfg._build_query_body("ABX01ZSL4750P", field=None, size=25)
+        names = cfg._netspeed_filenames()
+        names.append("mutated")
+        assert cfg._netspeed_filenames() == ["netspeed.csv", "netspeed.csv.1"]
+    assert discover.call_count == 1
+
+    # Outside a scope every call rediscovers
+    cfg._netspeed_filenames()
+    assert discover.call_count == 2
+
 def test_build_query_general_switch_hostname_code():
     cfg = OpenSearchConfig()
     body = cfg._build_query_body("ABX01ZSL4750P", field=None, size=25)
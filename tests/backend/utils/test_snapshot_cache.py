@@ -0,0 +1,65 @@
+import os
+from unittest.mock import patch
+
+from backend.utils import snapshot_cache as sc
+
+
+def test_store_and_load_roundtrip_survives_rename(tmp_path):
+    f = tmp_path / 'netspeed.csv.0'
+    f.write_text('a;b\n1;2\n')
+    with patch.object(sc, 'SNAPSHOT_CACHE_DIR', tmp_path / 'cache'):
+        assert sc.load_snapshot('stats_metrics', f) is None
+        sc.store_snapshot('stats_metrics', f, {'totalPhones': 1})
+        assert sc.load_snapshot('stats_metrics', f) == {'totalPhones': 1}
+        # Other aggregate kinds are cached separately
+        assert sc.load_snapshot('loc_docs', f) is None
+        # Log rotation renames files without touching size/mtime
+        rotated = f.rename(tmp_path / 'netspeed.csv.1')
+        assert sc.load_snapshot('stats_metrics', rotated) == {'totalPhones': 1}
+
+
+def test_changed_or_missing_file_misses(tmp_path):
+    f = tmp_path / 'netspeed.csv'
+    f.write_text('a;b\n1;2\n')
+    with patch.object(sc, 'SNAPSHOT_CACHE_DIR', tmp_path / 'cache'):
+        sc.store_snapshot('stats_metrics', f, {'totalPhones': 1})
+        f.write_text('a;b\n1;2\n3;4\n')
+        assert sc.load_snapshot('stats_metrics', f) is None
+        assert sc.load_snapshot('stats_metrics', tmp_path / 'missing.csv') is None
+
+
+def test_prune_removes_stale_entries_only(tmp_path):
+    f = tmp_path / 'netspeed.csv'
+    f.write_text('a;b\n1;2\n')
+    cache_dir = tmp_path / 'cache'
+    cache_dir.mkdir()
+    stale = cache_dir / 'stale.pkl'
+    stale.write_bytes(b'')
+    os.utime(stale, (0, 0))
+    with patch.object(sc, 'SNAPSHOT_CACHE_DIR', cache_dir):
+        sc.store_snapshot('stats_metrics', f, {'totalPhones': 1})
+        # Storing does not scan the cache directory
+        assert stale.exists()
+        sc.prune_snapshots()
+        assert not stale.exists()
+        assert sc.load_snapshot('stats_metrics', f) == {'totalPhones': 1}
+
+
+def test_same_size_and_mtime_with_other_content_misses(tmp_path):
+    f = tmp_path / 'netspeed.csv'
+    f.write_text('a;b\n1;2\n')
+    st = f.stat()
+    with patch.object(sc, 'SNAPSHOT_CACHE_DIR', tmp_path / 'cache'):
+        sc.store_snapshot('stats_metrics', f, {'totalPhones': 1})
+        f.write_text('a;b\n3;4\n')
+        os.utime(f, ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert sc.load_snapshot('stats_metrics', f) is None
+
+
+def test_other_code_version_misses(tmp_path):
+    f = tmp_path / 'netspeed.csv'
+    f.write_text('a;b\n1;2\n')
+    with patch.object(sc, 'SNAPSHOT_CACHE_DIR', tmp_path / 'cache'):
+        sc.store_snapshot('stats_metrics', f, {'totalPhones': 1}, version=1)
+        assert sc.load_snapshot('stats_metrics', f, version=1) == {'totalPhones': 1}
+        assert sc.load_snapshot('stats_metrics', f, version=2) is None